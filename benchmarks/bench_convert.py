@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+FIRST_FORMULA = r"{}^{0}T_{1}=\begin{bmatrix} \cos\theta_{1} & -\sin\theta_{1} & 0 \\ \sin\theta_{1} & \cos\theta_{1} & 0 \\ 0 & 0 & 1 \end{bmatrix}"
+
+_FIRST_CONVERSION_SCRIPT = r"""
+import sys, time
+sys.path.insert(0, {root!r})
+from src.converters.latex_to_mathml import convert
+if {warm!r}:
+    from src.converters.warmup import warm_up
+    warm_up()
+start = time.perf_counter()
+convert({formula!r})
+print(time.perf_counter() - start)
+"""
+
+
+def _first_conversion_ms(*, warm: bool) -> float:
+    script = _FIRST_CONVERSION_SCRIPT.format(root=ROOT_DIR, warm=warm, formula=FIRST_FORMULA)
+    out = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1]) * 1000
+
+
+def bench_first_conversion(runs: int) -> None:
+    print(f"first conversion latency (fresh process, {runs} runs)")
+    for warm in (False, True):
+        samples = [_first_conversion_ms(warm=warm) for _ in range(runs)]
+        label = "with warm-up" if warm else "cold"
+        print(f"  {label:<14} median={statistics.median(samples):8.2f} ms  min={min(samples):8.2f} ms")
+
+
+def _dh_matrix(i: int) -> str:
+    c, s = rf"\cos\theta_{{{i}}}", rf"\sin\theta_{{{i}}}"
+    return (
+        rf"{{}}^{{{i - 1}}}T_{{{i}}}=\begin{{bmatrix}} {c} & -{s}\cos\alpha_{{{i}}} & {s}\sin\alpha_{{{i}}} & a_{{{i}}}{c} \\ "
+        rf"{s} & {c}\cos\alpha_{{{i}}} & -{c}\sin\alpha_{{{i}}} & a_{{{i}}}{s} \\ "
+        rf"0 & \sin\alpha_{{{i}}} & \cos\alpha_{{{i}}} & d_{{{i}}} \\ 0 & 0 & 0 & 1 \end{{bmatrix}}"
+    )
+
+
+DOCUMENT_FORMULAS = [_dh_matrix(i) for i in range(1, 7)] + [
+    rf"\begin{{aligned}} f(x) &= \left( \sum_{{k=0}}^{{n}} a_k x^k \right)^2 \\ &= {rhs} \end{{aligned}}"
+    for rhs in (r"\sum_{j} b_j x^j", r"\sum_{j} b_j x^j + c", r"\prod_{j} (x - r_j)")
+]
+
+
+def _time_ms(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_subtree_cache(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+
+    def convert_document() -> None:
+        for latex in DOCUMENT_FORMULAS:
+            m.convert(latex)
+
+    print(f"document conversion, {len(DOCUMENT_FORMULAS)} formulas ({runs} runs, plan cache off)")
+    m.convert("x")
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    disabled = [_time_ms(convert_document) for _ in range(runs)]
+    m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+    first = []
+    for _ in range(runs):
+        m.clear_subtree_cache()
+        first.append(_time_ms(convert_document))
+    stats = m.get_subtree_cache_stats()
+    repeat = [_time_ms(convert_document) for _ in range(runs)]
+    print(f"  cache disabled   median={statistics.median(disabled):8.2f} ms")
+    print(f"  cold cache       median={statistics.median(first):8.2f} ms  hit_rate={stats['hit_rate']:.2f}")
+    print(f"  warm cache       median={statistics.median(repeat):8.2f} ms")
+    m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+    m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+
+
+def bench_plan_cache(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+
+    family = [_dh_matrix(i) for i in range(1, 41)]
+    print(f"formula family, {len(family)} DH matrices differing only in leaves ({runs} runs)")
+    m.convert("x")
+    m.set_result_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    disabled = [_time_ms(lambda: [m.convert(f) for f in family]) / len(family) for _ in range(runs)]
+    m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+    first, rest = [], []
+    for _ in range(runs):
+        m.clear_plan_cache()
+        first.append(_time_ms(m.convert, family[0]))
+        rest.append(_time_ms(lambda: [m.convert(f) for f in family[1:]]) / (len(family) - 1))
+    m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+    m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+    print(f"  no plan cache    median={statistics.median(disabled):8.3f} ms/formula")
+    print(f"  plan miss        median={statistics.median(first):8.3f} ms/formula")
+    print(f"  plan hit         median={statistics.median(rest):8.3f} ms/formula")
+
+
+def _input_variants(latex: str) -> list[str]:
+    spaced = latex.replace("&", " & ").replace("=", " = ")
+    return [latex, f"$${latex}$$", f"${latex}$", f"\\[ {spaced} \\]", f"  {spaced}\n", f"\\begin{{equation}}{latex}\\end{{equation}}"]
+
+
+def bench_canonical_cache(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+    from src.utils.latex_cleaner import canonicalize_latex
+
+    inputs = [v for latex in DOCUMENT_FORMULAS for v in _input_variants(latex)]
+    print(f"pasted variants, {len(inputs)} inputs of {len(DOCUMENT_FORMULAS)} formulas ({runs} runs)")
+    canon = [_time_ms(lambda: [canonicalize_latex(x) for x in inputs]) / len(inputs) for _ in range(runs)]
+    m.convert("x")
+    timings = []
+    for _ in range(runs):
+        m.clear_result_cache()
+        timings.append(_time_ms(m.convert_batch, inputs))
+    stats = m.get_result_cache_stats()
+    print(f"  canonicalize     median={statistics.median(canon) * 1000:8.1f} us/input")
+    print(f"  convert_batch    median={statistics.median(timings):8.2f} ms  unique={stats['entries']}")
+    m.clear_result_cache()
+    for x in inputs:
+        m.convert(x)
+    stats = m.get_result_cache_stats()
+    print(f"  convert one-by-one result cache hit_rate={stats['hit_rate']:.2f}")
+
+
+SHORT_FORMULAS = [
+    r"x^2", r"a_{ij} + b_{ij}", r"\frac{a}{b}", r"\alpha + \beta = \gamma", r"e^{i\pi} + 1 = 0",
+    r"-x + 3", r"\sqrt{x^2 + y^2}", r"\sum_{i=1}^{n} x_i", r"\mathbf{x}^\top A", r"\|x\|_2",
+]
+
+
+def bench_pass_dispatch(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+
+    formulas = SHORT_FORMULAS + DOCUMENT_FORMULAS
+    print(f"pass dispatch, {len(formulas)} formulas ({runs} runs, caches off)")
+    m.convert("x")
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    scan = m._scan_features
+    try:
+        m._scan_features = lambda root: m._F_ALL
+        every_pass = [_time_ms(lambda: [m.convert(f) for f in formulas]) for _ in range(runs)]
+        m._scan_features = scan
+        m.clear_pass_stats()
+        dispatched = [_time_ms(lambda: [m.convert(f) for f in formulas]) for _ in range(runs)]
+    finally:
+        m._scan_features = scan
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+        m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+        m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+    print(f"  all passes       median={statistics.median(every_pass):8.2f} ms")
+    print(f"  dispatched       median={statistics.median(dispatched):8.2f} ms")
+    for name, row in m.get_pass_stats().items():
+        print(f"  {name:<40} formulas={row['formulas'] // runs:3d} passes run={row['passes_run']:2d} skipped={row['passes_skipped']:2d}")
+
+
+INLINE_FORMULAS = [
+    r"x^2 + y^2 = z^2", r"a_{ij} + b_{ij}", r"\frac{a}{b}", r"\alpha + \beta = \gamma", r"e^{i\pi} + 1 = 0",
+    r"-x + 3", r"f(x) = -\frac{1}{2} x^2", r"\theta_1 \le \theta_2", r"x_{n+1} = x_n - \frac{f(x_n)}{f'(x_n)}",
+    r"E = mc^2", r"\partial_t u = \nabla \cdot (D \nabla u)", r"p(x) \propto e^{-x^2/2}",
+]
+
+
+def bench_fast_path(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+    from src.converters.fast_path import convert_simple
+    from src.utils.latex_cleaner import canonicalize_latex
+
+    covered = sum(convert_simple(canonicalize_latex(f)) is not None for f in INLINE_FORMULAS)
+    print(f"inline formulas, {len(INLINE_FORMULAS)} formulas, {covered} on the fast path ({runs} runs, result cache off)")
+    m.convert("x")
+    m.set_result_cache_budget(0)
+    fast = m.convert_simple
+    try:
+        m.convert_simple = lambda key: None
+        full = [_time_ms(lambda: [m.convert(f) for f in INLINE_FORMULAS]) / len(INLINE_FORMULAS) for _ in range(runs)]
+        m.convert_simple = fast
+        direct = [_time_ms(lambda: [m.convert(f) for f in INLINE_FORMULAS]) / len(INLINE_FORMULAS) for _ in range(runs)]
+    finally:
+        m.convert_simple = fast
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+    print(f"  full pipeline    median={statistics.median(full):8.3f} ms/formula")
+    print(f"  with fast path   median={statistics.median(direct):8.3f} ms/formula")
+
+
+def bench_compact(runs: int) -> None:
+    import xml.etree.ElementTree as ET
+
+    from src.converters import latex_to_mathml as m
+
+    formulas = SHORT_FORMULAS + DOCUMENT_FORMULAS
+    m.clear_compact_stats()
+    full = [m.convert(f) for f in formulas]
+    compact = [m.convert(f, compact=True) for f in formulas]
+    stats = m.get_compact_stats()
+    latex_bytes = sum(len(f.encode("utf-8")) for f in formulas)
+    print(f"compact output, {len(formulas)} formulas, {latex_bytes} bytes of LaTeX ({runs} runs)")
+    print(f"  default          {stats['bytes_before']:8d} bytes")
+    print(f"  compact          {stats['bytes_after']:8d} bytes  saved={stats['bytes_saved']} ({1 - stats['ratio']:.1%})")
+    for label, docs in (("parse default", full), ("parse compact", compact)):
+        samples = [_time_ms(lambda: [ET.fromstring(d) for d in docs]) for _ in range(runs)]
+        print(f"  {label:<16} median={statistics.median(samples):8.3f} ms")
+
+
+def bench_profiles(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+
+    formulas = SHORT_FORMULAS + DOCUMENT_FORMULAS
+    print(f"output profiles, {len(formulas)} formulas ({runs} runs, result/plan/subtree caches off)")
+    m.convert("x")
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    try:
+        for name in m.PROFILES:
+            samples = [_time_ms(lambda: m.convert_batch(formulas, profile=name)) for _ in range(runs)]
+            median = statistics.median(samples)
+            print(f"  {name:<16} median={median:8.2f} ms  {len(formulas) / median * 1000:8.0f} formulas/s")
+    finally:
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+        m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+        m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+
+
+def bench_threads(runs: int) -> None:
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    from src.converters import latex_to_mathml as m
+
+    formulas = SHORT_FORMULAS + INLINE_FORMULAS + DOCUMENT_FORMULAS + [_dh_matrix(i) for i in range(7, 31)]
+    targets = [("word", "mathml"), ("libreoffice", "mathml"), ("word", "omml")]
+    expected = {(f, p, o): m.convert(f, profile=p, output=o) for f in formulas for p, o in targets}
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"threads, {len(formulas)} formulas, Python {sys.version.split()[0]} GIL {'on' if gil else 'off'} ({runs} runs)")
+
+    # stress: many threads, small caches so entries are evicted while others read them
+    m.set_result_cache_budget(20_000)
+    m.set_plan_cache_budget(20_000)
+    m.set_subtree_cache_budget(2_000)
+    rng = random.Random(0)
+    work = [(rng.choice(formulas), *rng.choice(targets)) for _ in range(2000 * runs)]
+
+    def check(item) -> bool:
+        f, p, o = item
+        if rng.random() < 0.01:
+            m.clear_subtree_cache()
+        return m.convert(f, profile=p, output=o) == expected[item]
+
+    try:
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            mismatches = sum(not ok for ok in pool.map(check, work))
+        print(f"  stress           {len(work)} conversions on 16 threads, mismatches={mismatches}")
+
+        m.set_result_cache_budget(0)
+        m.set_plan_cache_budget(0)
+        m.set_subtree_cache_budget(0)
+        batch = formulas * 2
+        base = None
+        for workers in (1, 2, 4, 8):
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                samples = [_time_ms(lambda: list(pool.map(m.convert, batch))) for _ in range(runs)]
+            median = statistics.median(samples)
+            base = base or median
+            print(f"  {workers} thread(s)      median={median:8.2f} ms  {len(batch) / median * 1000:8.0f} formulas/s  speedup={base / median:4.2f}x")
+    finally:
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+        m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+        m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+
+
+def _zipf_workload(n: int, distinct: int, s: float = 1.1) -> list[str]:
+    import random
+
+    pool = []
+    for i in range(distinct):
+        kind = i % 4
+        if kind == 0:
+            pool.append(_dh_matrix(i + 1))
+        elif kind == 1:
+            pool.append(rf"\begin{{aligned}} f_{{{i}}}(x) &= \left( \sum_{{k=0}}^{{{i}}} a_k x^k \right)^2 \\ &= \prod_{{j}} (x - r_{{{i}}}) \end{{aligned}}")
+        elif kind == 2:
+            pool.append(rf"\left\| \mathbf{{x}}_{{{i}}} - \frac{{-b \pm \sqrt{{b^2 - {i}ac}}}}{{2a}} \right\|_2 \le \infty")
+        else:
+            pool.append(rf"f(x) = \begin{{cases}} {i} & x \ge 0 \\ -x^{{{i}}} & \text{{otherwise}} \end{{cases}}")
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) ** s for rank in range(distinct)]
+    return rng.choices(pool, weights=weights, k=n)
+
+
+def _zipf_worker_init(cache) -> None:
+    from src.converters import latex_to_mathml as m
+
+    m.set_shared_result_cache(cache)
+    # no plan cache, so a miss costs a full conversion as for unrelated formulas
+    m.set_plan_cache_budget(0)
+
+
+def _zipf_chunk(chunk: list[str]) -> int:
+    from src.converters import latex_to_mathml as m
+
+    shared = m.get_shared_result_cache()
+    before = shared.hits if shared is not None else 0
+    for latex in chunk:
+        m.convert(latex)
+    return (shared.hits if shared is not None else 0) - before
+
+
+def bench_shared_cache(runs: int) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from src.converters.shared_cache import SharedResultCache
+
+    workers = 4
+    workload = _zipf_workload(4000, 1000)
+    chunks = [workload[i:i + 50] for i in range(0, len(workload), 50)]
+    print(f"shared result cache, {len(workload)} Zipf-distributed formulas ({len(set(workload))} distinct), {workers} worker processes ({runs} runs)")
+    for label in ("private caches", "shared cache"):
+        samples = []
+        hits = 0
+        for _ in range(runs):
+            cache = SharedResultCache.create() if label == "shared cache" else None
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_zipf_worker_init, initargs=(cache,)) as pool:
+                    list(pool.map(_zipf_chunk, [[]] * workers))  # start the workers outside the timing
+                    start = time.perf_counter()
+                    hits = sum(pool.map(_zipf_chunk, chunks))
+                    samples.append((time.perf_counter() - start) * 1000)
+            finally:
+                if cache is not None:
+                    cache.close()
+        print(f"  {label:<16} median={statistics.median(samples):8.2f} ms  shared hits={hits}")
+
+
+def bench_macros(runs: int) -> None:
+    from src.utils import latex_macros
+    from src.utils.latex_cleaner import canonicalize_latex
+
+    source = "\n".join(
+        [rf"\newcommand{{\op{chr(97 + i // 26)}{chr(97 + i % 26)}}}[1]{{\mathcal{{O}}(#1)}}" for i in range(500)]
+        + [r"\newcommand{\R}{\mathbb{R}}", r"\newcommand{\norm}[1]{\left\lVert #1 \right\rVert}",
+           r"\DeclareMathOperator*{\argmin}{arg\,min}"]
+    )
+    compile_ms = [_time_ms(latex_macros.parse_macros, source) for _ in range(runs)]
+    table = latex_macros.parse_macros(source)
+    using = [r"\argmin_{x \in \R^n} \norm{A x - b}_2^2", r"\opaa{n \log n} + \norm{\norm{x}}"]
+    inputs = SHORT_FORMULAS + DOCUMENT_FORMULAS
+    print(f"macro expansion, {len(table)} macros ({runs} runs)")
+    print(f"  compile          median={statistics.median(compile_ms):8.2f} ms (once per macro file)")
+    try:
+        for label, active, formulas in (
+            ("no macros", latex_macros.MacroTable(), inputs),
+            ("table, unused", table, inputs),
+            ("table, expanded", table, using * 10),
+        ):
+            latex_macros.set_macro_table(active)
+            samples = [_time_ms(lambda: [canonicalize_latex(f) for f in formulas]) / len(formulas) for _ in range(runs)]
+            print(f"  {label:<16} median={statistics.median(samples) * 1000:8.1f} us/formula")
+    finally:
+        latex_macros.set_macro_table(None)
+
+
+def bench_math_alphanumerics(runs: int) -> None:
+    import copy
+    import unicodedata
+    import xml.etree.ElementTree as ET
+
+    from src.converters import latex_to_mathml as m
+    from src.converters.math_alphanumerics import MATH_ALPHANUMERICS
+
+    def unicodedata_lookup(text):
+        # the per-node check the table replaced
+        base = unicodedata.normalize("NFKD", text)
+        return base if base != text and "MATHEMATICAL" in unicodedata.name(text, "") else None
+
+    letters = [*MATH_ALPHANUMERICS, *"abcxyzABCXYZ"] * 4
+    row = ET.Element(f"{{{m.NS_URI}}}mrow")
+    for ch in letters:
+        ET.SubElement(row, f"{{{m.NS_URI}}}mi").text = ch
+    print(f"math alphanumerics, {len(MATH_ALPHANUMERICS)} styled letters, {len(letters)} nodes ({runs} runs)")
+    for label, lookup in (("unicodedata", unicodedata_lookup), ("table", MATH_ALPHANUMERICS.get)):
+        samples = [_time_ms(lambda: [lookup(ch) for ch in letters]) * 1e6 / len(letters) for _ in range(runs)]
+        print(f"  {label:<16} median={statistics.median(samples):8.1f} ns/node")
+    samples = []
+    for _ in range(runs):
+        tree = copy.deepcopy(row)
+        samples.append(_time_ms(m._normalize_math_alphanum, tree))
+    print(f"  pass, one row    median={statistics.median(samples):8.3f} ms")
+
+
+def _aligned_block(rows: list[str]) -> str:
+    return "\\begin{aligned}" + " \\\\ ".join(rows) + "\\end{aligned}"
+
+
+def bench_incremental(runs: int) -> None:
+    from src.converters import latex_to_mathml as m
+    from src.converters.incremental import IncrementalConverter
+
+    print(f"edit one row and reconvert, aligned blocks ({runs} runs)")
+    for size in (10, 30, 100):
+        rows = [
+            rf"f_{{{i}}}(x) &= \sum_{{k=0}}^{{{i}}} \frac{{x^k}}{{k!}} + \left( \int_0^x g_{{{i}}}(t)\,dt \right)^2"
+            for i in range(size)
+        ]
+        converter = IncrementalConverter()
+        converter.convert(_aligned_block(rows))
+        edits = []
+        for run in range(runs):
+            edited = list(rows)
+            edited[size // 2] += f" + {run}"
+            edits.append(_aligned_block(edited))
+        # every edit is a new formula, so the result cache misses either way
+        full = [_time_ms(m.convert, latex) for latex in edits]
+        incremental = [_time_ms(converter.convert, latex) for latex in reversed(edits)]
+        print(
+            f"  {size:3d} rows  full median={statistics.median(full):8.2f} ms"
+            f"  incremental median={statistics.median(incremental):8.2f} ms"
+        )
+
+
+def _matrix(n: int) -> str:
+    rows = (" & ".join(rf"a_{{{i},{j}}}" for j in range(n)) for i in range(n))
+    return "\\begin{bmatrix}" + " \\\\ ".join(rows) + "\\end{bmatrix}"
+
+
+def bench_large_tables(runs: int) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from src.converters import latex_to_mathml as m
+    from src.converters.incremental import IncrementalConverter
+
+    workers = 4
+    cases = [(f"bmatrix {n}x{n}", _matrix(n)) for n in (25, 50, 100, 200)]
+    lines = [rf"f_{{{i}}}(x) &= \frac{{x^{{{i}}}}}{{{i}!}} + \sqrt{{y_{{{i}}}}}" for i in range(500)]
+    cases.append(("align* 500 rows", "\\begin{align*}" + " \\\\ ".join(lines) + "\\end{align*}"))
+    print(f"large tables, whole formula vs rows, {workers} worker processes on {os.cpu_count()} CPU(s) ({runs} runs)")
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            IncrementalConverter(executor=pool, min_rows=1).convert(_matrix(20))  # start the workers outside the timing
+            for label, latex in cases:
+                full = [_time_ms(m.convert, latex) for _ in range(runs)]
+                rows = [_time_ms(IncrementalConverter().convert, latex) for _ in range(runs)]
+                parallel = [_time_ms(IncrementalConverter(executor=pool).convert, latex) for _ in range(runs)]
+                print(
+                    f"  {label:<16} full median={statistics.median(full):8.1f} ms"
+                    f"  rows median={statistics.median(rows):8.1f} ms"
+                    f"  rows/{workers} processes median={statistics.median(parallel):8.1f} ms"
+                )
+    finally:
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+        m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+
+
+SUITES = {
+    "first-conversion": bench_first_conversion,
+    "subtree-cache": bench_subtree_cache,
+    "plan-cache": bench_plan_cache,
+    "canonical-cache": bench_canonical_cache,
+    "pass-dispatch": bench_pass_dispatch,
+    "fast-path": bench_fast_path,
+    "compact": bench_compact,
+    "profiles": bench_profiles,
+    "threads": bench_threads,
+    "shared-cache": bench_shared_cache,
+    "macros": bench_macros,
+    "math-alphanumerics": bench_math_alphanumerics,
+    "incremental": bench_incremental,
+    "large-tables": bench_large_tables,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="latex2word conversion benchmarks")
+    parser.add_argument("suites", nargs="*", metavar="SUITE", help=f"one of: {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}")
+    started = time.perf_counter()
+    for name in args.suites or list(SUITES):
+        SUITES[name](args.runs)
+    print(f"total {time.perf_counter() - started:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
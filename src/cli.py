@@ -0,0 +1,142 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from src.converters.incremental import IncrementalConverter
+    from src.converters.latex_to_mathml import OUTPUT_FORMATS, PROFILES, convert_batch
+    from src.converters.mathml_to_latex import mathml_to_latex
+    from src.services.docx_writer import export_docx
+    from src.services.http_server import DEFAULT_HOST, DEFAULT_PORT, serve
+    from src.services.stdio_server import serve_stdio
+    from src.utils.latex_macros import load_macro_files, set_macro_table
+except ModuleNotFoundError:
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from src.converters.incremental import IncrementalConverter
+    from src.converters.latex_to_mathml import OUTPUT_FORMATS, PROFILES, convert_batch
+    from src.converters.mathml_to_latex import mathml_to_latex
+    from src.services.docx_writer import export_docx
+    from src.services.http_server import DEFAULT_HOST, DEFAULT_PORT, serve
+    from src.services.stdio_server import serve_stdio
+    from src.utils.latex_macros import load_macro_files, set_macro_table
+
+
+def _run_convert(args) -> int:
+    # one formula per argument, or one per line of stdin
+    formulas = args.latex or [line for line in (l.rstrip("\n") for l in sys.stdin) if line.strip()]
+    if args.jobs and args.jobs > 1:
+        # large matrices and aligned blocks: rows are converted by worker processes
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            converter = IncrementalConverter(profile=args.profile, executor=executor)
+            for latex in formulas:
+                print(converter.convert(latex, output=args.output, annotate=args.annotate))
+        return 0
+    results = convert_batch(
+        formulas,
+        profile=args.profile,
+        output=args.output,
+        max_rows=args.max_rows,
+        max_cells=args.max_cells,
+        compact=True if args.compact else None,
+        annotate=args.annotate,
+    )
+    for result in results:
+        print(result)
+    return 0
+
+
+def _run_to_latex(args) -> int:
+    # one MathML element per argument, or one per line of stdin
+    documents = args.mathml or [line for line in (l.rstrip("\n") for l in sys.stdin) if line.strip()]
+    for mathml in documents:
+        print(mathml_to_latex(mathml))
+    return 0
+
+
+def _run_docx(args) -> int:
+    stats = export_docx(args.input, args.output, jobs=args.jobs, max_rows=args.max_rows, max_cells=args.max_cells)
+    print(
+        f"{args.output}: paragraphs={stats['paragraphs']} formulas={stats['formulas']} failed={stats['failed']}"
+    )
+    return 0
+
+
+def _run_serve(args) -> int:
+    logging.getLogger().setLevel(logging.INFO)
+    serve(args.host, args.port, jobs=args.jobs, max_pending=args.max_pending)
+    return 0
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    parser = argparse.ArgumentParser(prog="latex2word", description="latex2word command line tools")
+    parser.add_argument(
+        "--serve-stdio",
+        action="store_true",
+        help="stay running and answer newline-delimited JSON-RPC requests on stdin/stdout",
+    )
+    parser.add_argument(
+        "--macros",
+        action="append",
+        metavar="FILE",
+        help="file of \\newcommand/\\DeclareMathOperator definitions to expand (repeatable)",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    conv = commands.add_parser("convert", help="convert LaTeX formulas and print the result, one per line")
+    conv.add_argument("latex", nargs="*", help="formulas (default: read one per line from stdin)")
+    conv.add_argument("--profile", choices=list(PROFILES), default="word")
+    conv.add_argument("--output", choices=OUTPUT_FORMATS, default="mathml")
+    conv.add_argument("--compact", action="store_true")
+    conv.add_argument("--max-rows", type=int, default=None)
+    conv.add_argument("--max-cells", type=int, default=None)
+    conv.add_argument("--annotate", action="store_true", help="embed the LaTeX source in the MathML")
+    conv.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes for the rows of large tables (default: 1 = in-process); "
+        "not with --compact/--max-rows/--max-cells",
+    )
+    conv.set_defaults(run=_run_convert)
+
+    back = commands.add_parser("to-latex", help="recover LaTeX from MathML, one result per line")
+    back.add_argument("mathml", nargs="*", help="MathML documents (default: read one per line from stdin)")
+    back.set_defaults(run=_run_to_latex)
+
+    docx = commands.add_parser("docx", help="convert a Markdown/LaTeX text file to .docx with native equations")
+    docx.add_argument("input")
+    docx.add_argument("output")
+    docx.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count, 1 = in-process)")
+    docx.add_argument("--max-rows", type=int, default=None, help="split display tables into equations of at most N rows")
+    docx.add_argument("--max-cells", type=int, default=None, help="split display tables into equations of at most N cells")
+    docx.set_defaults(run=_run_docx)
+
+    srv = commands.add_parser("serve", help="run a local HTTP conversion service (POST /convert, /convert/batch)")
+    srv.add_argument("--host", default=DEFAULT_HOST)
+    srv.add_argument("--port", type=int, default=DEFAULT_PORT)
+    srv.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count, 1 = one worker thread)")
+    srv.add_argument("--max-pending", type=int, default=256, help="conversions queued before new requests wait")
+    srv.set_defaults(run=_run_serve)
+
+    args = parser.parse_args(argv)
+    if args.macros:
+        set_macro_table(load_macro_files(args.macros))
+    if args.serve_stdio:
+        return serve_stdio()
+    if args.command is None:
+        parser.error("a command or --serve-stdio is required")
+    if args.command == "convert" and args.jobs and args.jobs > 1:
+        # the row-parallel converter writes whole, unsplit MathML/OMML only
+        if args.compact or args.max_rows is not None or args.max_cells is not None:
+            conv.error("--jobs cannot be combined with --compact, --max-rows or --max-cells")
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
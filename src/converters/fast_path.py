@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+
+# Direct LaTeX -> Word MathML for the common inline subset: letters, numbers,
+# plain operators, Greek letters and a few symbols, ^/_ scripts, \frac and
+# braced groups.  It reproduces what latex2mathml followed by the Word
+# rewrites in latex_to_mathml produces for that subset (the only rewrite that
+# can apply is the unary minus one) without building an ElementTree.  Anything
+# else returns None and the caller falls back to the full pipeline.
+
+_MATH_OPEN = '<math xmlns="http://www.w3.org/1998/Math/MathML" display="block">'
+_PREFIX_MINUS = '<mo form="prefix" lspace="0" rspace="0">−</mo>'
+
+# Number tokens in latex2mathml; digits followed by a unit are dimensions
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_DIMENSION_RE = re.compile(r"\d\s*(?:in|mm|cm|pt|em|ex|pc|bp|dd|cc|sp|mu)")
+_COMMAND_RE = re.compile(r"\\[a-zA-Z]+")
+
+# Single characters as latex2mathml emits them: (tag, text, attributes)
+_CHAR_ATOMS = {
+    "+": ("mo", "+", ""),
+    "-": ("mo", "−", ""),
+    "=": ("mo", "=", ""),
+    ",": ("mo", ",", ""),
+    "/": ("mo", "/", ""),
+    "*": ("mo", "*", ""),
+    "!": ("mo", "!", ""),
+    "?": ("mo", "?", ""),
+    ".": ("mo", ".", ""),
+    ";": ("mi", ";", ""),
+    ":": ("mi", ":", ""),
+    "(": ("mo", "(", ' stretchy="false"'),
+    ")": ("mo", ")", ' stretchy="false"'),
+    "[": ("mo", "[", ' stretchy="false"'),
+    "]": ("mo", "]", ' stretchy="false"'),
+}
+
+_COMMAND_ATOMS = {
+    **{
+        f"\\{name}": ("mi", char, "")
+        for name, char in (
+            ("alpha", "α"), ("beta", "β"), ("gamma", "γ"), ("delta", "δ"), ("epsilon", "ϵ"),
+            ("varepsilon", "ε"), ("zeta", "ζ"), ("eta", "η"), ("theta", "θ"), ("vartheta", "ϑ"),
+            ("iota", "ι"), ("kappa", "κ"), ("lambda", "λ"), ("mu", "μ"), ("nu", "ν"), ("xi", "ξ"),
+            ("pi", "π"), ("varpi", "ϖ"), ("rho", "ρ"), ("varrho", "ϱ"), ("sigma", "σ"),
+            ("varsigma", "ς"), ("tau", "τ"), ("upsilon", "υ"), ("phi", "ϕ"), ("varphi", "φ"),
+            ("chi", "χ"), ("psi", "ψ"), ("omega", "ω"), ("Gamma", "Γ"), ("Delta", "Δ"),
+            ("Theta", "Θ"), ("Lambda", "Λ"), ("Xi", "Ξ"), ("Pi", "Π"), ("Sigma", "Σ"),
+            ("Upsilon", "Υ"), ("Phi", "Φ"), ("Psi", "Ψ"), ("Omega", "Ω"), ("pm", "±"),
+            ("ldots", "…"), ("ell", "ℓ"), ("hbar", "ℏ"),
+        )
+    },
+    **{
+        f"\\{name}": ("mo", char, "")
+        for name, char in (
+            ("cdot", "·"), ("times", "×"), ("mp", "∓"), ("le", "≤"), ("leq", "≤"), ("ge", "≥"),
+            ("geq", "≥"), ("ne", "≠"), ("neq", "≠"), ("approx", "≈"), ("equiv", "≡"), ("to", "→"),
+            ("rightarrow", "→"), ("in", "∈"), ("cdots", "⋯"), ("partial", "∂"), ("nabla", "∇"),
+            ("propto", "∝"), ("div", "÷"), ("ast", "*"), ("circ", "∘"),
+        )
+    },
+    # _normalize_infty_mi turns the operator into an upright identifier
+    "\\infty": ("mi", "∞", ' mathvariant="normal"'),
+}
+
+_FRAC_COMMANDS = frozenset({"\\frac"})
+
+# Same operator list as is_unary_position in latex_to_mathml
+_UNARY_AFTER = frozenset(("(", "[", "{", ",", "=", "+", "−", "×", "·", "/", "*", ":", ";"))
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class _Parser:
+    def __init__(self, s: str) -> None:
+        self._s = s
+        self._pos = 0
+
+    def parse(self) -> list:
+        row = self._row(top=True)
+        if self._pos != len(self._s):
+            raise _Unsupported
+        return row
+
+    def _skip_spaces(self) -> None:
+        s = self._s
+        while self._pos < len(s) and s[self._pos] == " ":
+            self._pos += 1
+
+    def _row(self, *, top: bool) -> list:
+        s = self._s
+        row: list = []
+        while True:
+            self._skip_spaces()
+            if self._pos >= len(s):
+                if not top:
+                    raise _Unsupported
+                return row
+            ch = s[self._pos]
+            if ch == "}":
+                if top:
+                    raise _Unsupported
+                self._pos += 1
+                return row
+            if ch in "^_":
+                if not row or row[-1][0] not in ("mi", "mn", "mrow"):
+                    raise _Unsupported
+                row[-1] = self._scripts(row[-1])
+                continue
+            row.append(self._atom())
+
+    def _atom(self):
+        s = self._s
+        ch = s[self._pos]
+        if ch.isascii() and ch.isalpha():
+            self._pos += 1
+            return ("mi", ch, "")
+        if ch.isdigit():
+            m = _NUMBER_RE.match(s, self._pos)
+            self._pos = m.end()
+            return ("mn", m.group(), "")
+        if ch == "{":
+            self._pos += 1
+            return ("mrow", self._row(top=False))
+        if ch == "\\":
+            m = _COMMAND_RE.match(s, self._pos)
+            if m is None:
+                raise _Unsupported
+            name = m.group()
+            self._pos = m.end()
+            if name in _FRAC_COMMANDS:
+                return ("mfrac", self._argument(frac=True), self._argument(frac=True))
+            atom = _COMMAND_ATOMS.get(name)
+            if atom is None:
+                raise _Unsupported
+            return atom
+        if ch == "." and s[self._pos + 1:self._pos + 2].isdigit():
+            raise _Unsupported
+        atom = _CHAR_ATOMS.get(ch)
+        if atom is None:
+            raise _Unsupported
+        self._pos += 1
+        return atom
+
+    def _argument(self, *, frac: bool = False):
+        if not frac:
+            if self._pos >= len(self._s):
+                raise _Unsupported
+        else:
+            self._skip_spaces()
+            if self._pos >= len(self._s):
+                raise _Unsupported
+        s = self._s
+        ch = s[self._pos]
+        if ch.isdigit():
+            # latex2mathml takes a single digit after ^, _ and \frac12, but the
+            # whole run for the denominator in \frac{x}12
+            self._pos += 1
+            following = s[self._pos:self._pos + 1]
+            if following == "." or (frac and following.isdigit()):
+                raise _Unsupported
+            return ("mn", ch, "")
+        if ch.isascii() and ch.isalpha():
+            self._pos += 1
+            return ("mi", ch, "")
+        if ch == "{":
+            self._pos += 1
+            return ("mrow", self._row(top=False))
+        if ch == "\\":
+            m = _COMMAND_RE.match(s, self._pos)
+            atom = _COMMAND_ATOMS.get(m.group()) if m is not None else None
+            if atom is None:
+                raise _Unsupported
+            self._pos = m.end()
+            return atom
+        raise _Unsupported
+
+    def _scripts(self, base):
+        sub = sup = None
+        s = self._s
+        while self._pos < len(s) and s[self._pos] in "^_":
+            op = s[self._pos]
+            self._pos += 1
+            arg = self._argument()
+            if op == "_":
+                if sub is not None:
+                    raise _Unsupported
+                sub = arg
+            else:
+                if sup is not None:
+                    raise _Unsupported
+                sup = arg
+        if sub is not None and sup is not None:
+            return ("msubsup", base, sub, sup)
+        if sub is not None:
+            return ("msub", base, sub)
+        return ("msup", base, sup)
+
+
+def _is_unary_position(prev) -> bool:
+    if prev is None:
+        return True
+    if prev[0] == "mo":
+        return prev[2] == " prefix" or prev[1] in _UNARY_AFTER
+    return False
+
+
+def _apply_unary_minus(row: list) -> list:
+    out: list = []
+    i = 0
+    n = len(row)
+    while i < n:
+        node = row[i]
+        if node[0] == "mo" and node[1] == "−" and i + 1 < n and _is_unary_position(out[-1] if out else None):
+            nxt = row[i + 1]
+            if nxt[0] == "mn":
+                out.append(("mn", "−" + nxt[1], nxt[2]))
+                i += 2
+                continue
+            node = ("mo", "−", " prefix")
+        out.append(node)
+        i += 1
+    return out
+
+
+def _emit(node, out: list) -> None:
+    kind = node[0]
+    if kind in ("mi", "mn", "mo"):
+        if kind == "mo" and node[2] == " prefix":
+            out.append(_PREFIX_MINUS)
+        else:
+            out.append(f"<{kind}{node[2]}>{node[1]}</{kind}>")
+    elif kind == "mrow":
+        row = _apply_unary_minus(node[1])
+        if not row:
+            out.append("<mrow />")
+            return
+        out.append("<mrow>")
+        for child in row:
+            _emit(child, out)
+        out.append("</mrow>")
+    else:
+        out.append(f"<{kind}>")
+        for child in node[1:]:
+            _emit(child, out)
+        out.append(f"</{kind}>")
+
+
+def convert_simple(latex: str) -> str | None:
+    if not latex or _DIMENSION_RE.search(latex):
+        return None
+    try:
+        row = _Parser(latex).parse()
+    except _Unsupported:
+        return None
+    if not row:
+        return None
+    out = [_MATH_OPEN]
+    for node in _apply_unary_minus(row):
+        _emit(node, out)
+    out.append("</math>")
+    return "".join(out)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import copy
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import Executor
+
+from src.converters import latex_to_mathml as l2m
+from src.converters.mathml_to_omml import mathml_to_omml
+from src.utils.latex_cleaner import canonicalize_latex
+
+# Edit-and-recopy of a long aligned block or matrix.  The formula is split
+# into its rows (at top-level \\, keeping braces and nested environments
+# whole), each row is converted on its own inside a three-row table of the
+# same environment whose other rows are placeholders, so that latex2mathml
+# sees it where it stands in the original (a leading -1 reads differently at
+# the start of the environment than after \\), and the rows are put back
+# into one mtable whose layout (column count, columnalign, columnspacing) is
+# recomputed by the table passes of latex_to_mathml.  A converter remembers
+# the rows of its previous input, so after an edit only the rows that changed
+# are converted and parsed again.  Anything the row split cannot reproduce
+# exactly (numbered environments, empty rows, runs of empty cells, \hline,
+# style, font and size switches, fences that pair across rows) takes the normal path.
+# Given an executor, the rows a call has to convert go to its workers (a
+# 200x200 matrix is 200 independent row conversions); parsing them and the
+# reassembly stay in the calling thread.
+
+_ROW_ENVIRONMENTS = frozenset({
+    "aligned", "gathered", "gather*", "split", "align*",
+    "matrix", "pmatrix", "bmatrix", "Bmatrix", "vmatrix", "Vmatrix", "cases",
+})
+# cells of these are mtd elements; two empty ones in a row change the whole table
+_CELL_ENVIRONMENTS = frozenset({"matrix", "pmatrix", "bmatrix", "Bmatrix", "vmatrix", "Vmatrix", "cases", "split", "align*"})
+_CROSS_ROW_COMMANDS = frozenset({
+    "\\hline", "\\cline", "\\tag", "\\label", "\\multicolumn", "\\intertext",
+    # switches: latex2mathml applies them to everything after, later rows included
+    "\\displaystyle", "\\textstyle", "\\scriptstyle", "\\scriptscriptstyle", "\\color",
+    "\\rm", "\\bf", "\\it", "\\sf", "\\tt", "\\cal", "\\frak",
+    "\\tiny", "\\Tiny", "\\scriptsize", "\\footnotesize", "\\small", "\\normalsize",
+    "\\large", "\\Large", "\\LARGE", "\\huge", "\\Huge",
+})
+# a row where these do not pair up among themselves can pair with another
+# row's in the full conversion
+_BARS = frozenset({"|", "\\vert", "\\lvert", "\\rvert", "\\mid"})
+_DOUBLE_BARS = frozenset({"\\|", "\\Vert", "\\lVert", "\\rVert"})
+_SIZED = {
+    f"\\{size}{side}": side
+    for size in ("big", "Big", "bigg", "Bigg")
+    for side in ("", "l", "r", "m")
+}
+# below this the row bookkeeping costs more than it saves
+_MIN_ROWS = 8
+# fewer rows to convert than this are converted in the calling thread
+_PARALLEL_MIN_ROWS = 16
+# placeholder rows, without and with an alignment tab
+_FILLER_ROWS = ("x", "x&x")
+
+_ENV_RE = re.compile(r"\\begin\{([a-zA-Z]+\*?)\}(.*)\\end\{\1\}", re.S)
+_TOKEN_RE = re.compile(r"\\[a-zA-Z]+\*?|\\.|.", re.S)
+
+_MTABLE = f"{{{l2m.NS_URI}}}mtable"
+_MTR = f"{{{l2m.NS_URI}}}mtr"
+
+
+def _fences_paired(tokens) -> bool:
+    bars = double_bars = unsided = sided = left = 0
+    for tok in tokens:
+        if tok in _BARS:
+            bars += 1
+        elif tok in _DOUBLE_BARS:
+            double_bars += 1
+        elif tok in _SIZED:
+            side = _SIZED[tok]
+            if side == "":
+                unsided += 1
+            elif side != "m":
+                sided += 1 if side == "l" else -1
+        elif tok == "\\left":
+            left += 1
+        elif tok == "\\right":
+            left -= 1
+            if left < 0:
+                return False
+    return not (bars % 2 or double_bars % 2 or unsided % 2 or sided or left)
+
+
+def split_rows(key: str):
+    # canonical LaTeX -> (environment, [row, ...], index of the row with the
+    # most cells, whether any row has a tab), or None when the formula is not
+    # one row environment that can be converted row by row
+    m = _ENV_RE.fullmatch(key)
+    if m is None or m.group(1) not in _ROW_ENVIRONMENTS:
+        return None
+    env = m.group(1)
+    rows = []
+    cells = [[]]
+    depth = 0
+    for tok in _TOKEN_RE.findall(m.group(2)):
+        if tok in _CROSS_ROW_COMMANDS:
+            return None
+        if tok == "{" or tok == "\\begin":
+            depth += 1
+        elif tok == "}" or tok == "\\end":
+            depth -= 1
+            if depth < 0:
+                return None  # the environment closes early: not one block
+        elif depth == 0 and tok == "\\\\":
+            rows.append(cells)
+            cells = [[]]
+            continue
+        elif depth == 0 and tok == "&":
+            cells.append([])
+        cells[-1].append(tok)
+    rows.append(cells)
+    if any(not "".join(tok for c in row for tok in c).strip() for row in rows):
+        return None
+    if not all(_fences_paired(tok for c in row for tok in c) for row in rows):
+        return None
+    if env in _CELL_ENVIRONMENTS:
+        for row in rows:
+            empty = [not "".join(c).strip("& ") for c in row]
+            if any(a and b for a, b in zip(empty, empty[1:])):
+                return None  # compressed across the whole table
+    widest = max(range(len(rows)), key=lambda i: len(rows[i]))
+    return env, ["".join(tok for c in row for tok in c) for row in rows], widest, len(rows[widest]) > 1
+
+
+class IncrementalConverter:
+    # Not shared between unrelated inputs: it only pays off when successive
+    # calls are edits of one formula.  Safe to call from several threads.
+    def __init__(
+        self, *, profile: str = "word", min_rows: int = _MIN_ROWS, executor: Executor | None = None
+    ) -> None:
+        self._target = l2m._profile(profile)
+        self._min_rows = min_rows
+        # process pools only pay off for rows of many cells; the caller owns it
+        self._executor = executor
+        self._lock = threading.Lock()
+        # (position, row LaTeX, tabs) -> parsed result, for the previous input only
+        self._env: str | None = None
+        self._rows: dict[tuple, ET.Element] = {}
+        self._stats = {"formulas": 0, "incremental": 0, "rows_converted": 0, "rows_reused": 0, "rows_parallel": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def convert(self, latex: str, *, output: str = "mathml", annotate=False) -> str:
+        if output not in l2m.OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format: {output!r}")
+        key = canonicalize_latex(latex)
+        profile = self._target.name
+        with self._lock:
+            self._stats["formulas"] += 1
+            mathml = self._convert_rows(key)
+        if mathml is None:
+            result = l2m._convert_canonical(key, output, None, False, profile)
+        elif output == "omml":
+            result = mathml_to_omml(mathml)
+        else:
+            result = mathml
+        return l2m._annotated(result, output, latex) if annotate else result
+
+    def _convert_rows(self, key: str):
+        if not self._target.rewrite or self._target.compact:
+            return None
+        split = split_rows(key)
+        if split is None or len(split[1]) < self._min_rows:
+            return None
+        env, rows, widest, tabs = split
+        previous = self._rows if env == self._env else {}
+        keys = [(min(i, 1) if i < len(rows) - 1 else 2, row, tabs) for i, row in enumerate(rows)]
+        parsed = {key: previous[key] for key in keys if key in previous}
+        self._stats["rows_reused"] += len(parsed)
+        todo = [key for key in dict.fromkeys(keys) if key not in parsed]
+        for key, mathml in zip(todo, self._convert_row_texts(env, todo)):
+            table = _parse_row(mathml, key[0])
+            if table is None:
+                self._env, self._rows = None, {}
+                return None
+            parsed[key] = table
+        self._stats["rows_converted"] += len(todo)
+        self._env, self._rows = env, parsed
+        self._stats["incremental"] += 1
+
+        # table attributes that latex2mathml derives from the column count
+        # come from the widest row; the layout passes redo the rest
+        root = copy.deepcopy(parsed[keys[widest]][0])
+        mtable = next(root.iter(_MTABLE))
+        mtable[:] = [copy.deepcopy(parsed[key][1]) for key in keys]
+        l2m._normalize_mtable_layout(root)
+        l2m._normalize_regular_mtable_layout(root)
+        return l2m._tostring(root)
+
+    def _convert_row_texts(self, env: str, keys: list) -> list[str]:
+        profile = self._target.name
+        executor = self._executor
+        if executor is None or len(keys) < _PARALLEL_MIN_ROWS:
+            return [_convert_row(env, *key, profile) for key in keys]
+        self._stats["rows_parallel"] += len(keys)
+        jobs = os.cpu_count() or 1
+        chunksize = max(1, len(keys) // (jobs * 4))
+        args = [(env, *key, profile) for key in keys]
+        return list(executor.map(_convert_row, *zip(*args), chunksize=chunksize))
+
+
+def _convert_row(env: str, position: int, row: str, tabs: bool, profile: str) -> str:
+    # MathML of the row at position 0, 1, 2 (first, middle, last) of a
+    # three-row table; module level so that process pools can run it
+    filler = _FILLER_ROWS[tabs]
+    rows = [filler, filler]
+    rows.insert(position, row)
+    body = "\\\\".join(rows)
+    return l2m._convert_canonical(f"\\begin{{{env}}}{body}\\end{{{env}}}", "mathml", None, False, profile)
+
+
+def _parse_row(mathml: str, position: int):
+    # -> (root, the row's mtr), or None when the row did not stay one row
+    try:
+        root = ET.fromstring(mathml)
+    except ET.ParseError:
+        return None
+    mtable = next(root.iter(_MTABLE), None)
+    if mtable is None or len(mtable) != 3 or any(tr.tag != _MTR for tr in mtable):
+        return None
+    return root, mtable[position]
@@ -1,58 +1,243 @@
+import copy
+import html
 import re
+import threading
 import xml.etree.ElementTree as ET
-import unicodedata
-from src.utils.latex_cleaner import normalize_input
+from collections import OrderedDict, namedtuple
+from src.converters.fast_path import convert_simple
+from src.converters.math_alphanumerics import MATH_ALPHANUMERICS
+from src.converters.mathml_to_latex import annotate_mathml
+from src.converters.mathml_to_omml import mathml_to_omml
+from src.converters.shared_cache import key_digest
+from src.utils.latex_cleaner import canonicalize_latex, normalize_input
 
 NAMESPACES = {'m': 'http://www.w3.org/1998/Math/MathML'}
 NS_URI = NAMESPACES['m']
 
-def _register_namespaces():
-    try:
-        ET.register_namespace('', NS_URI)
-    except:
-        pass
+_NS_PREFIX = f'{{{NS_URI}}}'
+
+def _tostring(root) -> str:
+    # Writes the MathML namespace as a plain xmlns attribute rather than
+    # relying on ET.register_namespace, a process-wide table other code can
+    # change.  The tree is the caller's own copy, so its tags are rewritten in
+    # place.  convert() keeps no other shared state outside the locked caches
+    # and stats, so it can be called from any number of threads.
+    if not root.tag.startswith(_NS_PREFIX):
+        return ET.tostring(root, encoding='unicode', short_empty_elements=True)
+    for el in root.iter():
+        if el.tag.startswith(_NS_PREFIX):
+            el.tag = el.tag[len(_NS_PREFIX):]
+    attrib = {'xmlns': NS_URI, **root.attrib}
+    root.attrib.clear()
+    root.attrib.update(attrib)
+    return ET.tostring(root, encoding='unicode', short_empty_elements=True)
 
-_register_namespaces()
+# Compiled once at import so the first conversion does not pay for it
+_BARE_AMP_RE = re.compile(r'&(?!(?:[a-zA-Z0-9]+|#[0-9]+|#x[0-9a-fA-F]+);)')
+_MO_DOUBLE_BAR_RE = re.compile(r'(<mo[^>]*>)\s*\\\|\s*(?=</mo>)')
+_MO_LBRACE_RE = re.compile(r'(<mo[^>]*>)\s*\\\{\s*(?=</mo>)')
+_MO_RBRACE_RE = re.compile(r'(<mo[^>]*>)\s*\\\}\s*(?=</mo>)')
+
+class _LruCache:
+    # Bounded by the summed cost of its entries rather than by entry count.
+    # The plan, subtree and result caches are separate instances, each with
+    # its own budget and stats: their costs are in different units
+    # (characters, nodes), so they do not share one LRU.
+    def __init__(self, max_cost: int) -> None:
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_cost = max_cost
+        self._cost = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result, cost: int) -> None:
+        if cost > self._max_cost:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._cost -= old[1]
+            self._entries[key] = (result, cost)
+            self._cost += cost
+            self._evict_over_budget()
+
+    def resize(self, max_cost: int) -> None:
+        with self._lock:
+            self._max_cost = max(0, int(max_cost))
+            self._evict_over_budget()
+
+    def _evict_over_budget(self) -> None:
+        while self._cost > self._max_cost and self._entries:
+            _, (_, evicted_cost) = self._entries.popitem(last=False)
+            self._cost -= evicted_cost
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._cost = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'cost': self._cost,
+                'max_cost': self._max_cost,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+# Shape plans: formulas such as T_{1} ... T_{6} produce the same latex2mathml
+# markup except for identifier and number texts.  Those texts are swapped for
+# private-use placeholder characters (one per distinct text, in order of first
+# appearance) and the rewritten output for that "shape" is cached, so a later
+# formula of the same family only needs a lookup and a character translation.
+# Leaves whose text steers a rewrite (empty, '&', '∞', signed numbers, styled
+# math alphanumerics) stay part of the shape.
+_PLAN_SLOT_BASE = 0xF0000
+_PLAN_SLOT_LIMIT = 0xFFFFE - _PLAN_SLOT_BASE
+_PLAN_CACHE_DEFAULT_BUDGET = 4_000_000  # stored characters (shapes + templates)
+_PLAN_LEAF_RE = re.compile(r'<(mi|mn)((?:\s[^>]*)?)>([^<]+)</\1>')
+_PLAN_RESERVED_RE = re.compile(
+    '[\U000F0000-\U000FFFFF]|&#[xX]0*[fF][0-9a-fA-F]{4};|&#0*(?:9[89][0-9]{4}|10[0-4][0-9]{4});'
+)
+
+_plan_cache = _LruCache(_PLAN_CACHE_DEFAULT_BUDGET)
+
+def get_plan_cache_stats() -> dict:
+    return _plan_cache.stats()
+
+def clear_plan_cache() -> None:
+    _plan_cache.clear()
+
+def set_plan_cache_budget(max_chars: int) -> None:
+    _plan_cache.resize(max_chars)
+
+def _is_plan_leaf(tag: str, text: str) -> bool:
+    if not text.strip():
+        return False
+    if tag == 'mn':
+        return not text.startswith(('−', '-'))
+    if text in ('&', '∞', '⊤'):
+        return False
+    if text in MATH_ALPHANUMERICS:
+        return False
+    return True
+
+def _plan_shape(s: str):
+    if _PLAN_RESERVED_RE.search(s):
+        return None, None
+    slots = {}
+    pieces = []
+    pos = 0
+    for m in _PLAN_LEAF_RE.finditer(s):
+        text = m.group(3)
+        if '&' in text:
+            text = html.unescape(text)
+        if not _is_plan_leaf(m.group(1), text):
+            continue
+        slot = slots.get(text)
+        if slot is None:
+            if len(slots) >= _PLAN_SLOT_LIMIT:
+                return None, None
+            slot = slots[text] = chr(_PLAN_SLOT_BASE + len(slots))
+        pieces.append(s[pos:m.start(3)])
+        pieces.append(slot)
+        pos = m.end(3)
+    pieces.append(s[pos:])
+    return ''.join(pieces), slots
+
+def _fill_plan(template: str, slots) -> str:
+    table = {
+        ord(slot): text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        for text, slot in slots.items()
+    }
+    return template.translate(table)
 
-def _normalize_mathml_output(s: str) -> str:
+def _normalize_mathml_output(s: str, profile=None) -> str:
+    if profile is None:
+        profile = PROFILES['word']
+    if not profile.xml_fixes:
+        return s
     # Fix invalid XML entities (specifically unescaped &)
     # latex2mathml might output <mi>&</mi> for alignment tabs
     # Regex to find & not followed by entity pattern
-    s = re.sub(r'&(?!(?:[a-zA-Z0-9]+|#[0-9]+|#x[0-9a-fA-F]+);)', '&amp;', s)
+    s = _BARE_AMP_RE.sub('&amp;', s)
     
     # Replace \| with ‖ (U+2016) in mo elements
     # latex2mathml outputs \| for \Bigl\| but &#x02016; for \|
     # We want consistent ‖
-    s = re.sub(r'(<mo[^>]*>)\s*\\\|\s*(?=</mo>)', r'\1‖', s)
+    s = _MO_DOUBLE_BAR_RE.sub(r'\1‖', s)
     
     # Replace \{ and \} with { and } in mo elements
-    s = re.sub(r'(<mo[^>]*>)\s*\\\{\s*(?=</mo>)', r'\1{', s)
-    s = re.sub(r'(<mo[^>]*>)\s*\\\}\s*(?=</mo>)', r'\1}', s)
-    
+    s = _MO_LBRACE_RE.sub(r'\1{', s)
+    s = _MO_RBRACE_RE.sub(r'\1}', s)
+    if not profile.rewrite:
+        return s
+
+    shape, slots = _plan_shape(s)
+    if shape is None:
+        out = _rewrite_mathml_for_word(s, profile)
+        return s if out is None else out
+
+    template = _plan_cache.get((profile.bits, shape))
+    if template is None:
+        template = _rewrite_mathml_for_word(shape, profile)
+        if template is None:
+            return s
+        _plan_cache.put((profile.bits, shape), template, len(shape) + len(template))
+    return _fill_plan(template, slots)
+
+def _rewrite_mathml_for_word(s: str, profile=None):
     try:
         # latex2mathml usually includes xmlns
         root = ET.fromstring(s)
     except ET.ParseError as e:
         # print(f"DEBUG: ParseError: {e}")
-        # If parsing fails, return original string (or try to fix common issues)
-        return s
+        # If parsing fails, the caller returns the original string
+        return None
+
+    features = _scan_features(root) | (profile.bits if profile is not None else 0)
+    _record_pass_stats(features)
 
-    _strip_sized_fence_limits_for_word(root)
+    if features & _F_SIZED_FENCE:
+        _strip_sized_fence_limits_for_word(root)
 
     # Transform the tree recursively
-    _transform_element(root)
+    _transform_element(root, features)
 
     if root.tag == f'{{{NS_URI}}}math' and len(root) == 1 and root[0].tag == f'{{{NS_URI}}}mrow' and not root[0].attrib:
         wrapper = root[0]
         root[:] = list(wrapper)
 
+    if profile is not None and profile.compact:
+        _compact_element(root, False)
+
     # Ensure display="block"
     if 'display' not in root.attrib:
         root.set('display', 'block')
     else:
         root.set('display', 'block')
 
-    return ET.tostring(root, encoding='unicode', short_empty_elements=True)
+    return _tostring(root)
 
 def _strip_sized_fence_limits_for_word(element):
     mo_tag = f'{{{NS_URI}}}mo'
@@ -177,7 +362,7 @@ def _normalize_unary_minus_for_word(element):
 
     element[:] = new_children
 
-def _normalize_bold_math_alphanum(element):
+def _normalize_math_alphanum(element):
     mi_tag = f'{{{NS_URI}}}mi'
     mrow_tag = f'{{{NS_URI}}}mrow'
 
@@ -188,21 +373,15 @@ def _normalize_bold_math_alphanum(element):
             continue
         if child.get('mathvariant') is not None:
             continue
-        text = child.text or ''
-        if len(text) != 1:
+        styled = MATH_ALPHANUMERICS.get(child.text)
+        if styled is None:
             continue
 
-        base = unicodedata.normalize('NFKD', text)
-        if len(base) != 1 or base == text:
+        child.text, variant = styled
+        child.set('mathvariant', variant)
+        if variant != 'bold':
             continue
 
-        name = unicodedata.name(text, '')
-        if 'MATHEMATICAL' not in name:
-            continue
-
-        child.text = base
-        child.set('mathvariant', 'bold')
-
         wrapper = ET.Element(mrow_tag)
         wrapper.set('data-mjx-texclass', 'ORD')
         wrapper.append(child)
@@ -296,18 +475,9 @@ def _normalize_mtable_layout(element):
                 blk.insert(1, ET.Element(mi_tag))
 
         mtable.set('displaystyle', 'true')
-        mtable.set(
-            'columnalign',
-            ' '.join('right' if idx % 2 == 0 else 'left' for idx in range(max_blocks)),
-        )
-
-        if max_blocks >= 4:
-            mtable.set(
-                'columnspacing',
-                ' '.join('2em' if (i % 2 == 0) else '0em' for i in range(1, max_blocks)),
-            )
-        else:
-            mtable.set('columnspacing', '0em')
+        columnalign, columnspacing = _column_layout(max_blocks)
+        mtable.set('columnalign', columnalign)
+        mtable.set('columnspacing', columnspacing)
 
         if len(rows) == 2 and max_blocks >= 4:
             has_sized = any(('minsize' in mo.attrib or 'maxsize' in mo.attrib) for mo in mtable.iter(mo_tag))
@@ -318,6 +488,24 @@ def _normalize_mtable_layout(element):
                 if has_if:
                     mtable.set('rowspacing', '0.9em 0.3em')
 
+def _column_layout(count: int):
+    # (columnalign, columnspacing) of a table with count alternating
+    # right/left alignment columns
+    columnalign = ' '.join('right' if idx % 2 == 0 else 'left' for idx in range(count))
+    if count >= 4:
+        columnspacing = ' '.join('2em' if (i % 2 == 0) else '0em' for i in range(1, count))
+    else:
+        columnspacing = '0em'
+    return columnalign, columnspacing
+
+def _table_columns(rows, mtd_tag):
+    # One scan of a table: the mtd cells of each row and, per cell, whether
+    # it is empty.  The layout decisions below are made on these lists
+    # instead of searching the rows again for every question.
+    cells = [r.findall(mtd_tag) for r in rows]
+    empty = [[len(mtd) == 0 and not (mtd.text or '').strip() for mtd in row] for row in cells]
+    return cells, empty
+
 def _normalize_regular_mtable_layout(element):
     mtable_tag = f'{{{NS_URI}}}mtable'
     mtr_tag = f'{{{NS_URI}}}mtr'
@@ -328,87 +516,54 @@ def _normalize_regular_mtable_layout(element):
         if not rows:
             continue
 
-        has_multi_mtd = any(len(r.findall(mtd_tag)) != 1 for r in rows)
-        if not has_multi_mtd:
+        cells, empty = _table_columns(rows, mtd_tag)
+        if all(len(row) == 1 for row in cells):
             continue
 
-        def is_empty_cell(mtd) -> bool:
-            return len(mtd) == 0 and not (mtd.text or '').strip()
-
-        cols_per_row = [r.findall(mtd_tag) for r in rows]
-        if cols_per_row and all(len(cols) >= 2 for cols in cols_per_row):
-            if all(is_empty_cell(cols[0]) for cols in cols_per_row):
-                for r, cols in zip(rows, cols_per_row):
-                    r.remove(cols[0])
-
-                columnalign = (mtable.get('columnalign') or '').strip()
-                if columnalign:
-                    parts = columnalign.split()
-                    parts = parts[1:] if len(parts) > 1 else ['left']
-                    mtable.set('columnalign', ' '.join(parts))
-
-                columnspacing = (mtable.get('columnspacing') or '').strip()
-                if columnspacing:
-                    parts = columnspacing.split()
-                    parts = parts[1:] if len(parts) > 1 else []
-                    if parts:
-                        mtable.set('columnspacing', ' '.join(parts))
-                    else:
-                        mtable.attrib.pop('columnspacing', None)
-
-        should_compress = False
-        for r in rows:
-            mtds = r.findall(mtd_tag)
-            for a, b in zip(mtds, mtds[1:]):
-                if is_empty_cell(a) and is_empty_cell(b):
-                    should_compress = True
-                    break
-            if should_compress:
-                break
+        if all(len(row) >= 2 and flags[0] for row, flags in zip(cells, empty)):
+            for r, row in zip(rows, cells):
+                r.remove(row[0])
+            cells = [row[1:] for row in cells]
+            empty = [flags[1:] for flags in empty]
+
+            columnalign = (mtable.get('columnalign') or '').strip()
+            if columnalign:
+                parts = columnalign.split()
+                parts = parts[1:] if len(parts) > 1 else ['left']
+                mtable.set('columnalign', ' '.join(parts))
+
+            columnspacing = (mtable.get('columnspacing') or '').strip()
+            if columnspacing:
+                parts = columnspacing.split()
+                parts = parts[1:] if len(parts) > 1 else []
+                if parts:
+                    mtable.set('columnspacing', ' '.join(parts))
+                else:
+                    mtable.attrib.pop('columnspacing', None)
 
-        if not should_compress:
+        if not any(a and b for flags in empty for a, b in zip(flags, flags[1:])):
             continue
 
-        for r in rows:
-            mtds = r.findall(mtd_tag)
-            new_mtds = []
-            prev_empty = False
-            for cell in mtds:
-                empty = is_empty_cell(cell)
-                if empty and prev_empty:
-                    continue
-                new_mtds.append(cell)
-                prev_empty = empty
-            if len(new_mtds) != len(mtds):
-                r[:] = new_mtds
-
-        max_cols = 0
-        for r in rows:
-            cols = len(r.findall(mtd_tag))
-            if cols > max_cols:
-                max_cols = cols
+        # an empty cell right after an empty cell is dropped
+        counts = []
+        for r, row, flags in zip(rows, cells, empty):
+            kept = [cell for i, cell in enumerate(row) if not (i and flags[i] and flags[i - 1])]
+            if len(kept) != len(row):
+                r[:] = kept
+            counts.append(len(kept))
 
+        max_cols = max(counts)
         if max_cols < 2:
             continue
 
-        for r in rows:
-            cols = r.findall(mtd_tag)
-            while len(cols) < max_cols:
+        for r, count in zip(rows, counts):
+            for _ in range(max_cols - count):
                 r.append(ET.Element(mtd_tag))
-                cols = r.findall(mtd_tag)
 
         mtable.set('displaystyle', 'true')
-        mtable.set(
-            'columnalign',
-            ' '.join('right' if idx % 2 == 0 else 'left' for idx in range(max_cols)),
-        )
-        if max_cols >= 4:
-            mtable.set(
-                'columnspacing',
-                ' '.join('2em' if (i % 2 == 0) else '0em' for i in range(1, max_cols)),
-            )
-        else:
-            mtable.set('columnspacing', '0em')
+        columnalign, columnspacing = _column_layout(max_cols)
+        mtable.set('columnalign', columnalign)
+        mtable.set('columnspacing', columnspacing)
 
 def _normalize_ord_wrapper_for_bold(element):
     mrow_tag = f'{{{NS_URI}}}mrow'
@@ -672,9 +827,255 @@ def _flatten_table_markers(element):
                 continue
         i += 1
 
-def _transform_element(element):
+def _unwrap_mrow_around_mfenced(element):
+    simplified = []
+    for child in list(element):
+        if child.tag == f'{{{NS_URI}}}mrow' and not child.attrib and len(child) == 1 and child[0].tag == f'{{{NS_URI}}}mfenced':
+            simplified.append(child[0])
+        else:
+            simplified.append(child)
+    element[:] = simplified
+
+def _build_table_in_place(element):
+    # Post-processing: Check if this element should become a table
+    # Don't convert if it's already mtable or if it's the root math (unless necessary?)
+    # Root math is usually block display.
+    if element.tag != f'{{{NS_URI}}}mtable':
+        table_node = _build_table_if_needed(element)
+        if table_node is not None:
+             element[:] = [table_node]
+
+# Feature pre-scan: one walk over the parsed tree records which constructs
+# occur, and the per-element passes whose preconditions cannot hold are
+# skipped.  "x^2" has no tables, fences or styled letters and only needs
+# fence pairing.  Passes only ever create constructs covered by features that
+# were already present (tables come from alignment markers, ORD wrappers from
+# styled letters or sized fences), so the root scan is valid for every
+# subtree.
+_F_MTABLE = 1 << 0
+_F_ALIGNMENT = 1 << 1
+_F_SIZED_FENCE = 1 << 2
+_F_MINUS = 1 << 3
+_F_MATHVARIANT = 1 << 4
+_F_TEXCLASS = 1 << 5
+_F_NORM_BAR = 1 << 6
+_F_INFINITY = 1 << 7
+_F_TRANSPOSE = 1 << 8
+_F_MSTYLE = 1 << 9
+_F_ALL = (1 << 10) - 1
+
+_FEATURE_NAMES = (
+    (_F_MTABLE, 'mtable'),
+    (_F_ALIGNMENT, 'alignment'),
+    (_F_SIZED_FENCE, 'sized_fence'),
+    (_F_MINUS, 'minus'),
+    (_F_MATHVARIANT, 'mathvariant'),
+    (_F_TEXCLASS, 'texclass'),
+    (_F_NORM_BAR, 'norm_bar'),
+    (_F_INFINITY, 'infinity'),
+    (_F_TRANSPOSE, 'transpose'),
+    (_F_MSTYLE, 'mstyle'),
+)
+
+# (pass, features any of which make it applicable); None means always run
+_ELEMENT_PASSES = (
+    (_normalize_unary_minus_for_word, _F_SIZED_FENCE | _F_MINUS),
+    (_normalize_math_alphanum, _F_MATHVARIANT),
+    (_unwrap_mrow_around_mfenced, None),
+    (_normalize_texclass_wrapper_nesting, _F_TEXCLASS | _F_SIZED_FENCE | _F_MATHVARIANT),
+    (_normalize_sized_fence_texclass, _F_TEXCLASS | _F_SIZED_FENCE),
+    (_normalize_mtable_layout, _F_MTABLE | _F_ALIGNMENT),
+    (_normalize_regular_mtable_layout, _F_MTABLE | _F_ALIGNMENT),
+    (_normalize_nested_mtables, _F_MTABLE | _F_ALIGNMENT),
+    (_normalize_ord_wrapper_for_bold, _F_MATHVARIANT),
+    (_normalize_norm_ord_mo, _F_NORM_BAR),
+    (_normalize_infty_mi, _F_INFINITY),
+    (_normalize_transpose_operator, _F_TRANSPOSE),
+    (_prune_empty_mstyles, _F_MSTYLE),
+    (_build_table_in_place, _F_ALIGNMENT),
+)
+
+# Output profiles.  Each one compiles its ordered pass list once here; the
+# profile index rides in the feature bits above _F_ALL, so per-feature pass
+# lists and the subtree cache keep profiles apart without extra plumbing.
+#   word         every rewrite (the default)
+#   libreoffice  table/fence/symbol cleanup without the Word-only workarounds
+#   web          latex2mathml output with only the XML fixes, for MathJax/browsers
+#   raw          latex2mathml output untouched
+_PROFILE_SHIFT = 10
+_WORD_ONLY_PASSES = frozenset({
+    _normalize_unary_minus_for_word,
+    _normalize_texclass_wrapper_nesting,
+    _normalize_sized_fence_texclass,
+    _normalize_ord_wrapper_for_bold,
+    _normalize_norm_ord_mo,
+})
+
+_Profile = namedtuple('_Profile', 'name bits passes rewrite xml_fixes compact fast_path')
+
+def _compile_profiles():
+    specs = (
+        ('word', _ELEMENT_PASSES, True, True, False, True),
+        ('libreoffice', tuple(p for p in _ELEMENT_PASSES if p[0] not in _WORD_ONLY_PASSES), True, True, True, False),
+        ('web', (), False, True, False, False),
+        ('raw', (), False, False, False, False),
+    )
+    return {
+        name: _Profile(name, index << _PROFILE_SHIFT, passes, rewrite, xml_fixes, compact, fast_path)
+        for index, (name, passes, rewrite, xml_fixes, compact, fast_path) in enumerate(specs)
+    }
+
+PROFILES = _compile_profiles()
+_PROFILES_BY_BITS = {profile.bits: profile for profile in PROFILES.values()}
+
+def _profile(name: str):
+    profile = PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"unknown profile: {name!r}")
+    return profile
+
+_pass_lists = {}
+_pass_stats = {}
+_pass_stats_lock = threading.Lock()
+
+def _passes_for(features: int):
+    passes = _pass_lists.get(features)
+    if passes is None:
+        compiled = _PROFILES_BY_BITS[features & ~_F_ALL].passes
+        passes = tuple(fn for fn, needs in compiled if needs is None or features & needs)
+        _pass_lists[features] = passes
+    return passes
+
+def _scan_features(root) -> int:
+    mo_tag = f'{{{NS_URI}}}mo'
+    mi_tag = f'{{{NS_URI}}}mi'
+    mtable_tag = f'{{{NS_URI}}}mtable'
+    mspace_tag = f'{{{NS_URI}}}mspace'
+    mstyle_tag = f'{{{NS_URI}}}mstyle'
+
+    features = 0
+    for node in root.iter():
+        tag = node.tag
+        text = node.text
+        attrib = node.attrib
+        if tag == mo_tag:
+            if 'minsize' in attrib or 'maxsize' in attrib:
+                features |= _F_SIZED_FENCE
+            if text == '−':
+                features |= _F_MINUS
+            elif text in ('|', '‖'):
+                features |= _F_NORM_BAR
+            elif text == '∞':
+                features |= _F_INFINITY
+            elif text == '⊤':
+                features |= _F_TRANSPOSE
+        elif tag == mi_tag:
+            if text == '&':
+                features |= _F_ALIGNMENT
+            elif text == '∞':
+                features |= _F_INFINITY
+            elif text in MATH_ALPHANUMERICS:
+                features |= _F_MATHVARIANT
+        elif tag == mtable_tag:
+            features |= _F_MTABLE
+        elif tag == mspace_tag:
+            if attrib.get('linebreak') == 'newline':
+                features |= _F_ALIGNMENT
+        elif tag == mstyle_tag:
+            features |= _F_MSTYLE
+        if attrib:
+            if 'data-mjx-texclass' in attrib:
+                features |= _F_TEXCLASS
+            if attrib.get('mathvariant') == 'bold':
+                features |= _F_MATHVARIANT
+    return features
+
+def _record_pass_stats(features: int) -> None:
+    with _pass_stats_lock:
+        _pass_stats[features] = _pass_stats.get(features, 0) + 1
+
+def _feature_class_name(features: int) -> str:
+    names = [name for bit, name in _FEATURE_NAMES if features & bit]
+    name = '+'.join(names) if names else 'plain'
+    profile = _PROFILES_BY_BITS[features & ~_F_ALL]
+    return name if profile.name == 'word' else f'{profile.name}:{name}'
+
+def get_pass_stats() -> dict:
+    with _pass_stats_lock:
+        counts = dict(_pass_stats)
+    report = {}
+    for features, formulas in sorted(counts.items()):
+        run = _passes_for(features)
+        skipped = [fn.__name__ for fn, _ in _ELEMENT_PASSES if fn not in run]
+        report[_feature_class_name(features)] = {
+            'formulas': formulas,
+            'passes_run': len(run),
+            'passes_skipped': len(skipped),
+            'skipped': skipped,
+        }
+    return report
+
+def clear_pass_stats() -> None:
+    with _pass_stats_lock:
+        _pass_stats.clear()
+
+# Formulas from one document repeat whole fragments (matrix cells, the same
+# left-hand side on every line of a derivation).  _transform_element is a pure
+# function of the subtree it is given, so its result can be keyed on the
+# subtree structure and spliced back in on later hits.
+_SUBTREE_CACHE_MIN_NODES = 4
+_SUBTREE_CACHE_DEFAULT_BUDGET = 200_000  # stored nodes (keys + results)
+
+_subtree_cache = _LruCache(_SUBTREE_CACHE_DEFAULT_BUDGET)
+
+def get_subtree_cache_stats() -> dict:
+    return _subtree_cache.stats()
+
+def clear_subtree_cache() -> None:
+    _subtree_cache.clear()
+
+def set_subtree_cache_budget(max_nodes: int) -> None:
+    _subtree_cache.resize(max_nodes)
+
+def _subtree_key(element):
+    # Attribute order is kept as-is because it is also the serialization order
+    size = 1
+    child_keys = []
+    for child in element:
+        child_key, child_size = _subtree_key(child)
+        child_keys.append((child_key, child.tail))
+        size += child_size
+    attrib = tuple(element.attrib.items()) if element.attrib else ()
+    return (element.tag, attrib, element.text, tuple(child_keys)), size
+
+def _transform_element(element, features=None):
+    if features is None:
+        features = _F_ALL
+    key, size = _subtree_key(element)
+    if size < _SUBTREE_CACHE_MIN_NODES:
+        _transform_element_uncached(element, features)
+        return
+
+    key = (features, key)
+    cached = _subtree_cache.get(key)
+    if cached is not None:
+        element.tag = cached.tag
+        element.attrib.clear()
+        element.attrib.update(cached.attrib)
+        element.text = cached.text
+        element[:] = [copy.deepcopy(child) for child in cached]
+        return
+
+    _transform_element_uncached(element, features)
+    result = ET.Element(element.tag, element.attrib)
+    result.text = element.text
+    result[:] = [copy.deepcopy(child) for child in element]
+    _subtree_cache.put(key, result, size + sum(1 for _ in result.iter()))
+
+def _transform_element_uncached(element, features):
     # Flatten mstyle/mrow containing table markers
-    _flatten_table_markers(element)
+    if features & _F_ALIGNMENT:
+        _flatten_table_markers(element)
 
     # Process children to find and replace fence pairs with mfenced
     new_children = []
@@ -877,7 +1278,7 @@ def _transform_element(element):
                          dummy1 = ET.Element('dummy')
                          dummy1.extend(siblings_before)
                          dummy1.append(container_clone_1)
-                         _transform_element(dummy1)
+                         _transform_element(dummy1, features)
                          processed_content = list(dummy1)
                          
                          # Create mfenced
@@ -928,7 +1329,7 @@ def _transform_element(element):
                              container_clone_2.extend(inner_part_2)
                              # We need to process this part too?
                              # Yes, recurse.
-                             _transform_element(container_clone_2)
+                             _transform_element(container_clone_2, features)
                              new_children.append(container_clone_2)
                          
                          i = j + 1
@@ -1003,7 +1404,7 @@ def _transform_element(element):
                     # Create a temporary root to process inner nodes
                     dummy = ET.Element('dummy')
                     dummy.extend(inner_nodes)
-                    _transform_element(dummy) # Recurse!
+                    _transform_element(dummy, features) # Recurse!
                     processed_inner = list(dummy)
                     
                     # Create mfenced
@@ -1067,7 +1468,7 @@ def _transform_element(element):
                      # But we should recurse to handle inner stuff
                      dummy = ET.Element('dummy')
                      dummy.append(children[i+1])
-                     _transform_element(dummy)
+                     _transform_element(dummy, features)
                      processed_table = list(dummy)[0]
 
                      mfenced = ET.Element(f'{{{NS_URI}}}mfenced')
@@ -1084,46 +1485,20 @@ def _transform_element(element):
                      i += 2
                 else:
                     # Treat as normal child
-                    _transform_element(child)
+                    _transform_element(child, features)
                     new_children.append(child)
                     i += 1
         else:
             # Not a fence, recurse
-            _transform_element(child)
+            _transform_element(child, features)
             new_children.append(child)
             i += 1
             
     # Update element children
     element[:] = new_children
-    _normalize_unary_minus_for_word(element)
-    _normalize_bold_math_alphanum(element)
 
-    simplified = []
-    for child in list(element):
-        if child.tag == f'{{{NS_URI}}}mrow' and not child.attrib and len(child) == 1 and child[0].tag == f'{{{NS_URI}}}mfenced':
-            simplified.append(child[0])
-        else:
-            simplified.append(child)
-    element[:] = simplified
-
-    _normalize_texclass_wrapper_nesting(element)
-    _normalize_sized_fence_texclass(element)
-    _normalize_mtable_layout(element)
-    _normalize_regular_mtable_layout(element)
-    _normalize_nested_mtables(element)
-    _normalize_ord_wrapper_for_bold(element)
-    _normalize_norm_ord_mo(element)
-    _normalize_infty_mi(element)
-    _normalize_transpose_operator(element)
-    _prune_empty_mstyles(element)
-    
-    # Post-processing: Check if this element should become a table
-    # Don't convert if it's already mtable or if it's the root math (unless necessary?)
-    # Root math is usually block display.
-    if element.tag != f'{{{NS_URI}}}mtable':
-        table_node = _build_table_if_needed(element)
-        if table_node is not None:
-             element[:] = [table_node]
+    for rewrite in _passes_for(features):
+        rewrite(element)
 
 def _build_table_if_needed(element_or_nodes):
     # Support passing element or list of nodes
@@ -1231,7 +1606,216 @@ def _build_table_if_needed(element_or_nodes):
     return mtable
 
 
-def convert(latex: str) -> str:
-    cleaned = normalize_input(latex)
-    from latex2mathml.converter import convert as l2m_convert
-    return _normalize_mathml_output(l2m_convert(cleaned))
+# Compact output: drop what Word ignores (MathJax texclass hints, separators on
+# single-child mfenced) and collapse wrappers that do not change the layout.
+# Row-like parents take any number of children, so attribute-less mrows in
+# them can be spliced; fixed-arity parents only lose single-child wrappers.
+_ROW_PARENTS = frozenset(f'{{{NS_URI}}}{t}' for t in (
+    'math', 'mrow', 'mtd', 'mstyle', 'msqrt', 'menclose', 'mphantom', 'mpadded', 'merror',
+))
+_compact_stats = {'formulas': 0, 'bytes_before': 0, 'bytes_after': 0}
+_compact_stats_lock = threading.Lock()
+
+def _compact_element(element, keep_rows: bool) -> None:
+    mrow_tag = f'{{{NS_URI}}}mrow'
+    for name in [k for k in element.attrib if k.startswith('data-mjx-')]:
+        del element.attrib[name]
+    if element.tag == f'{{{NS_URI}}}mfenced' and len(element) <= 1 and element.get('separators') is not None:
+        del element.attrib['separators']
+    if element.tag == f'{{{NS_URI}}}mtable' and element.find(f'.//{{{NS_URI}}}maligngroup') is not None:
+        # the aligned layout relies on the exact mrow grouping around maligngroup
+        keep_rows = True
+
+    for child in element:
+        _compact_element(child, keep_rows)
+    if keep_rows:
+        return
+
+    children = []
+    for child in element:
+        if child.tag == mrow_tag and not child.attrib:
+            if element.tag in _ROW_PARENTS:
+                children.extend(child)
+                continue
+            if len(child) == 1 and not child.text:
+                children.append(child[0])
+                continue
+        children.append(child)
+    if len(children) != len(element) or any(a is not b for a, b in zip(children, element)):
+        element[:] = children
+
+def compact_mathml(mathml: str) -> str:
+    try:
+        root = ET.fromstring(mathml)
+    except ET.ParseError:
+        return mathml
+    _compact_element(root, False)
+    result = _tostring(root)
+    with _compact_stats_lock:
+        _compact_stats['formulas'] += 1
+        _compact_stats['bytes_before'] += len(mathml.encode('utf-8'))
+        _compact_stats['bytes_after'] += len(result.encode('utf-8'))
+    return result
+
+def get_compact_stats() -> dict:
+    with _compact_stats_lock:
+        report = dict(_compact_stats)
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    report['ratio'] = report['bytes_after'] / report['bytes_before'] if report['bytes_before'] else 1.0
+    return report
+
+def clear_compact_stats() -> None:
+    with _compact_stats_lock:
+        for name in _compact_stats:
+            _compact_stats[name] = 0
+
+
+# Whole results keyed on the canonical LaTeX, so inputs that differ only in
+# whitespace, delimiters or redundant argument braces share one conversion
+_RESULT_CACHE_DEFAULT_BUDGET = 8_000_000  # stored characters (keys + results)
+
+_result_cache = _LruCache(_RESULT_CACHE_DEFAULT_BUDGET)
+
+def get_result_cache_stats() -> dict:
+    return _result_cache.stats()
+
+def clear_result_cache() -> None:
+    _result_cache.clear()
+
+def set_result_cache_budget(max_chars: int) -> None:
+    _result_cache.resize(max_chars)
+
+# Optional second level shared by the processes of a worker pool (see
+# shared_cache.SharedResultCache), consulted after the in-process cache misses
+_shared_result_cache = None
+
+def set_shared_result_cache(cache) -> None:
+    global _shared_result_cache
+    _shared_result_cache = cache
+
+def get_shared_result_cache():
+    return _shared_result_cache
+
+def split_display_table(mathml: str, *, max_rows=None, max_cells=None) -> list:
+    # Word gets slow editing one equation object holding a long aligned/gather
+    # table, so a formula that is just a table is cut at row boundaries into
+    # separate <math> blocks.  Each block keeps the table attributes, so the
+    # columnalign of every chunk matches.
+    if max_rows is None and max_cells is None:
+        return [mathml]
+    try:
+        root = ET.fromstring(mathml)
+    except ET.ParseError:
+        return [mathml]
+    if len(root) != 1 or root[0].tag != f'{{{NS_URI}}}mtable':
+        return [mathml]
+    table = root[0]
+    rows = [r for r in table if r.tag in (f'{{{NS_URI}}}mtr', f'{{{NS_URI}}}mlabeledtr')]
+    per_block = max_rows if max_rows is not None else len(rows)
+    if max_cells is not None:
+        columns = max((len(r) for r in rows), default=1) or 1
+        per_block = min(per_block, max_cells // columns)
+    per_block = max(1, per_block)
+    if len(rows) <= per_block:
+        return [mathml]
+    blocks = []
+    for start in range(0, len(rows), per_block):
+        block = ET.Element(root.tag, root.attrib)
+        chunk = ET.SubElement(block, table.tag, table.attrib)
+        chunk.extend(rows[start:start + per_block])
+        blocks.append(_tostring(block))
+    return blocks
+
+OUTPUT_FORMATS = ("mathml", "omml")
+
+def _convert_canonical(
+    key: str, output: str = "mathml", split=None, compact=None, profile: str = "word"
+) -> str:
+    if output not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format: {output!r}")
+    target = _profile(profile)
+    if output == "omml":
+        # OMML is written from the Word-normalized tree whatever the profile
+        target = PROFILES["word"]
+    # profiles that compact do it inside the tree rewrite already
+    compact = bool(compact) and not target.compact and output == "mathml"
+    cache_key = (target.bits, output, split, compact, key)
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    shared = _shared_result_cache
+    if shared is not None:
+        digest = key_digest(cache_key)
+        cached = shared.get(digest)
+        if cached is not None:
+            _result_cache.put(cache_key, cached, len(key) + len(cached))
+            return cached
+    if compact:
+        blocks = _convert_canonical(key, output, split, False, target.name).split("\n")
+        result = "\n".join(compact_mathml(block) for block in blocks)
+    elif split is not None:
+        blocks = split_display_table(_convert_canonical(key, "mathml", None, False, target.name), max_rows=split[0], max_cells=split[1])
+        if output == "omml":
+            blocks = [mathml_to_omml(block) for block in blocks]
+        result = "\n".join(blocks)
+    elif output == "omml":
+        result = mathml_to_omml(_convert_canonical(key))
+    else:
+        result = convert_simple(key) if target.fast_path else None
+        if result is None:
+            from latex2mathml.converter import convert as l2m_convert
+            result = _normalize_mathml_output(l2m_convert(key), target)
+    _result_cache.put(cache_key, result, len(key) + len(result))
+    if shared is not None:
+        shared.put(digest, result)
+    return result
+
+def _annotated(result: str, output: str, latex: str) -> str:
+    # the caller's source, not the cache key: that has the user's macros
+    # expanded and its spacing rewritten
+    if output != "mathml" or "\n" in result:  # a split table has no single source to embed
+        return result
+    return annotate_mathml(result, normalize_input(latex).strip())
+
+def _split_option(max_rows, max_cells):
+    if max_rows is None and max_cells is None:
+        return None
+    return (max_rows, max_cells)
+
+def convert(
+    latex: str,
+    *,
+    profile: str = "word",
+    output: str = "mathml",
+    max_rows=None,
+    max_cells=None,
+    compact=None,
+    annotate=False,
+) -> str:
+    # max_rows/max_cells: opt-in splitting of a long display table into one
+    # block per chunk of rows, joined by newlines.  annotate: keep the
+    # source as an application/x-tex annotation, see
+    # mathml_to_latex.embedded_latex
+    result = _convert_canonical(canonicalize_latex(latex), output, _split_option(max_rows, max_cells), compact, profile)
+    return _annotated(result, output, latex) if annotate else result
+
+def convert_batch(
+    latexes,
+    *,
+    profile: str = "word",
+    output: str = "mathml",
+    max_rows=None,
+    max_cells=None,
+    compact=None,
+    annotate=False,
+) -> list:
+    split = _split_option(max_rows, max_cells)
+    latexes = list(latexes)
+    keys = [canonicalize_latex(latex) for latex in latexes]
+    results = {}
+    for key in keys:
+        if key not in results:
+            results[key] = _convert_canonical(key, output, split, compact, profile)
+    if annotate:
+        return [_annotated(results[key], output, latex) for key, latex in zip(keys, latexes)]
+    return [results[key] for key in keys]
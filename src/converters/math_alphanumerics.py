@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import unicodedata
+
+# The Mathematical Alphanumeric Symbols block (U+1D400-U+1D7FF) as
+# (base character, mathvariant).  latex2mathml writes \mathbf{x},
+# \mathfrak{g}, \mathbb{A} ... as these characters; Word wants the base
+# letter with a mathvariant.  The table is built once at import, so a lookup
+# costs a dict access instead of unicodedata calls per node.  The base is the
+# <font> decomposition, not NFKD, which would also fold ϵ into ε and ϑ into θ.
+
+_STYLES = {
+    "BOLD": "bold",
+    "ITALIC": "italic",
+    "BOLD ITALIC": "bold-italic",
+    "SCRIPT": "script",
+    "BOLD SCRIPT": "bold-script",
+    "FRAKTUR": "fraktur",
+    "BOLD FRAKTUR": "bold-fraktur",
+    "DOUBLE-STRUCK": "double-struck",
+    "SANS-SERIF": "sans-serif",
+    "SANS-SERIF BOLD": "bold-sans-serif",
+    "SANS-SERIF ITALIC": "sans-serif-italic",
+    "SANS-SERIF BOLD ITALIC": "sans-serif-bold-italic",
+    "MONOSPACE": "monospace",
+}
+
+# Letters the block leaves out because Letterlike Symbols already had them
+_LETTERLIKE = {
+    **dict.fromkeys("ℎ", "italic"),
+    **dict.fromkeys("ℬℰℱℋℐℒℳℛℯℊℴ", "script"),
+    **dict.fromkeys("ℭℌℑℜℨ", "fraktur"),
+    **dict.fromkeys("ℂℍℕℙℚℝℤ", "double-struck"),
+}
+
+
+def _font_base(ch: str) -> str | None:
+    tag, _, code = unicodedata.decomposition(ch).partition(" ")
+    return chr(int(code, 16)) if tag == "<font>" and code else None
+
+
+def _build() -> dict[str, tuple[str, str]]:
+    prefixes = sorted(_STYLES, key=len, reverse=True)  # BOLD ITALIC before BOLD
+    table = {}
+    for code in range(0x1D400, 0x1D800):
+        ch = chr(code)
+        name = unicodedata.name(ch, "")
+        base = _font_base(ch)
+        if not name.startswith("MATHEMATICAL ") or base is None:
+            continue
+        style = name[len("MATHEMATICAL "):]
+        for prefix in prefixes:
+            if style.startswith(prefix + " "):
+                table[ch] = (base, _STYLES[prefix])
+                break
+    for ch, variant in _LETTERLIKE.items():
+        table[ch] = (_font_base(ch), variant)
+    return table
+
+
+MATH_ALPHANUMERICS = _build()
+
+# (base, mathvariant) -> character, for variants with no LaTeX font command
+STYLED_CHARACTERS = {value: ch for ch, value in MATH_ALPHANUMERICS.items()}
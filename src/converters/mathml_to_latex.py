@@ -0,0 +1,644 @@
+from __future__ import annotations
+
+import html
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+
+from src.converters.math_alphanumerics import STYLED_CHARACTERS
+
+# The way back from our MathML to LaTeX.  With annotate=True the converter
+# wraps its output in <semantics> with the source as an application/x-tex
+# annotation, so embedded_latex() recovers it from the tail of the string
+# without parsing.  mathml_to_latex() falls back to a structural writer for
+# MathML without the annotation (older output, other tools).  For our own
+# output that LaTeX converts back to the same MathML, fonts, colours and
+# align/split included, but need not match the original source: \big sizes
+# the Word and LibreOffice profiles drop come back as \big, \text content is
+# escaped, and \big fences mixed into \left ... \right are not restored.
+
+TEX_ENCODING = "application/x-tex"
+_ANNOTATION_OPEN = f'<annotation encoding="{TEX_ENCODING}">'
+_ANNOTATION_TAIL = "</annotation></semantics></math>"
+_TEX_ENCODINGS = frozenset({TEX_ENCODING, "tex", "latex", "application/x-latex"})
+
+_NARY_CHARS = frozenset("∫∬∭∮∯∰∑∏∐⋃⋂⋁⋀⨁⨂⨀⨄⨆")
+_NAMED_OPERATORS = frozenset({
+    "arccos", "arcsin", "arctan", "arg", "cos", "cosh", "cot", "coth", "csc", "deg", "det", "dim",
+    "exp", "gcd", "hom", "inf", "ker", "lg", "lim", "liminf", "limsup", "ln", "log", "max", "min",
+    "Pr", "sec", "sin", "sinh", "sup", "tan", "tanh",
+})
+_FONT_COMMANDS = {
+    "bold": r"\mathbf",
+    "double-struck": r"\mathbb",
+    "script": r"\mathcal",
+    "fraktur": r"\mathfrak",
+    "sans-serif": r"\mathsf",
+    "sans-serif-italic": r"\mathsfit",
+    "monospace": r"\mathtt",
+    "italic": r"\mathit",
+    "bold-italic": r"\boldsymbol",
+    "normal": r"\mathrm",
+}
+_OVER_ACCENTS = {
+    "´": r"\acute", "¯": r"\bar", "˘": r"\breve", "ˇ": r"\check", "˙": r"\dot", "¨": r"\ddot",
+    "⃛": r"\dddot", "`": r"\grave", "˚": r"\mathring", "⏞": r"\overbrace", "←": r"\overleftarrow",
+    "↔": r"\overleftrightarrow", "―": r"\overline", "⏜": r"\overparen", "⃗": r"\vec",
+}
+_UNDER_ACCENTS = {"⏟": r"\underbrace", "―": r"\underline", "⏝": r"\underparen", "_": r"\underline"}
+_SPACES = {
+    "0.167em": r"\,", "0.222em": r"\:", "0.278em": r"\;", "1em": r"\quad", "2em": r"\qquad",
+    "negativethinmathspace": r"\!", "-0.167em": r"\!",
+}
+_MATRIX_ENVIRONMENTS = {
+    ("(", ")"): "pmatrix", ("[", "]"): "bmatrix", ("{", "}"): "Bmatrix",
+    ("|", "|"): "vmatrix", ("‖", "‖"): "Vmatrix", ("{", ""): "cases",
+}
+_TEXT_FONT_COMMANDS = {
+    "bold": r"\textbf",
+    "italic": r"\textit",
+    "bold-italic": r"\textbf",
+    "sans-serif": r"\textsf",
+    "monospace": r"\texttt",
+}
+_ENCLOSE_COMMANDS = {
+    "updiagonalstrike": r"\cancel",
+    "downdiagonalstrike": r"\bcancel",
+    "updiagonalstrike downdiagonalstrike": r"\xcancel",
+}
+_DELIMITER_SIZES = {"1.2em": r"\big", "1.623em": r"\Big", "2.047em": r"\bigg", "2.470em": r"\Bigg"}
+_OPENING_DELIMITERS = frozenset("([{⟨⌈⌊")
+_CLOSING_DELIMITERS = frozenset(")]}⟩⌉⌋")
+_ASCII_ESCAPES = {"{": r"\{", "}": r"\}", "#": r"\#", "%": r"\%", "&": r"\&", "$": r"\$", "_": r"\_", "\\": r"\backslash"}
+# where the first name latex2mathml knows for a character is not the usual one
+_SYMBOL_OVERRIDES = {"·": r"\cdot", "∼": r"\sim", "∗": "*", "−": "-", "′": "'", "⁡": "", "⁢": "", "⁣": ""}
+_COMMAND_END_RE = re.compile(r"\\[A-Za-z]+$")
+_EQUATION_NUMBER_RE = re.compile(r"\(\d+\)")
+_SIMPLE_ARG_RE = re.compile(r"[A-Za-z0-9]|\\[A-Za-z]+")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+@lru_cache(maxsize=1)
+def _symbol_names() -> dict:
+    # latex2mathml's table lists the standard LaTeX name of each character
+    # first, then unicode-math names and aliases
+    from latex2mathml.symbols_parser import SYMBOLS
+
+    names: dict = {}
+    for command, code in SYMBOLS.items():
+        try:
+            char = chr(int(code, 16))
+        except ValueError:
+            continue
+        if command.startswith("\\") and char not in names:
+            names[char] = command
+    names.update(_SYMBOL_OVERRIDES)
+    return names
+
+
+def _symbol(char: str) -> str:
+    if char.isascii():
+        return _ASCII_ESCAPES.get(char, char)
+    if "\U0001d400" <= char <= "\U0001d7ff":
+        return char  # 𝐱 is not \mathbf{x} to every renderer
+    return _symbol_names().get(char, char)
+
+
+def _symbols(text: str) -> str:
+    return _join([_symbol(ch) for ch in text])
+
+
+def _join(parts) -> str:
+    out: list[str] = []
+    last = ""
+    for part in parts:
+        if not part:
+            continue
+        if _COMMAND_END_RE.search(last) and part[0].isalpha():
+            out.append(" ")
+        out.append(part)
+        last = part
+    return "".join(out)
+
+
+def _group(latex: str) -> str:
+    return latex if _SIMPLE_ARG_RE.fullmatch(latex) else f"{{{latex}}}"
+
+
+def _text_escape(text: str) -> str:
+    return "".join(_ASCII_ESCAPES.get(ch, ch) if ch in "{}\\#%&$_" else ch for ch in text)
+
+
+def _single_mo(element) -> str | None:
+    if _local(element.tag) != "mo" or len(element):
+        return None
+    text = (element.text or "").strip()
+    return text if len(text) == 1 else None
+
+
+def _tex_annotation(semantics) -> str | None:
+    for child in semantics[1:]:
+        if _local(child.tag) == "annotation" and (child.get("encoding") or "").lower() in _TEX_ENCODINGS:
+            return child.text or ""
+    return None
+
+
+def _is_color(element) -> bool:
+    return _local(element.tag) == "mstyle" and element.get("mathcolor") is not None
+
+
+def _is_bare_color(element) -> bool:
+    # written \color{c} ...; one mrow inside is \textcolor{c}{...}
+    return _is_color(element) and len(element) > 0 and not (len(element) == 1 and _local(element[0].tag) == "mrow")
+
+
+def _is_strut(element) -> bool:
+    return _local(element.tag) == "mspace" and not element.get("width") and element.get("linebreak") is None
+
+
+def _has_newline(element) -> bool:
+    return any(_local(child.tag) == "mspace" and child.get("linebreak") == "newline" for child in element)
+
+
+def _equation_number(tr) -> bool:
+    # align's (n) cell: the only mtd without a columnalign
+    td = tr[-1] if len(tr) > 1 else None
+    return (
+        td is not None and td.get("columnalign") is None and len(td) == 1
+        and _local(td[0].tag) == "mtext" and _EQUATION_NUMBER_RE.fullmatch(td[0].text or "") is not None
+    )
+
+
+class _Writer:
+    def row(self, children, cell: bool = False) -> str:
+        children = list(children)
+        out = []
+        i = 0
+        while i < len(children):
+            child = children[i]
+            if self._is_fence(child, "prefix"):
+                close = self._matching_fence(children, i)
+                if close is not None:
+                    out.append(self._fenced(child.text or "", children[close].text or "", children[i + 1:close]))
+                    i = close + 1
+                    continue
+                if i + 2 == len(children) and _local(children[i + 1].tag) == "mtable":
+                    out.append(self._fenced(child.text or "", "", children[i + 1:]))  # cases
+                    break
+            # (, mtable or a binomial, ) written without fence marks
+            if i + 2 < len(children) and _single_mo(child) and _single_mo(children[i + 2]):
+                fenced = self._fenced_special(child.text.strip(), children[i + 2].text.strip(), children[i + 1])
+                if fenced is not None:
+                    out.append(fenced)
+                    i += 3
+                    continue
+            if self._is_group(child, len(children) > 1):
+                out.append(f"{{{self.row(child)}}}")
+            elif (cell or len(children) > 1) and _local(child.tag) == "mrow" and not len(child) and not child.attrib:
+                out.append("{}")  # 1{}2 is not the number 12
+            elif _is_color(child) and (cell or i + 1 < len(children)):
+                # flattened by the LibreOffice profile; a bare \color would run on past &
+                out.append(self._mstyle(child, scoped=True))
+            else:
+                out.append(self.node(child))
+            if len(out) > 1 and out[-2][-1:].isdigit() and out[-1][:1].isdigit():
+                out.insert(-1, " ")  # <mn>12</mn><mn>34</mn> is 12 34, not 1234
+            i += 1
+        return _join(out)
+
+    def arg(self, element) -> str:
+        latex = self.node(element)
+        # a braced group stays an mrow, a bare token does not
+        return f"{{{latex}}}" if _local(element.tag) == "mrow" else _group(latex)
+
+    def node(self, element) -> str:
+        handler = getattr(self, f"_{_local(element.tag)}", None)
+        if handler is not None:
+            return handler(element)
+        if len(element):
+            return self.row(element)
+        return _symbols(element.text or "")
+
+    def _mi(self, element) -> str:
+        text = element.text or ""
+        variant = element.get("mathvariant")
+        if len(text) > 1 and variant is None:
+            return self._operator_name(text)
+        if variant == "normal" and not text.isalpha():
+            variant = None  # set on symbols by the Word profile
+        return self._styled(text, variant)
+
+    def _mn(self, element) -> str:
+        return self._styled(element.text or "", element.get("mathvariant"))
+
+    @staticmethod
+    def _styled(text: str, variant: str | None) -> str:
+        latex = _symbols(text)
+        font = _FONT_COMMANDS.get(variant)
+        if font is None and variant is not None:
+            # bold-fraktur and the like: latex2mathml reads the styled letter
+            return STYLED_CHARACTERS.get((text, variant), latex)
+        return f"{font}{{{latex}}}" if font and latex else latex
+
+    def _mo(self, element) -> str:
+        text = (element.text or "").strip()
+        if len(text) > 1 and text.isalpha():
+            return r"\bmod" if text == "mod" else self._operator_name(text)
+        size = _DELIMITER_SIZES.get(element.get("minsize"))
+        if size is None and element.get("stretchy") == "true" and element.get("form") is None and element.get("lspace") is None:
+            size = r"\big"  # the Word profile drops minsize from \bigl| and friends
+        if size is not None and len(text) == 1:
+            if element.get("fence") == "true":
+                # \bigl, \bigr and \bigm give the same MathML
+                size += "l" if text in _OPENING_DELIMITERS else "r" if text in _CLOSING_DELIMITERS else "m"
+            return _join([size, self._delimiter(text)])
+        if element.get("fence") == "true" and element.get("lspace") == "0.05em" and len(text) == 1:
+            return _join([r"\middle", self._delimiter(text)])
+        return _symbols(text)
+
+    def _mtext(self, element) -> str:
+        text = element.text or ""
+        if not text.strip():
+            return "\\ " * len(text)
+        command = _TEXT_FONT_COMMANDS.get(element.get("mathvariant"), r"\text")
+        return rf"{command}{{{_text_escape(text)}}}"
+
+    def _ms(self, element) -> str:
+        return self._mtext(element)
+
+    def _mspace(self, element) -> str:
+        if element.get("linebreak") == "newline":
+            return r"\\"
+        width = element.get("width", "").strip()
+        if not width:
+            return ""
+        return _SPACES.get(width, rf"\hspace{{{width}}}")
+
+    def _none(self, element) -> str:
+        return ""
+
+    def _mprescripts(self, element) -> str:
+        return ""
+
+    def _maligngroup(self, element) -> str:
+        return ""
+
+    def _malignmark(self, element) -> str:
+        return ""
+
+    def _mrow(self, element) -> str:
+        return self.row(element)
+
+    def _semantics(self, element) -> str:
+        if not len(element):
+            return ""
+        tex = _tex_annotation(element)
+        return tex.strip() if tex is not None else self.node(element[0])
+
+    def _mstyle(self, element, scoped: bool = False) -> str:
+        if len(element) == 1 and _local(element[0].tag) == "mfrac" and element.get("displaystyle"):
+            return (r"\dfrac" if element.get("displaystyle") == "true" else r"\tfrac") + self._fraction_args(element[0])
+        style = {"true": r"\displaystyle", "false": r"\textstyle"}.get(element.get("displaystyle"))
+        color = element.get("mathcolor")
+        if color is not None:
+            # \textcolor{c}{x} colours one braced mrow, a bare \color{c} the
+            # rest of its group
+            if len(element) == 1 and _local(element[0].tag) == "mrow":
+                return _join([style, rf"\textcolor{{{color}}}{{{self.row(element[0])}}}"])
+            if scoped or not len(element):
+                return _join([style, rf"\textcolor{{{color}}}{{{self.row(element)}}}"])
+            return _join([style, rf"\color{{{color}}}", self.row(element)])
+        return _join([style, self.row(element)]) if style else self.row(element)
+
+    def _mpadded(self, element) -> str:
+        if element.get("width") == "0" and len(element) == 1 and (element[0].text or "") == "⧸":
+            return r"\not"
+        # without the depth strut latex2mathml puts beside an arrow's label
+        return self.row(child for child in element if not _is_strut(child))
+
+    def _mphantom(self, element) -> str:
+        return rf"\phantom{{{self.row(element)}}}"
+
+    def _menclose(self, element) -> str:
+        command = _ENCLOSE_COMMANDS.get(element.get("notation", "box").strip(), r"\boxed")
+        return f"{command}{{{self.row(element)}}}"
+
+    def _mfrac(self, element) -> str:
+        if element.get("linethickness", "").strip() in ("0", "0pt", "0em", "0px"):
+            return r"{" + self.node(element[0]) + r" \atop " + self.node(element[1]) + "}"
+        return r"\frac" + self._fraction_args(element)
+
+    def _fraction_args(self, element) -> str:
+        return f"{{{self.node(element[0])}}}{{{self.node(element[1])}}}"
+
+    def _msqrt(self, element) -> str:
+        return rf"\sqrt{{{self.row(element)}}}"
+
+    def _mroot(self, element) -> str:
+        return rf"\sqrt[{self.node(element[1])}]{{{self.node(element[0])}}}"
+
+    def _base(self, element) -> str:
+        latex = self.node(element)
+        if not latex:
+            return "{}"
+        if _local(element.tag) in ("msub", "msup", "msubsup", "munder", "mover", "munderover", "mmultiscripts"):
+            return f"{{{latex}}}"
+        return latex
+
+    def _scripts(self, base, sub, sup, *, limits: bool = False) -> str:
+        out = self._base(base)
+        if limits:
+            out = _join([out, r"\limits"])
+        if sub is not None:
+            out += "_" + self.arg(sub)
+        if sup is not None:
+            if _local(sup.tag) == "mi" and (sup.text or "") in ("′", "″", "‴"):
+                out += "'" * (1 + "′″‴".index(sup.text))
+            else:
+                out += "^" + self.arg(sup)
+        return out
+
+    def _msub(self, element) -> str:
+        return self._scripts(element[0], element[1], None)
+
+    def _msup(self, element) -> str:
+        return self._scripts(element[0], None, element[1])
+
+    def _msubsup(self, element) -> str:
+        return self._scripts(element[0], element[1], element[2])
+
+    def _is_operator(self, element) -> bool:
+        if _local(element.tag) != "mo":
+            return False
+        text = (element.text or "").strip()
+        return text in _NARY_CHARS or text.isalpha()
+
+    def _munder(self, element) -> str:
+        base, under = element[0], element[1]
+        char = _single_mo(under)
+        if char in _UNDER_ACCENTS:
+            return f"{_UNDER_ACCENTS[char]}{{{self.node(base)}}}"
+        if self._is_braced(base):
+            return self.node(base) + "_" + self.arg(under)
+        if self._is_operator(base):
+            return self._scripts(base, under, None, limits=True)
+        return rf"\underset{{{self.node(under)}}}{{{self.node(base)}}}"
+
+    def _mover(self, element) -> str:
+        base, over = element[0], element[1]
+        char = _single_mo(over)
+        if char == "^":
+            command = r"\hat" if element.get("accent") == "true" else r"\widehat"
+            return f"{command}{{{self.node(base)}}}"
+        if char == "~":
+            command = r"\tilde" if over.get("stretchy") == "false" else r"\widetilde"
+            return f"{command}{{{self.node(base)}}}"
+        if char == "→":
+            command = r"\vec" if over.get("stretchy") == "true" else r"\overrightarrow"
+            return f"{command}{{{self.node(base)}}}"
+        if char in _OVER_ACCENTS:
+            return f"{_OVER_ACCENTS[char]}{{{self.node(base)}}}"
+        arrow = self._extensible_arrow(base)
+        if arrow is not None:
+            return f"{arrow}{{{self.node(over)}}}"
+        if self._is_braced(base):
+            return self.node(base) + "^" + self.arg(over)
+        if self._is_operator(base):
+            return self._scripts(base, None, over, limits=True)
+        return rf"\overset{{{self.node(over)}}}{{{self.node(base)}}}"
+
+    def _munderover(self, element) -> str:
+        base, under, over = element[0], element[1], element[2]
+        if self._is_operator(base):
+            return self._scripts(base, under, over, limits=True)
+        return rf"\overset{{{self.node(over)}}}{{\underset{{{self.node(under)}}}{{{self.node(base)}}}}}"
+
+    @staticmethod
+    def _is_braced(element) -> bool:
+        # \underbrace{x}_{n}: the label sits under the brace
+        return _local(element.tag) in ("munder", "mover") and _single_mo(element[1]) in ("⏟", "⏞")
+
+    @staticmethod
+    def _extensible_arrow(base) -> str | None:
+        if _local(base.tag) != "mstyle" or len(base) != 1:
+            return None
+        char = _single_mo(base[0])
+        if char is None:
+            return None
+        from latex2mathml.commands import EXTENSIBLE_ARROWS
+
+        for command, entity in EXTENSIBLE_ARROWS.items():
+            if html.unescape(entity) == char:
+                return command
+        return None
+
+    def _mmultiscripts(self, element) -> str:
+        children = list(element)
+        tags = [_local(c.tag) for c in children]
+        split = tags.index("mprescripts") if "mprescripts" in tags else len(children)
+        post, pre = children[1:split], children[split + 1:]
+        out = ""
+        if len(pre) >= 2:
+            out = "{}" + "".join(f"{mark}{self.arg(c)}" for mark, c in zip("_^", pre[:2]) if self.node(c))
+        base = self._base(children[0]) if children else "{}"
+        out += base
+        if len(post) >= 2:
+            out += "".join(f"{mark}{self.arg(c)}" for mark, c in zip("_^", post[:2]) if self.node(c))
+        return out
+
+    def _mfenced(self, element) -> str:
+        return self._fenced(element.get("open", "("), element.get("close", ")"), list(element))
+
+    def _fenced(self, open_chr: str, close_chr: str, children) -> str:
+        inner = children
+        if len(inner) == 1 and _local(inner[0].tag) == "mrow":
+            inner = list(inner[0])
+        if len(inner) == 1:
+            fenced = self._fenced_special(open_chr.strip(), close_chr.strip(), inner[0])
+            if fenced is not None:
+                return fenced
+        return self._left_right(open_chr, close_chr, children)
+
+    def _fenced_special(self, open_chr: str, close_chr: str, element) -> str | None:
+        # matrix environments and \binom, which latex2mathml writes as fences
+        tag = _local(element.tag)
+        if tag == "mtable" and element.find(".//{*}maligngroup") is None:
+            env = _MATRIX_ENVIRONMENTS.get((open_chr, close_chr))
+            if env is not None and (env == "cases" or self._column_spec(element) is None):
+                return self._table(element, env)
+        if tag == "mfrac" and (open_chr, close_chr) == ("(", ")") and element.get("linethickness") == "0":
+            return r"\binom" + self._fraction_args(element)
+        return None
+
+    def _left_right(self, open_chr: str, close_chr: str, children) -> str:
+        return _join([rf"\left{self._delimiter(open_chr)}", self.row(children), rf"\right{self._delimiter(close_chr)}"])
+
+    @staticmethod
+    def _delimiter(char: str) -> str:
+        char = char.strip()
+        if not char:
+            return "."
+        return _symbol(char) if char in "{}" or not char.isascii() else char
+
+    def _mtable(self, element) -> str:
+        if element.find(".//{*}maligngroup") is not None:
+            return self._table(element, "aligned")
+        if element.get("rowspacing") == "4pt" and element.get("columnspacing") == "1em":
+            return self._table(element, None)  # bare a \\ b lines
+        numbered = self._numbered(element)
+        if element.get("displaystyle") == "true" and element.get("rowspacing") == "3pt" and self._column_spec(element, numbered):
+            # align, align* and split: one mtd per column, right/left
+            # alternating, align with an (n) cell closing each row
+            if numbered:
+                return self._table(element, "align", numbered=True)
+            return self._table(element, "split" if element.get("columnspacing") == "0em" else "align*")
+        spec = self._column_spec(element)
+        if spec is not None:
+            return self._table(element, "array", spec)
+        return self._table(element, "matrix")
+
+    @staticmethod
+    def _column_spec(table, numbered: bool = False) -> str | None:
+        rows = [tr for tr in table if _local(tr.tag) in ("mtr", "mlabeledtr")]
+        aligns = [td.get("columnalign") for td in rows[0]] if rows else []
+        if numbered:
+            aligns = aligns[:-1]
+        if aligns and all(aligns):
+            return "".join(a[0] for a in aligns)
+        return None
+
+    @staticmethod
+    def _numbered(table) -> bool:
+        rows = [tr for tr in table if _local(tr.tag) == "mtr"]
+        labels = [_equation_number(tr) for tr in rows]
+        return any(labels) and all(label or all(td.get("columnalign") for td in tr) for tr, label in zip(rows, labels))
+
+    def _table(self, table, env: str | None, spec: str | None = None, numbered: bool = False) -> str:
+        lines = []
+        for tr in table:
+            if _local(tr.tag) not in ("mtr", "mlabeledtr"):
+                continue
+            cells = list(tr)[1:] if _local(tr.tag) == "mlabeledtr" else list(tr)
+            suffix = ""
+            if numbered:
+                if _equation_number(tr):
+                    cells = cells[:-1]
+                else:
+                    suffix = r" \nonumber"
+            if env == "aligned":
+                lines.append(" ".join(self._aligned_cell(td) for td in cells))
+            else:
+                line = [self.row(td, cell=True) for td in cells]
+                if env in ("align", "align*") and cells and cells[0].get("columnalign") == "left":
+                    line.insert(0, "")  # latex2mathml drops an empty first column
+                lines.append(" & ".join(line) + suffix)
+        body = r" \\ ".join(lines)
+        if env is None:
+            return body
+        head = rf"\begin{{{env}}}" + (f"{{{spec}}}" if spec else "")
+        return head + body + rf"\end{{{env}}}"
+
+    def _aligned_cell(self, td) -> str:
+        # each maligngroup after the first starts a new & column
+        if td.find(".//{*}maligngroup") is None:
+            return self.row(td)
+        return " & ".join(self.row(group) for group in self._alignment_groups(td))
+
+    @staticmethod
+    def _alignment_groups(td) -> list[list]:
+        # our aligned rows are mtd > mrow > (mrow > maligngroup, ...)+
+        element = td
+        while len(element) == 1 and _local(element[0].tag) == "mrow":
+            element = element[0]
+        groups: list[list] = []
+        for child in element:
+            if _local(child.tag) == "mrow" and len(child) and _local(child[0].tag) == "maligngroup":
+                groups.append(list(child))
+            elif _local(child.tag) == "maligngroup":
+                groups.append([])
+            elif groups:
+                groups[-1].append(child)
+            else:
+                groups.append([child])
+        return groups
+
+    def _operator_name(self, name: str) -> str:
+        if name in _NAMED_OPERATORS:
+            return "\\" + name
+        return rf"\operatorname{{{_text_escape(name)}}}"
+
+    @classmethod
+    def _is_group(cls, element, siblings: bool) -> bool:
+        # a braced group among other nodes: it bounds a bare \color and
+        # decides the forms of the operators inside; the web profile also
+        # leaves a flattened environment in one
+        if _local(element.tag) != "mrow" or not len(element) or element.attrib:
+            return False
+        if _is_bare_color(element[-1]) or _has_newline(element):
+            return True
+        if len(element) == 1 and element[0].get("mathvariant") is not None:
+            return False  # \mathit{3} and the like
+        return siblings and not cls._is_fence(element[0], "prefix")
+
+    @staticmethod
+    def _is_fence(element, form: str) -> bool:
+        return _local(element.tag) == "mo" and element.get("fence") == "true" and element.get("form") == form
+
+    @staticmethod
+    def _matching_fence(children, start: int) -> int | None:
+        depth = 0
+        for j in range(start, len(children)):
+            child = children[j]
+            if _local(child.tag) != "mo" or child.get("fence") != "true":
+                continue
+            form = child.get("form")
+            if form == "prefix":
+                depth += 1
+            elif form == "postfix":
+                depth -= 1
+                if depth == 0:
+                    return j
+        return None
+
+
+def annotate_mathml(mathml: str, latex: str) -> str:
+    # <math ...>body</math> -> <math ...><semantics><mrow>body</mrow><annotation ...>latex</annotation></semantics></math>
+    if not mathml.startswith("<math") or not mathml.endswith("</math>") or mathml.endswith(_ANNOTATION_TAIL):
+        return mathml
+    open_end = mathml.index(">") + 1
+    body = mathml[open_end:-len("</math>")]
+    return (
+        f"{mathml[:open_end]}<semantics><mrow>{body}</mrow>"
+        f"{_ANNOTATION_OPEN}{html.escape(latex, quote=False)}{_ANNOTATION_TAIL}"
+    )
+
+
+def embedded_latex(mathml: str) -> str | None:
+    # the annotation written by annotate_mathml, read from the end of the
+    # string; None for anything else
+    s = mathml.rstrip()
+    if not s.endswith(_ANNOTATION_TAIL) or not s.startswith("<math"):
+        return None
+    start = s.rfind(_ANNOTATION_OPEN)
+    if start < 0:
+        return None
+    return html.unescape(s[start + len(_ANNOTATION_OPEN):-len(_ANNOTATION_TAIL)])
+
+
+def mathml_to_latex(mathml: str) -> str:
+    latex = embedded_latex(mathml)
+    if latex is not None:
+        return latex
+    root = ET.fromstring(mathml.strip())
+    if _local(root.tag) != "math":
+        return _Writer().node(root)
+    if len(root) == 1 and _local(root[0].tag) == "semantics":
+        tex = _tex_annotation(root[0])
+        if tex is not None:
+            return tex.strip()
+    if len(root) == 1 and _local(root[0].tag) == "mrow" and not root[0].attrib:
+        root = root[0]  # the web profile's outer mrow
+    return _Writer().row(root)
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import html
+import re
+import xml.etree.ElementTree as ET
+
+# OMML (Office Math Markup) writer for the MathML produced by
+# latex_to_mathml.convert.  Word pastes m:oMath natively, so large matrices
+# and aligned blocks skip its MathML -> OMML XSLT on paste.
+
+OMML_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
+
+_INTEGRAL_CHARS = frozenset("∫∬∭∮∯∰")
+_NARY_CHARS = _INTEGRAL_CHARS | frozenset("∑∏∐⋃⋂⋁⋀⨁⨂⨀⨄⨆")
+_SCRIPT_TAGS = frozenset({"msub", "msup", "msubsup", "munder", "mover", "munderover"})
+_ACCENT_CHARS = {
+    "^": "̂", "ˆ": "̂", "~": "̃", "˜": "̃", "→": "⃗", "⃗": "⃗",
+    "˙": "̇", "¨": "̈", "ˇ": "̌", "˘": "̆", "´": "́", "`": "̀",
+    "˚": "̊", "←": "⃖", "↔": "⃡",
+}
+_BAR_CHARS = frozenset("¯―‾_−")
+_GROUP_CHARS = frozenset("⏟⏞︸︷")
+_STY_BY_VARIANT = {"normal": "p", "bold": "b", "italic": "i", "bold-italic": "bi"}
+_SCR_BY_VARIANT = {
+    "double-struck": ("double-struck", None),
+    "script": ("script", None),
+    "bold-script": ("script", "b"),
+    "fraktur": ("fraktur", None),
+    "bold-fraktur": ("fraktur", "b"),
+    "sans-serif": ("sans-serif", None),
+    "bold-sans-serif": ("sans-serif", "b"),
+    "sans-serif-italic": ("sans-serif", "i"),
+    "sans-serif-bold-italic": ("sans-serif", "bi"),
+    "monospace": ("monospace", None),
+}
+_EM_RE = re.compile(r"(-?\d*\.?\d+)em")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _val(name: str, value: str) -> str:
+    return f'<m:{name} m:val="{html.escape(value)}"/>'
+
+
+def _run(text: str, *, sty: str | None = None, scr: str | None = None, nor: bool = False) -> str:
+    props = ""
+    if nor:
+        props += "<m:nor/>"
+    if scr is not None:
+        props += _val("scr", scr)
+    if sty is not None:
+        props += _val("sty", sty)
+    if props:
+        props = f"<m:rPr>{props}</m:rPr>"
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f"<m:r>{props}<m:t{space}>{html.escape(text, quote=False)}</m:t></m:r>"
+
+
+class _Writer:
+    def __init__(self) -> None:
+        # maligngroup count in the current eqArr row; None outside aligned tables
+        self._align_marks: int | None = None
+
+    def row(self, children) -> str:
+        children = list(children)
+        out = []
+        i = 0
+        n = len(children)
+        while i < n:
+            child = children[i]
+            if self._is_fence_open(child):
+                close = self._matching_fence(children, i)
+                if close is not None:
+                    out.append(self._delimited(children[i].text or "", children[close].text or "", children[i + 1:close]))
+                    i = close + 1
+                    continue
+            nary = self._nary_parts(child)
+            if nary is not None:
+                body = ""
+                if i + 1 < n and _local(children[i + 1].tag) != "mo":
+                    body = self.node(children[i + 1])
+                    i += 1
+                out.append(self._nary(*nary, body))
+                i += 1
+                continue
+            out.append(self.node(child))
+            i += 1
+        return "".join(out)
+
+    def arg(self, element) -> str:
+        if _local(element.tag) in ("mrow", "mstyle"):
+            return self.row(element)
+        return self.node(element)
+
+    def node(self, element) -> str:
+        tag = _local(element.tag)
+        handler = getattr(self, f"_{tag}", None)
+        if handler is not None:
+            return handler(element)
+        if len(element):
+            return self.row(element)
+        return _run(element.text) if element.text else ""
+
+    def _mi(self, element) -> str:
+        text = element.text or ""
+        if not text:
+            return ""
+        variant = element.get("mathvariant")
+        if variant is None and len(text) > 1:
+            variant = "normal"
+        if variant in _SCR_BY_VARIANT:
+            scr, sty = _SCR_BY_VARIANT[variant]
+            return _run(text, scr=scr, sty=sty)
+        return _run(text, sty=_STY_BY_VARIANT.get(variant))
+
+    def _mn(self, element) -> str:
+        return _run(element.text or "", sty=_STY_BY_VARIANT.get(element.get("mathvariant")))
+
+    def _mo(self, element) -> str:
+        text = element.text or ""
+        # lim, max, det ...: Word would italicize a run of letters
+        return _run(text, sty="p" if len(text) > 1 and text.isalpha() else None)
+
+    def _mtext(self, element) -> str:
+        return _run(element.text or "", nor=True, sty="p")
+
+    def _ms(self, element) -> str:
+        return _run(f'"{element.text or ""}"', nor=True, sty="p")
+
+    def _mspace(self, element) -> str:
+        m = _EM_RE.fullmatch(element.get("width", "").strip())
+        width = float(m.group(1)) if m else 0.0
+        if width <= 0:
+            return ""
+        if width < 0.25:
+            return _run("\u2009")
+        if width < 0.5:
+            return _run("\u2005")
+        return _run("\u2003" * max(1, round(width)))
+
+    def _maligngroup(self, element) -> str:
+        if self._align_marks is None:
+            return ""
+        self._align_marks += 1
+        return _run("&") if self._align_marks > 1 else ""
+
+    def _malignmark(self, element) -> str:
+        return ""
+
+    def _none(self, element) -> str:
+        return ""
+
+    def _mprescripts(self, element) -> str:
+        return ""
+
+    def _mrow(self, element) -> str:
+        return self.row(element)
+
+    def _mstyle(self, element) -> str:
+        return self.row(element)
+
+    def _mpadded(self, element) -> str:
+        return self.row(element)
+
+    def _semantics(self, element) -> str:
+        return self.node(element[0]) if len(element) else ""
+
+    def _mphantom(self, element) -> str:
+        return f"<m:phant><m:e>{self.row(element)}</m:e></m:phant>"
+
+    def _menclose(self, element) -> str:
+        return f"<m:borderBox><m:e>{self.row(element)}</m:e></m:borderBox>"
+
+    def _mfrac(self, element) -> str:
+        num, den = (self.arg(c) for c in element[:2])
+        props = ""
+        if element.get("linethickness", "").strip() in ("0", "0pt", "0em", "0px"):
+            props = f"<m:fPr>{_val('type', 'noBar')}</m:fPr>"
+        return f"<m:f>{props}<m:num>{num}</m:num><m:den>{den}</m:den></m:f>"
+
+    def _msqrt(self, element) -> str:
+        return f"<m:rad><m:radPr>{_val('degHide', '1')}</m:radPr><m:deg/><m:e>{self.row(element)}</m:e></m:rad>"
+
+    def _mroot(self, element) -> str:
+        base, index = element[0], element[1]
+        return f"<m:rad><m:deg>{self.arg(index)}</m:deg><m:e>{self.arg(base)}</m:e></m:rad>"
+
+    def _msub(self, element) -> str:
+        return f"<m:sSub><m:e>{self.arg(element[0])}</m:e><m:sub>{self.arg(element[1])}</m:sub></m:sSub>"
+
+    def _msup(self, element) -> str:
+        return f"<m:sSup><m:e>{self.arg(element[0])}</m:e><m:sup>{self.arg(element[1])}</m:sup></m:sSup>"
+
+    def _msubsup(self, element) -> str:
+        base, sub, sup = (self.arg(c) for c in element[:3])
+        return f"<m:sSubSup><m:e>{base}</m:e><m:sub>{sub}</m:sub><m:sup>{sup}</m:sup></m:sSubSup>"
+
+    def _munder(self, element) -> str:
+        base, under = element[0], element[1]
+        char = self._single_mo(under)
+        if char in _BAR_CHARS:
+            return f"<m:bar><m:barPr>{_val('pos', 'bot')}</m:barPr><m:e>{self.arg(base)}</m:e></m:bar>"
+        if char in _GROUP_CHARS:
+            return self._group_chr(char, "bot", base)
+        return f"<m:limLow><m:e>{self.arg(base)}</m:e><m:lim>{self.arg(under)}</m:lim></m:limLow>"
+
+    def _mover(self, element) -> str:
+        base, over = element[0], element[1]
+        char = self._single_mo(over)
+        if char in _BAR_CHARS:
+            return f"<m:bar><m:barPr>{_val('pos', 'top')}</m:barPr><m:e>{self.arg(base)}</m:e></m:bar>"
+        if char in _GROUP_CHARS:
+            return self._group_chr(char, "top", base)
+        if char in _ACCENT_CHARS:
+            return f"<m:acc><m:accPr>{_val('chr', _ACCENT_CHARS[char])}</m:accPr><m:e>{self.arg(base)}</m:e></m:acc>"
+        return f"<m:limUpp><m:e>{self.arg(base)}</m:e><m:lim>{self.arg(over)}</m:lim></m:limUpp>"
+
+    def _munderover(self, element) -> str:
+        base, under, over = element[0], element[1], element[2]
+        low = f"<m:limLow><m:e>{self.arg(base)}</m:e><m:lim>{self.arg(under)}</m:lim></m:limLow>"
+        return f"<m:limUpp><m:e>{low}</m:e><m:lim>{self.arg(over)}</m:lim></m:limUpp>"
+
+    def _mmultiscripts(self, element) -> str:
+        children = list(element)
+        tags = [_local(c.tag) for c in children]
+        split = tags.index("mprescripts") if "mprescripts" in tags else len(children)
+        base = self.arg(children[0]) if children else ""
+        post, pre = children[1:split], children[split + 1:]
+        if len(post) >= 2:
+            base = f"<m:sSubSup><m:e>{base}</m:e><m:sub>{self.arg(post[0])}</m:sub><m:sup>{self.arg(post[1])}</m:sup></m:sSubSup>"
+        if len(pre) >= 2:
+            return f"<m:sPre><m:sub>{self.arg(pre[0])}</m:sub><m:sup>{self.arg(pre[1])}</m:sup><m:e>{base}</m:e></m:sPre>"
+        return base
+
+    def _mfenced(self, element) -> str:
+        return self._delimited(element.get("open", "("), element.get("close", ")"), list(element))
+
+    def _mtable(self, element) -> str:
+        rows = [list(tr) for tr in element if _local(tr.tag) in ("mtr", "mlabeledtr")]
+        if any(_local(tr.tag) == "mlabeledtr" for tr in element):
+            rows = [cells[1:] for cells in rows]
+        aligned = element.find(".//{*}maligngroup") is not None
+        if aligned or all(len(cells) <= 1 for cells in rows):
+            return self._eq_arr(rows, aligned=aligned)
+        columns = max(len(cells) for cells in rows)
+        body = "".join(
+            "<m:mr>" + "".join(f"<m:e>{self.row(td)}</m:e>" for td in cells) + "<m:e/>" * (columns - len(cells)) + "</m:mr>"
+            for cells in rows
+        )
+        return f"<m:m>{self._matrix_props(element, rows, columns)}{body}</m:m>"
+
+    def _eq_arr(self, rows, *, aligned: bool) -> str:
+        parts = []
+        for cells in rows:
+            saved = self._align_marks
+            self._align_marks = 0 if aligned else None
+            try:
+                content = _run("&").join(self.row(td) for td in cells)
+            finally:
+                self._align_marks = saved
+            parts.append(f"<m:e>{content}</m:e>")
+        return f"<m:eqArr>{''.join(parts)}</m:eqArr>"
+
+    def _matrix_props(self, table, rows, columns: int) -> str:
+        table_aligns = table.get("columnalign", "").split()
+        first = rows[0] if rows else []
+        aligns = []
+        for j in range(columns):
+            align = first[j].get("columnalign") if j < len(first) else None
+            if align is None and table_aligns:
+                align = table_aligns[min(j, len(table_aligns) - 1)]
+            aligns.append(align or "center")
+        if all(a == "center" for a in aligns):
+            return ""
+        mcs = "".join(
+            f"<m:mc><m:mcPr>{_val('count', '1')}{_val('mcJc', a)}</m:mcPr></m:mc>" for a in aligns
+        )
+        return f"<m:mPr><m:mcs>{mcs}</m:mcs></m:mPr>"
+
+    def _delimited(self, open_chr: str, close_chr: str, children) -> str:
+        props = f"<m:dPr>{_val('begChr', open_chr)}{_val('endChr', close_chr)}</m:dPr>"
+        return f"<m:d>{props}<m:e>{self.row(children)}</m:e></m:d>"
+
+    def _group_chr(self, char: str, pos: str, base) -> str:
+        vert = "top" if pos == "bot" else "bot"
+        props = f"<m:groupChrPr>{_val('chr', char)}{_val('pos', pos)}{_val('vertJc', vert)}</m:groupChrPr>"
+        return f"<m:groupChr>{props}<m:e>{self.arg(base)}</m:e></m:groupChr>"
+
+    def _nary(self, char: str, loc: str, sub, sup, body: str) -> str:
+        props = _val("chr", char) + _val("limLoc", loc)
+        if sub is None:
+            props += _val("subHide", "1")
+        if sup is None:
+            props += _val("supHide", "1")
+        sub_xml = self.arg(sub) if sub is not None else ""
+        sup_xml = self.arg(sup) if sup is not None else ""
+        return f"<m:nary><m:naryPr>{props}</m:naryPr><m:sub>{sub_xml}</m:sub><m:sup>{sup_xml}</m:sup><m:e>{body}</m:e></m:nary>"
+
+    def _nary_parts(self, element):
+        tag = _local(element.tag)
+        if tag == "mo":
+            char, sub, sup = self._single_mo(element), None, None
+        elif tag in _SCRIPT_TAGS and len(element) >= 2:
+            char = self._single_mo(element[0])
+            sub = element[1] if tag in ("msub", "munder", "msubsup", "munderover") else None
+            sup = element[-1] if tag in ("msup", "mover", "msubsup", "munderover") else None
+            if tag in ("msubsup", "munderover") and len(element) < 3:
+                return None
+        else:
+            return None
+        if char not in _NARY_CHARS:
+            return None
+        return char, "subSup" if char in _INTEGRAL_CHARS else "undOvr", sub, sup
+
+    @staticmethod
+    def _single_mo(element) -> str | None:
+        if _local(element.tag) != "mo" or len(element):
+            return None
+        text = (element.text or "").strip()
+        return text if len(text) == 1 else None
+
+    @staticmethod
+    def _is_fence_open(element) -> bool:
+        return _local(element.tag) == "mo" and element.get("fence") == "true" and element.get("form") == "prefix"
+
+    @staticmethod
+    def _matching_fence(children, start: int) -> int | None:
+        depth = 0
+        for j in range(start, len(children)):
+            child = children[j]
+            if _local(child.tag) != "mo" or child.get("fence") != "true":
+                continue
+            form = child.get("form")
+            if form == "prefix":
+                depth += 1
+            elif form == "postfix":
+                depth -= 1
+                if depth == 0:
+                    return j
+        return None
+
+
+def mathml_to_omml(mathml: str) -> str:
+    root = ET.fromstring(mathml)
+    body = _Writer().row(root)
+    if root.get("display") == "block":
+        return f'<m:oMathPara xmlns:m="{OMML_NS}"><m:oMath>{body}</m:oMath></m:oMathPara>'
+    return f'<m:oMath xmlns:m="{OMML_NS}">{body}</m:oMath>'
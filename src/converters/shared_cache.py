@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+# Conversion results shared by the worker processes of one pool.  A single
+# shared-memory block holds a fixed-size hash table of 16-byte key digests and
+# a ring-buffer arena for the results:
+#
+#   header | slots[n_slots] | arena[arena_size]
+#
+# Each slot is (seq, length, pos, digest).  pos is an absolute, ever-growing
+# arena position; the bytes live at pos % arena_size and stay valid until the
+# write cursor passes pos + arena_size, so the oldest results are evicted
+# simply by being overwritten.  Writers serialize on a lock and bump a slot's
+# seq to odd while they change it; readers never lock, they copy the slot and
+# the bytes and then check that seq did not move and the bytes were not
+# overwritten meanwhile, treating any race as a miss.
+
+_MAGIC = b"L2WSC001"
+_HEADER = struct.Struct("<8sQQQ")  # magic, n_slots, arena_size, cursor
+_CURSOR_OFFSET = 24
+_CURSOR = struct.Struct("<Q")
+_SLOT = struct.Struct("<IIQ16s")  # seq, length, pos, digest
+_EMPTY_DIGEST = bytes(16)
+_PROBES = 8
+
+DEFAULT_SLOTS = 1 << 16
+DEFAULT_ARENA_BYTES = 32 << 20
+
+
+def key_digest(key) -> bytes:
+    # keys are tuples of str/int/bool/None, whose repr is stable across processes
+    digest = hashlib.blake2b(repr(key).encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    return digest if digest != _EMPTY_DIGEST else b"\x01" + digest[1:]
+
+
+class SharedResultCache:
+    def __init__(self, shm: shared_memory.SharedMemory, lock, *, owner: bool) -> None:
+        self._shm = shm
+        self._buf = shm.buf
+        self._lock = lock
+        self._owner = owner
+        magic, n_slots, arena_size, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{shm.name!r} is not a shared result cache")
+        self._n_slots = n_slots
+        self._arena_size = arena_size
+        self._arena = _HEADER.size + n_slots * _SLOT.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+
+    @classmethod
+    def create(cls, *, slots: int = DEFAULT_SLOTS, arena_bytes: int = DEFAULT_ARENA_BYTES, mp_context=None) -> SharedResultCache:
+        # mp_context: the start-method context of the pool that will use the
+        # cache, its writer lock has to come from the same one
+        n_slots = 1 << max(4, (int(slots) - 1).bit_length())
+        arena_size = max(1 << 12, int(arena_bytes))
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER.size + n_slots * _SLOT.size + arena_size)
+        shm.buf[:_HEADER.size + n_slots * _SLOT.size] = bytes(_HEADER.size + n_slots * _SLOT.size)
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, n_slots, arena_size, 0)
+        return cls(shm, (mp_context or multiprocessing).Lock(), owner=True)
+
+    @classmethod
+    def attach(cls, name: str, lock) -> SharedResultCache:
+        return cls(shared_memory.SharedMemory(name=name), lock, owner=False)
+
+    def __reduce__(self):
+        # workers started by spawn re-attach by name; fork just inherits the mapping
+        return (SharedResultCache.attach, (self._shm.name, self._lock))
+
+    def __enter__(self) -> SharedResultCache:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _slot_offset(self, index: int) -> int:
+        return _HEADER.size + index * _SLOT.size
+
+    def _cursor(self) -> int:
+        return _CURSOR.unpack_from(self._buf, _CURSOR_OFFSET)[0]
+
+    def get(self, digest: bytes) -> str | None:
+        buf = self._buf
+        if buf is None:
+            return None
+        mask = self._n_slots - 1
+        start = int.from_bytes(digest[:8], "little")
+        for probe in range(_PROBES):
+            offset = self._slot_offset((start + probe) & mask)
+            seq, length, pos, slot_digest = _SLOT.unpack_from(buf, offset)
+            if slot_digest != digest or seq & 1:
+                continue
+            begin = self._arena + pos % self._arena_size
+            data = bytes(buf[begin:begin + length])
+            if self._cursor() > pos + self._arena_size or _SLOT.unpack_from(buf, offset)[0] != seq:
+                break
+            self.hits += 1
+            return data.decode("utf-8", "surrogatepass")
+        self.misses += 1
+        return None
+
+    def put(self, digest: bytes, result: str) -> None:
+        data = result.encode("utf-8", "surrogatepass")
+        if self._buf is None or not data or len(data) > self._arena_size // 4:
+            return
+        # best effort: a busy cache is not worth stalling a conversion for
+        if not self._lock.acquire(block=False):
+            self.skipped += 1
+            return
+        try:
+            self._store(digest, data)
+            self.stores += 1
+        finally:
+            self._lock.release()
+
+    def _store(self, digest: bytes, data: bytes) -> None:
+        buf = self._buf
+        cursor = self._cursor()
+        mask = self._n_slots - 1
+        start = int.from_bytes(digest[:8], "little")
+        victim = victim_pos = None
+        for probe in range(_PROBES):
+            offset = self._slot_offset((start + probe) & mask)
+            _, _, pos, slot_digest = _SLOT.unpack_from(buf, offset)
+            if slot_digest == digest or slot_digest == _EMPTY_DIGEST or cursor > pos + self._arena_size:
+                victim = offset
+                break
+            if victim_pos is None or pos < victim_pos:
+                victim, victim_pos = offset, pos
+        pos = cursor
+        if pos % self._arena_size + len(data) > self._arena_size:
+            pos += self._arena_size - pos % self._arena_size
+        # publish the new cursor first so readers of the bytes about to be
+        # overwritten already see them as stale
+        _CURSOR.pack_into(buf, _CURSOR_OFFSET, pos + len(data))
+        begin = self._arena + pos % self._arena_size
+        buf[begin:begin + len(data)] = data
+        seq = _SLOT.unpack_from(buf, victim)[0]
+        struct.pack_into("<I", buf, victim, (seq + 1) & 0xFFFFFFFF)
+        _SLOT.pack_into(buf, victim, (seq + 1) & 0xFFFFFFFF, len(data), pos, digest)
+        struct.pack_into("<I", buf, victim, (seq + 2) & 0xFFFFFFFF)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "skipped": self.skipped,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "arena_used": min(self._cursor(), self._arena_size) if self._buf is not None else 0,
+            "arena_size": self._arena_size,
+        }
+
+    def close(self) -> None:
+        if self._buf is None:
+            return
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
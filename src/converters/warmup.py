@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from src.converters.latex_to_mathml import convert
+
+logger = logging.getLogger(__name__)
+
+# Small set that touches every stage of the pipeline: the latex2mathml import
+# and symbol tables, fence pairing, sized fences, unary minus, bold letters,
+# aligned tables and matrices.
+WARM_UP_FORMULAS: tuple[str, ...] = (
+    r"x^2 + y^2 = z^2",
+    r"-\frac{a}{b} + \sqrt{\alpha_{1}}",
+    r"\left( \sum_{i=1}^{n} x_i \right)^2 \le \infty",
+    r"\Bigl\| \mathbf{x} \Bigr\|_2",
+    r"\begin{aligned} f(x) &= x^{\top} A x \\ &= 0 \end{aligned}",
+    r"{}^{0}T_{1}=\begin{bmatrix} \cos\theta_{1} & -\sin\theta_{1} \\ \sin\theta_{1} & \cos\theta_{1} \end{bmatrix}",
+    r"f(x) = \begin{cases} 1 & x \ge 0 \\ 0 & \text{otherwise} \end{cases}",
+)
+
+
+def warm_up(formulas: Iterable[str] = WARM_UP_FORMULAS) -> float:
+    start = time.perf_counter()
+    for latex in formulas:
+        try:
+            convert(latex)
+        except Exception as e:
+            logger.info("warm_up convert failed latex=%r error=%r", latex, e)
+    return time.perf_counter() - start
+
+
+def start_background_warm_up(
+    *,
+    formulas: Iterable[str] = WARM_UP_FORMULAS,
+    on_done: Callable[[float], None] | None = None,
+) -> threading.Thread:
+    formulas = tuple(formulas)
+
+    def _run() -> None:
+        _lower_current_thread_priority()
+        elapsed = warm_up(formulas)
+        logger.info("warm_up done formulas=%s elapsed_ms=%.1f", len(formulas), elapsed * 1000)
+        if on_done is not None:
+            on_done(elapsed)
+
+    t = threading.Thread(target=_run, name="latex2word-warm-up", daemon=True)
+    t.start()
+    return t
+
+
+def _lower_current_thread_priority() -> None:
+    if sys.platform == "win32":
+        try:
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            thread_priority_lowest = -2
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), thread_priority_lowest)
+        except Exception:
+            pass
+        return
+    # On Linux, PRIO_PROCESS with a native thread id only affects that thread.
+    if sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except Exception:
+            pass
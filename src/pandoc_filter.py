@@ -0,0 +1,33 @@
+import io
+import logging
+import os
+import sys
+
+try:
+    from src.services.pandoc_filter import run_filter
+    from src.utils.latex_macros import load_macro_files, set_macro_table
+except ModuleNotFoundError:
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+    from src.services.pandoc_filter import run_filter
+    from src.utils.latex_macros import load_macro_files, set_macro_table
+
+
+def main(argv=None) -> int:
+    # pandoc runs JSON filters as `<filter> FORMAT` with the AST on stdin:
+    #   pandoc thesis.md -o thesis.docx --filter src/pandoc_filter.py
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    # pandoc passes no options to filters; macro files come from the environment
+    macro_files = [p for p in os.environ.get("LATEX2WORD_MACROS", "").split(os.pathsep) if p]
+    if macro_files:
+        set_macro_table(load_macro_files(macro_files))
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+    try:
+        return run_filter(argv[0] if argv else "", stdin, stdout)
+    finally:
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
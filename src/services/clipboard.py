@@ -3,6 +3,8 @@ from __future__ import annotations
 import ctypes
 from ctypes import wintypes
 
+from src.services.clipboard_html import build_cf_html, parse_cf_html
+
 user32 = ctypes.WinDLL("user32", use_last_error=True)
 kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
 
@@ -21,6 +23,8 @@ user32.IsClipboardFormatAvailable.argtypes = [wintypes.UINT]
 user32.IsClipboardFormatAvailable.restype = wintypes.BOOL
 user32.GetClipboardData.argtypes = [wintypes.UINT]
 user32.GetClipboardData.restype = wintypes.HANDLE
+user32.RegisterClipboardFormatW.argtypes = [wintypes.LPCWSTR]
+user32.RegisterClipboardFormatW.restype = wintypes.UINT
 
 kernel32.GlobalAlloc.argtypes = [wintypes.UINT, ctypes.c_size_t]
 kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
@@ -30,6 +34,31 @@ kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
 kernel32.GlobalUnlock.restype = wintypes.BOOL
 kernel32.GlobalFree.argtypes = [wintypes.HGLOBAL]
 kernel32.GlobalFree.restype = wintypes.HGLOBAL
+kernel32.GlobalSize.argtypes = [wintypes.HGLOBAL]
+kernel32.GlobalSize.restype = ctypes.c_size_t
+
+# larger HTML (a whole copied web page) is not worth scanning for formulas
+_MAX_HTML_BYTES = 8 << 20
+
+def _set_clipboard_data(fmt: int, data: bytes) -> None:
+    h_global = kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
+    if not h_global:
+        raise MemoryError("GlobalAlloc failed")
+
+    locked = kernel32.GlobalLock(h_global)
+    if not locked:
+        kernel32.GlobalFree(h_global)
+        raise OSError(ctypes.get_last_error())
+
+    try:
+        ctypes.memmove(locked, data, len(data))
+    finally:
+        kernel32.GlobalUnlock(h_global)
+
+    if not user32.SetClipboardData(fmt, h_global):
+        kernel32.GlobalFree(h_global)
+        raise OSError(ctypes.get_last_error())
+
 
 def copy_text(text: str) -> None:
     if text is None:
@@ -42,25 +71,24 @@ def copy_text(text: str) -> None:
     try:
         if not user32.EmptyClipboard():
             raise OSError(ctypes.get_last_error())
+        _set_clipboard_data(CF_UNICODETEXT, text.encode("utf-16-le") + b"\x00\x00")
+    finally:
+        user32.CloseClipboard()
 
-        data = text.encode("utf-16-le") + b"\x00\x00"
-        h_global = kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
-        if not h_global:
-            raise MemoryError("GlobalAlloc failed")
-
-        locked = kernel32.GlobalLock(h_global)
-        if not locked:
-            kernel32.GlobalFree(h_global)
-            raise OSError(ctypes.get_last_error())
 
-        try:
-            ctypes.memmove(locked, data, len(data))
-        finally:
-            kernel32.GlobalUnlock(h_global)
+def copy_html(fragment: str, text: str) -> None:
+    # HTML for rich-text targets such as Word, the plain text for everything else
+    cf_html = user32.RegisterClipboardFormatW("HTML Format")
+    if not cf_html:
+        raise OSError(ctypes.get_last_error())
 
-        if not user32.SetClipboardData(CF_UNICODETEXT, h_global):
-            kernel32.GlobalFree(h_global)
+    if not user32.OpenClipboard(None):
+        raise OSError(ctypes.get_last_error())
+    try:
+        if not user32.EmptyClipboard():
             raise OSError(ctypes.get_last_error())
+        _set_clipboard_data(CF_UNICODETEXT, (text or "").encode("utf-16-le") + b"\x00\x00")
+        _set_clipboard_data(cf_html, build_cf_html(fragment) + b"\x00")
     finally:
         user32.CloseClipboard()
 
@@ -85,3 +113,32 @@ def get_text() -> str:
             kernel32.GlobalUnlock(h_data)
     finally:
         user32.CloseClipboard()
+
+
+def get_html() -> str:
+    # the copied HTML fragment, "" when there is no HTML on the clipboard
+    cf_html = user32.RegisterClipboardFormatW("HTML Format")
+    if not cf_html:
+        return ""
+    if not user32.OpenClipboard(None):
+        raise OSError(ctypes.get_last_error())
+    try:
+        if not user32.IsClipboardFormatAvailable(cf_html):
+            return ""
+        h_data = user32.GetClipboardData(cf_html)
+        if not h_data:
+            return ""
+        size = kernel32.GlobalSize(h_data)
+        if not size or size > _MAX_HTML_BYTES:
+            return ""
+
+        locked = kernel32.GlobalLock(h_data)
+        if not locked:
+            raise OSError(ctypes.get_last_error())
+        try:
+            data = ctypes.string_at(locked, size)
+        finally:
+            kernel32.GlobalUnlock(h_data)
+    finally:
+        user32.CloseClipboard()
+    return parse_cf_html(data)
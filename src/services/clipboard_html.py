@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import html
+import logging
+import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+
+from src.utils.math_segments import iter_paragraphs, split_math_segments
+
+logger = logging.getLogger(__name__)
+
+# Windows "HTML Format" (CF_HTML): a header with byte offsets into the UTF-8
+# payload, then the document with the pasted part between fragment markers.
+_CF_HTML_HEADER = (
+    "Version:0.9\r\n"
+    "StartHTML:{0:010d}\r\n"
+    "EndHTML:{1:010d}\r\n"
+    "StartFragment:{2:010d}\r\n"
+    "EndFragment:{3:010d}\r\n"
+)
+_CF_HTML_PREFIX = "<html><head><meta charset=\"utf-8\"></head><body>\r\n<!--StartFragment-->"
+_CF_HTML_SUFFIX = "<!--EndFragment-->\r\n</body></html>"
+
+_MAX_CONVERT_THREADS = 4
+
+_CF_HTML_OFFSET_RE = re.compile(rb"^(StartHTML|EndHTML|StartFragment|EndFragment):(-?\d+)\r?$", re.M)
+
+
+def build_cf_html(fragment: str) -> bytes:
+    header_len = len(_CF_HTML_HEADER.format(0, 0, 0, 0))
+    prefix = _CF_HTML_PREFIX.encode("utf-8")
+    body = fragment.encode("utf-8")
+    suffix = _CF_HTML_SUFFIX.encode("utf-8")
+    start_fragment = header_len + len(prefix)
+    end_fragment = start_fragment + len(body)
+    end_html = end_fragment + len(suffix)
+    header = _CF_HTML_HEADER.format(header_len, end_html, start_fragment, end_fragment).encode("ascii")
+    return header + prefix + body + suffix
+
+
+def parse_cf_html(data: bytes) -> str:
+    # the fragment part of CF_HTML data, or the whole HTML without offsets
+    data = data.rstrip(b"\x00")
+    offsets = {m.group(1): int(m.group(2)) for m in _CF_HTML_OFFSET_RE.finditer(data[:512])}
+    start, end = offsets.get(b"StartFragment", -1), offsets.get(b"EndFragment", -1)
+    if not 0 <= start <= end <= len(data):
+        start, end = offsets.get(b"StartHTML", -1), offsets.get(b"EndHTML", -1)
+    if not 0 <= start <= end <= len(data):
+        start, end = 0, len(data)
+    return data[start:end].decode("utf-8", errors="replace")
+
+
+def has_mixed_math(text: str) -> bool:
+    # prose with at least one delimited formula, e.g. a copied chat answer
+    segments = split_math_segments(text)
+    if not any(kind != "text" for kind, _ in segments):
+        return False
+    prose = " ".join(content for kind, content in segments if kind == "text")
+    return sum(ch.isalpha() for ch in prose) >= 2
+
+
+def _text_html(text: str) -> str:
+    return html.escape(text, quote=False).replace("\n", "<br>")
+
+
+def mixed_text_to_html(text: str, convert_mathml: Callable[[str], str]) -> tuple[str, int, int]:
+    # -> (HTML fragment, formula count, failed count).  Distinct formulas are
+    # converted concurrently; convert() keeps its result cache, so copying the
+    # same answer again costs only lookups.
+    paragraphs = [split_math_segments(p) for p in iter_paragraphs(text.splitlines())]
+    formulas = list(dict.fromkeys(content for segs in paragraphs for kind, content in segs if kind != "text"))
+
+    def convert_one(latex: str) -> str | None:
+        try:
+            mathml = convert_mathml(latex)
+        except Exception as e:
+            logger.info("mixed convert failed latex=%r error=%r", latex, e)
+            return None
+        return mathml if mathml.startswith("<math") else None
+
+    if len(formulas) > 1:
+        with ThreadPoolExecutor(max_workers=min(_MAX_CONVERT_THREADS, len(formulas))) as pool:
+            converted = dict(zip(formulas, pool.map(convert_one, formulas)))
+    else:
+        converted = {latex: convert_one(latex) for latex in formulas}
+
+    parts: list[str] = []
+    count = failed = 0
+    for segments in paragraphs:
+        out = []
+        for kind, content in segments:
+            if kind == "text":
+                out.append(_text_html(content))
+                continue
+            count += 1
+            mathml = converted[content]
+            if mathml is None:
+                failed += 1
+                out.append(_text_html(f"${content}$" if kind == "inline" else f"$${content}$$"))
+            elif kind == "inline":
+                out.append(mathml.replace(' display="block"', "", 1))
+            else:
+                out.append(mathml)
+        parts.append(f"<p>{''.join(out)}</p>")
+    return "".join(parts), count, failed
+
+
+# Browsers copy rendered math as HTML.  The TeX source survives as KaTeX's
+# <annotation encoding="application/x-tex">, MathJax 2's
+# <script type="math/tex">, data-latex/data-tex attributes (MathJax 3, many
+# chat UIs) or the alttext of a <math> (Wikipedia).  The scan below streams
+# the HTML through HTMLParser in chunks, keeps the prose, replaces each
+# formula's rendering with its TeX between $ or $$, and stops at a size or
+# formula limit, so a pasted web page costs no DOM.
+_TEX_MARKERS = ("x-tex", "math/tex", "data-latex", "data-tex", "alttext")
+_TEX_ENCODINGS = frozenset({"application/x-tex", "tex", "latex", "application/x-latex"})
+_TEX_ATTRIBUTES = ("data-latex", "data-tex", "data-math")
+_MAX_HTML_CHARS = 4_000_000
+_MAX_HARVESTED_FORMULAS = 2000
+_FEED_CHUNK = 1 << 16
+_BLOCK_TAGS = frozenset({
+    "p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "table",
+    "blockquote", "pre", "section", "article", "header", "footer",
+})
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+})
+_SKIPPED_TAGS = frozenset({"style", "script", "template", "head", "title", "svg", "noscript"})
+_DISPLAYSTYLE_RE = re.compile(r"^\{\\displaystyle\s*(.*)\}$", re.S)
+
+
+class _TexHarvester(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.formulas = 0
+        # open elements: (tag, role) with role "skip", "formula" or ""
+        self._stack: list[tuple[str, str]] = []
+        self._skip = 0
+        self._formula: dict | None = None
+        self._annotation: list[str] | None = None
+        self._script: list[str] | None = None
+        self._script_display = False
+
+    def _emit(self, tex: str, display: bool) -> None:
+        tex = tex.strip()
+        m = _DISPLAYSTYLE_RE.match(tex)  # Wikipedia wraps inline formulas too
+        if m is not None:
+            tex = m.group(1).strip()
+        if not tex:
+            return
+        self.formulas += 1
+        self.parts.append(f"\n\n$${tex}$$\n\n" if display else f"${tex}$")
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if self._annotation is not None or self._script is not None:
+            return
+        if tag == "script" and not self._skip and "math/tex" in (attrs.get("type") or ""):
+            self._script = []
+            self._script_display = "mode=display" in attrs["type"]
+            return
+        if tag in _VOID_TAGS:
+            if tag == "br" and not self._skip:
+                self.parts.append("\n")
+            return
+        role = ""
+        tex = next((attrs[a] for a in _TEX_ATTRIBUTES if attrs.get(a)), None)
+        display = attrs.get("display") in ("block", "true") or "katex-display" in classes
+        if self._skip:
+            role = "skip"
+        elif self._formula is None and tex is not None:
+            self._formula = {"tex": tex, "display": display, "fixed": True}
+            role = "formula"
+        elif (
+            tag in _SKIPPED_TAGS
+            or attrs.get("aria-hidden") == "true"
+            or "katex-html" in classes
+            # MathJax 2 renderings; the TeX is in the <script> that follows
+            or any(c.startswith(("MathJax", "MJX")) for c in classes)
+        ):
+            role = "skip"
+        elif self._formula is not None:
+            self._formula["display"] = self._formula["display"] or display
+            if tag == "annotation" and (attrs.get("encoding") or "").lower() in _TEX_ENCODINGS:
+                self._annotation = []
+        elif tag == "math" or "katex" in classes or "katex-display" in classes or tag == "mjx-container":
+            self._formula = {"tex": attrs.get("alttext"), "display": display, "fixed": False}
+            role = "formula"
+        if tag in _BLOCK_TAGS and role != "skip" and self._formula is None:
+            self.parts.append("\n\n")
+        self._stack.append((tag, role))
+        if role == "skip":
+            self._skip += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._annotation is not None:
+            if tag == "annotation":
+                if self._formula is not None and not self._formula["fixed"]:
+                    self._formula["tex"] = "".join(self._annotation)
+                    self._formula["fixed"] = True
+                self._annotation = None
+            return
+        if self._script is not None:
+            if tag == "script":
+                self._emit("".join(self._script), self._script_display)
+                self._script = None
+            return
+        # close up to the matching open tag; HTML often leaves some unclosed
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            _, role = self._stack.pop()
+            if role == "skip":
+                self._skip -= 1
+            elif role == "formula":
+                formula, self._formula = self._formula, None
+                if formula and formula["tex"]:
+                    self._emit(formula["tex"], formula["display"])
+        if tag in _BLOCK_TAGS and not self._skip and self._formula is None:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if self._annotation is not None:
+            self._annotation.append(data)
+        elif self._script is not None:
+            self._script.append(data)
+        elif not self._skip and self._formula is None:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def harvest_tex(html_text: str) -> str | None:
+    # -> the copied text with every recovered formula as $...$ / $$...$$,
+    # or None when the HTML carries no TeX source
+    if not any(marker in html_text for marker in _TEX_MARKERS):
+        return None
+    parser = _TexHarvester()
+    limit = min(len(html_text), _MAX_HTML_CHARS)
+    for start in range(0, limit, _FEED_CHUNK):
+        parser.feed(html_text[start:min(start + _FEED_CHUNK, limit)])
+        if parser.formulas >= _MAX_HARVESTED_FORMULAS:
+            break
+    else:
+        parser.close()
+    if not parser.formulas:
+        return None
+    text = "".join(parser.parts)
+    text = re.sub(r"[ \t]*\n[ \t]*", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import html
+import logging
+import os
+import re
+import zipfile
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+
+from src.converters.latex_to_mathml import convert, set_shared_result_cache
+from src.converters.mathml_to_omml import OMML_NS
+from src.converters.shared_cache import SharedResultCache
+from src.utils.latex_macros import MacroTable, get_macro_table, set_macro_table
+from src.utils.math_segments import iter_paragraphs, split_math_segments
+
+logger = logging.getLogger(__name__)
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    "</Relationships>"
+)
+_DOCUMENT_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:document xmlns:w="{W_NS}" xmlns:m="{OMML_NS}"><w:body>'
+)
+_DOCUMENT_CLOSE = "<w:sectPr/></w:body></w:document>"
+
+_OMATH_PARA_OPEN = f'<m:oMathPara xmlns:m="{OMML_NS}">'
+_HEADING_RE = re.compile(r"(#{1,6})\s+")
+_HEADING_SIZES = {1: 36, 2: 32, 3: 28, 4: 26, 5: 24, 6: 24}  # half-points
+_XML_INVALID_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]")
+
+# Paragraphs whose formulas are converted together; bounds memory on
+# book-length inputs while still giving the worker pool enough to share out.
+_WINDOW_PARAGRAPHS = 256
+
+
+class DocxWriter:
+    def __init__(self, path: str) -> None:
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _PACKAGE_RELS)
+        self._doc = self._zip.open("word/document.xml", "w")
+        self._write(_DOCUMENT_OPEN)
+
+    def __enter__(self) -> DocxWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _write(self, xml: str) -> None:
+        self._doc.write(xml.encode("utf-8"))
+
+    def add_paragraph(self, segments: Iterable[tuple[str, str]], *, heading: int = 0) -> None:
+        # segments: ("text", plain text) | ("inline", m:oMath xml) | ("display", m:oMathPara xml)
+        run_props = f"<w:rPr><w:b/><w:sz w:val=\"{_HEADING_SIZES[heading]}\"/></w:rPr>" if heading else ""
+        segments = list(segments)
+        parts: list[str] = []
+        for i, (kind, content) in enumerate(segments):
+            if kind == "text":
+                # the line breaks around a display block become the paragraph break
+                if i == 0 or segments[i - 1][0] == "display":
+                    content = content.lstrip("\n")
+                if i == len(segments) - 1 or segments[i + 1][0] == "display":
+                    content = content.rstrip("\n")
+            if kind == "display":
+                if parts:
+                    self._write(f"<w:p>{''.join(parts)}</w:p>")
+                    parts = []
+                self._write(f"<w:p>{content}</w:p>")
+            elif kind == "inline":
+                parts.append(content)
+            else:
+                parts.append(_text_runs(content, run_props))
+        if parts:
+            self._write(f"<w:p>{''.join(parts)}</w:p>")
+
+    def close(self) -> None:
+        if self._doc is None:
+            return
+        self._write(_DOCUMENT_CLOSE)
+        self._doc.close()
+        self._doc = None
+        self._zip.close()
+
+
+def _text_runs(text: str, run_props: str) -> str:
+    text = _XML_INVALID_RE.sub("", text)
+    lines = text.split("\n")
+    out = []
+    for i, line in enumerate(lines):
+        if i:
+            out.append(f"<w:r>{run_props}<w:br/></w:r>")
+        if line:
+            out.append(f'<w:r>{run_props}<w:t xml:space="preserve">{html.escape(line, quote=False)}</w:t></w:r>')
+    return "".join(out)
+
+
+def _init_worker(cache: SharedResultCache | None, macros: MacroTable) -> None:
+    set_shared_result_cache(cache)
+    set_macro_table(macros)
+
+
+def _convert_omml(formula: tuple[str, str], max_rows: int | None = None, max_cells: int | None = None) -> str | None:
+    kind, latex = formula
+    if kind == "inline":
+        max_rows = max_cells = None
+    try:
+        return convert(latex, output="omml", max_rows=max_rows, max_cells=max_cells)
+    except Exception as e:
+        logger.info("docx convert failed latex=%r error=%r", latex, e)
+        return None
+
+
+def _omml_segments(kind: str, omml: str) -> list[tuple[str, str]]:
+    # a split display table comes back as one oMathPara per line
+    out = []
+    for block in omml.split("\n"):
+        body = block[len(_OMATH_PARA_OPEN):-len("</m:oMathPara>")]
+        out.append((kind, body if kind == "inline" else f"<m:oMathPara>{body}</m:oMathPara>"))
+    return out
+
+
+def _windows(paragraphs: Iterable[str], size: int) -> Iterator[list[str]]:
+    window: list[str] = []
+    for paragraph in paragraphs:
+        window.append(paragraph)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def export_docx(
+    src_path: str,
+    dst_path: str,
+    *,
+    jobs: int | None = None,
+    max_rows: int | None = None,
+    max_cells: int | None = None,
+) -> dict[str, int]:
+    jobs = jobs or os.cpu_count() or 1
+    stats = {"paragraphs": 0, "formulas": 0, "failed": 0}
+    executor: Executor | None = None
+    shared: SharedResultCache | None = None
+    if jobs > 1:
+        # formulas repeated across windows are converted once by whichever
+        # worker sees them first
+        try:
+            shared = SharedResultCache.create()
+        except OSError as e:
+            logger.info("shared result cache unavailable error=%r", e)
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(shared, get_macro_table()))
+    try:
+        with open(src_path, encoding="utf-8-sig") as src, DocxWriter(dst_path) as writer:
+            for window in _windows(iter_paragraphs(src), _WINDOW_PARAGRAPHS):
+                split = [split_math_segments(p) for p in window]
+                formulas = list(dict.fromkeys(seg for segs in split for seg in segs if seg[0] != "text"))
+                convert_one = partial(_convert_omml, max_rows=max_rows, max_cells=max_cells)
+                if executor is not None and len(formulas) > 1:
+                    chunksize = max(1, len(formulas) // (jobs * 4))
+                    converted = dict(zip(formulas, executor.map(convert_one, formulas, chunksize=chunksize)))
+                else:
+                    converted = {formula: convert_one(formula) for formula in formulas}
+                for segments in split:
+                    heading = 0
+                    if segments and segments[0][0] == "text":
+                        m = _HEADING_RE.match(segments[0][1])
+                        if m is not None:
+                            heading = len(m.group(1))
+                            segments[0] = ("text", segments[0][1][m.end():])
+                    out = []
+                    for kind, content in segments:
+                        if kind == "text":
+                            out.append((kind, content))
+                            continue
+                        stats["formulas"] += 1
+                        omml = converted[(kind, content)]
+                        if omml is None:
+                            stats["failed"] += 1
+                            out.append(("text", f"${content}$" if kind == "inline" else f"$${content}$$"))
+                        else:
+                            out.extend(_omml_segments(kind, omml))
+                    writer.add_paragraph(out, heading=heading)
+                    stats["paragraphs"] += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if shared is not None:
+            shared.close()
+    return stats
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from src.converters.latex_to_mathml import convert, set_shared_result_cache
+from src.converters.shared_cache import SharedResultCache
+from src.utils.latex_macros import MacroTable, get_macro_table, set_macro_table
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+_MAX_BODY_BYTES = 4 << 20
+_MAX_HEADER_LINES = 100
+_IDLE_TIMEOUT_S = 30.0
+# responses a client may have outstanding on one connection before the
+# server stops reading its further pipelined requests
+_PIPELINE_DEPTH = 32
+_LATENCY_WINDOW = 4096
+_OPTION_KEYS = ("profile", "output", "compact", "max_rows", "max_cells", "annotate")
+
+
+class _HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = "") -> None:
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _init_worker(cache: SharedResultCache | None, macros: MacroTable) -> None:
+    set_shared_result_cache(cache)
+    set_macro_table(macros)
+
+
+def _convert_many(latexes: list[str], options: dict) -> list[tuple[bool, str]]:
+    # runs in the worker; one failing formula must not fail the whole batch
+    out = []
+    for latex in latexes:
+        try:
+            out.append((True, convert(latex, **options)))
+        except Exception as e:
+            out.append((False, f"{type(e).__name__}: {e}"))
+    return out
+
+
+class _Metrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.formulas = 0
+        self.in_flight = 0
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def record(self, seconds: float, *, error: bool) -> None:
+        self.requests += 1
+        self.errors += error
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3) if ordered else 0.0
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "formulas": self.formulas,
+            "in_flight": self.in_flight,
+            "latency_ms": {"p50": pct(0.50), "p90": pct(0.90), "p99": pct(0.99), "max": pct(1.0)},
+        }
+
+
+class ConversionServer:
+    # POST /convert        {"latex": "...", "profile"?, "output"?, ...} -> {"result": "..."}
+    # POST /convert/batch  {"latex": ["...", ...], ...} -> {"results": [{"result"} | {"error"}, ...]}
+    # GET  /metrics        request counts and latency percentiles
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        *,
+        jobs: int | None = None,
+        max_pending: int = 256,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.metrics = _Metrics()
+        self._executor: Executor | None = None
+        self._shared: SharedResultCache | None = None
+        self._pending: asyncio.Semaphore | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        if self.jobs > 1:
+            try:
+                self._shared = SharedResultCache.create()
+            except OSError as e:
+                logger.info("shared result cache unavailable error=%r", e)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.jobs, initializer=_init_worker, initargs=(self._shared, get_macro_table())
+            )
+        else:
+            # keep conversions off the event loop even without worker processes
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("conversion server listening on http://%s:%s jobs=%s", self.host, self.port, self.jobs)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Requests are read and dispatched as soon as they arrive (pipelining),
+        # responses go out in request order from a separate writer task.  Each
+        # dispatched request holds one of max_pending slots until it is done:
+        # once they are taken, no connection is read further, so the request
+        # bodies held in memory are bounded server-wide.
+        responses: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_DEPTH)
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), _IDLE_TIMEOUT_S)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except _HttpError as e:
+                    await responses.put((_done(_error_response(e.status, str(e))), False))
+                    break
+                if request is None or sender.done():
+                    break
+                method, path, headers, body, keep_alive = request
+                await self._pending.acquire()
+                task = asyncio.create_task(self._dispatch(method, path, headers, body))
+                task.add_done_callback(lambda _task: self._pending.release())
+                await responses.put((task, keep_alive))
+                if not keep_alive:
+                    break
+        finally:
+            if not sender.done():
+                await responses.put(None)
+            await sender
+
+    async def _send_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                item = await responses.get()
+                if item is None:
+                    break
+                task, keep_alive = item
+                status, payload = await task
+                writer.write(_encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _dispatch(self, method: str, path: str, headers: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        started = time.perf_counter()
+        try:
+            status, payload = await self._route(method, path, headers, body)
+        except _HttpError as e:
+            status, payload = _error_response(e.status, str(e))
+        except Exception as e:
+            logger.exception("conversion server request failed path=%s", path)
+            status, payload = _error_response(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+        if path != "/metrics":
+            self.metrics.record(time.perf_counter() - started, error=status >= 400)
+        return status, payload
+
+    async def _route(self, method: str, path: str, headers: dict, body: bytes) -> tuple[HTTPStatus, dict]:
+        if path == "/metrics":
+            if method != "GET":
+                raise _HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+            return HTTPStatus.OK, self.metrics.snapshot()
+        if path not in ("/convert", "/convert/batch"):
+            raise _HttpError(HTTPStatus.NOT_FOUND)
+        if method != "POST":
+            raise _HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+        try:
+            request = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise _HttpError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}") from None
+        if not isinstance(request, dict):
+            raise _HttpError(HTTPStatus.BAD_REQUEST, "expected a JSON object")
+        latex = request.get("latex")
+        batch = path == "/convert/batch"
+        if batch:
+            if not isinstance(latex, list) or not all(isinstance(x, str) for x in latex):
+                raise _HttpError(HTTPStatus.BAD_REQUEST, '"latex" must be a list of strings')
+        elif not isinstance(latex, str):
+            raise _HttpError(HTTPStatus.BAD_REQUEST, '"latex" must be a string')
+        options = {key: request[key] for key in _OPTION_KEYS if request.get(key) is not None}
+        results = await self._convert([latex] if not batch else latex, options)
+        if batch:
+            return HTTPStatus.OK, {"results": [{"result": v} if ok else {"error": v} for ok, v in results]}
+        ok, value = results[0]
+        if not ok:
+            return _error_response(HTTPStatus.UNPROCESSABLE_ENTITY, value)
+        return HTTPStatus.OK, {"result": value}
+
+    async def _convert(self, latexes: list[str], options: dict) -> list[tuple[bool, str]]:
+        self.metrics.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._executor, _convert_many, latexes, options)
+        finally:
+            self.metrics.in_flight -= 1
+        self.metrics.formulas += len(latexes)
+        return results
+
+
+def _done(value) -> asyncio.Future:
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+def _error_response(status: HTTPStatus, message: str) -> tuple[HTTPStatus, dict]:
+    return status, {"error": message}
+
+
+async def _readline(reader: asyncio.StreamReader, too_long: HTTPStatus) -> bytes:
+    try:
+        return await reader.readline()
+    except ValueError:  # longer than the stream limit
+        raise _HttpError(too_long) from None
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    # -> (method, path, headers, body, keep_alive), or None at a clean EOF
+    line = await _readline(reader, HTTPStatus.REQUEST_URI_TOO_LONG)
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise _HttpError(HTTPStatus.BAD_REQUEST, "malformed request line") from None
+    headers: dict[str, str] = {}
+    for _ in range(_MAX_HEADER_LINES):
+        line = await _readline(reader, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise _HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise _HttpError(HTTPStatus.NOT_IMPLEMENTED, "chunked request bodies are not supported")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise _HttpError(HTTPStatus.BAD_REQUEST, "invalid Content-Length") from None
+    if length > _MAX_BODY_BYTES or length < 0:
+        raise _HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), target.split("?", 1)[0], headers, body, keep_alive
+
+
+def _encode_response(status: HTTPStatus, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, *, jobs: int | None = None, max_pending: int = 256) -> None:
+    async def run() -> None:
+        server = ConversionServer(host, port, jobs=jobs, max_pending=max_pending)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C still arrives as KeyboardInterrupt
+        await server.start()
+        try:
+            await stop.wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
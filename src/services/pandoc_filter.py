@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import TextIO
+
+from src.converters.latex_to_mathml import convert
+from src.utils.latex_macros import get_macro_table, set_macro_table
+
+logger = logging.getLogger(__name__)
+
+# Pandoc JSON filter: every Math node of the document is collected first, the
+# distinct formulas are converted once (in worker processes for large
+# documents) and the results are spliced back as raw OpenXML (OMML) for docx
+# or raw HTML (MathML) for HTML-like writers.  Other output formats, and
+# formulas that fail to convert, are left to pandoc.
+
+_OPENXML_FORMATS = frozenset({"docx", "openxml"})
+_HTML_FORMATS = frozenset({
+    "html", "html4", "html5", "epub", "epub2", "epub3", "chunkedhtml",
+    "revealjs", "slidy", "slideous", "s5", "dzslides",
+})
+# below this many distinct formulas, starting worker processes costs more
+# than it saves
+_PARALLEL_MIN_FORMULAS = 64
+_OMATH_PARA_OPEN = "<m:oMathPara "
+
+
+def _raw_format(fmt: str) -> str | None:
+    base = fmt.split("+", 1)[0].split("-", 1)[0].lower()
+    if base in _OPENXML_FORMATS:
+        return "openxml"
+    if base in _HTML_FORMATS:
+        return "html"
+    return None
+
+
+def _convert_math(formula: tuple[str, str], raw_format: str) -> str | None:
+    kind, latex = formula
+    try:
+        if raw_format == "openxml":
+            omml = convert(latex, output="omml")
+            if kind == "InlineMath":
+                # <m:oMathPara xmlns:m=..><m:oMath>...</m:oMath></m:oMathPara> -> bare oMath
+                ns = omml[len(_OMATH_PARA_OPEN):omml.index(">")]
+                body = omml[omml.index(">") + 1:-len("</m:oMathPara>")]
+                return f"<m:oMath {ns}>" + body[len("<m:oMath>"):]
+            return omml
+        mathml = convert(latex)
+        if kind == "InlineMath":
+            mathml = mathml.replace(' display="block"', "", 1)
+        return mathml
+    except Exception as e:
+        logger.info("pandoc filter convert failed latex=%r error=%r", latex, e)
+        return None
+
+
+def _math_kind(node: dict) -> str:
+    return node["c"][0]["t"]
+
+
+def _lone_display_math(inlines: list) -> dict | None:
+    # a paragraph that is nothing but one display formula becomes a raw block
+    found = None
+    for node in inlines:
+        t = node.get("t")
+        if t in ("Space", "SoftBreak", "LineBreak"):
+            continue
+        if t != "Math" or found is not None or _math_kind(node) != "DisplayMath":
+            return None
+        found = node
+    return found
+
+
+def _collect(blocks: list) -> tuple[list[dict], list[tuple[dict, dict]]]:
+    maths: list[dict] = []
+    paragraphs: list[tuple[dict, dict]] = []
+    stack: list = [blocks]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        t = node.get("t")
+        if t == "Math":
+            maths.append(node)
+            continue
+        if t in ("Para", "Plain"):
+            math = _lone_display_math(node["c"])
+            if math is not None:
+                paragraphs.append((node, math))
+        content = node.get("c")
+        if isinstance(content, (list, dict)):
+            stack.append(content)
+    return maths, paragraphs
+
+
+def filter_document(doc: dict, fmt: str, *, jobs: int | None = None) -> dict:
+    raw_format = _raw_format(fmt)
+    if raw_format is None:
+        return doc
+    maths, paragraphs = _collect(doc.get("blocks", []))
+    formulas = list(dict.fromkeys((_math_kind(m), m["c"][1]) for m in maths))
+    convert_one = partial(_convert_math, raw_format=raw_format)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(formulas) >= _PARALLEL_MIN_FORMULAS:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=set_macro_table, initargs=(get_macro_table(),)
+        ) as executor:
+            chunksize = max(1, len(formulas) // (jobs * 4))
+            converted = dict(zip(formulas, executor.map(convert_one, formulas, chunksize=chunksize)))
+    else:
+        converted = {formula: convert_one(formula) for formula in formulas}
+
+    done = set()
+    for paragraph, math in paragraphs:
+        result = converted[(_math_kind(math), math["c"][1])]
+        if result is None:
+            continue
+        if raw_format == "openxml":
+            result = f"<w:p>{result}</w:p>"
+        paragraph.clear()
+        paragraph.update({"t": "RawBlock", "c": [raw_format, result]})
+        done.add(id(math))
+    for math in maths:
+        if id(math) in done:
+            continue
+        result = converted[(_math_kind(math), math["c"][1])]
+        if result is not None:
+            math.clear()
+            math.update({"t": "RawInline", "c": [raw_format, result]})
+    logger.info("pandoc filter formulas=%s distinct=%s", len(maths), len(formulas))
+    return doc
+
+
+def run_filter(fmt: str, stdin: TextIO, stdout: TextIO, *, jobs: int | None = None) -> int:
+    doc = json.load(stdin)
+    json.dump(filter_document(doc, fmt, jobs=jobs), stdout, ensure_ascii=False)
+    return 0
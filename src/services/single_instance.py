@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+# Single-instance hand-off.  The first instance owns a lock file holding its
+# PID, the address of a local IPC listener (a named pipe on Windows, a Unix
+# domain socket elsewhere) and a random auth key; the file is only readable
+# by the user.  A later launch reads it, sends its arguments to the running
+# instance and exits.  A lock whose PID is gone, or whose owner never
+# answers, is stale and taken over.  Nothing here imports the UI or the
+# converter, so a forwarding launch stays fast.
+
+_FORWARD_TIMEOUT_S = 2.0
+_RETRY_INTERVAL_S = 0.05
+
+Message = dict  # {"argv": [...], "cwd": "..."}
+
+
+def default_lock_path(name: str = "latex2word") -> str:
+    if sys.platform == "win32":
+        return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"{name}-{os.getuid()}.lock")
+
+
+def pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        process_query_limited_information = 0x1000
+        still_active = 259
+        handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+        if not handle:
+            return int(kernel32.GetLastError()) == 5  # access denied: exists, not ours
+        try:
+            code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                return True
+            return code.value == still_active
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class InstanceServer:
+    # Receives the arguments of later launches.  Messages that arrive before
+    # a handler is set are kept and delivered by set_handler.
+    def __init__(self, listener: Listener, lock_path: str, address: str, authkey: bytes) -> None:
+        self._listener = listener
+        self._lock_path = lock_path
+        self._address = address
+        self._authkey = authkey
+        self._lock = threading.Lock()
+        self._handler: Callable[[Message], None] | None = None
+        self._backlog: list[Message] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._serve, name="latex2word-instance", daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    def set_handler(self, handler: Callable[[Message], None]) -> None:
+        with self._lock:
+            self._handler = handler
+            backlog, self._backlog = self._backlog, []
+        for message in backlog:
+            self._deliver(handler, message)
+
+    def _deliver(self, handler: Callable[[Message], None], message: Message) -> None:
+        try:
+            handler(message)
+        except Exception as e:
+            logger.info("single instance handler failed message=%r error=%r", message, e)
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue  # failed handshake, e.g. a client with the wrong key
+            if self._closed:
+                conn.close()
+                return
+            with conn:
+                try:
+                    if not conn.poll(_FORWARD_TIMEOUT_S):
+                        continue
+                    message = conn.recv()
+                    conn.send(True)
+                except (EOFError, OSError, ValueError) as e:
+                    logger.info("single instance receive failed error=%r", e)
+                    continue
+            if not isinstance(message, dict) or not isinstance(message.get("argv"), list):
+                continue
+            with self._lock:
+                handler = self._handler
+                if handler is None:
+                    self._backlog.append(message)
+                    continue
+            self._deliver(handler, message)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # accept() is not woken by closing the listener on every platform
+        try:
+            Client(self._address, authkey=self._authkey).close()
+        except OSError:
+            pass
+        self._listener.close()
+        info = _read_lock(self._lock_path)
+        if isinstance(info, dict) and info.get("pid") == os.getpid():
+            try:
+                os.remove(self._lock_path)
+            except OSError:
+                pass
+
+
+def _read_lock(path: str):
+    # -> dict, None when there is no lock file, or "" while it is being written
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError:
+        return ""
+    try:
+        info = json.loads(data)
+    except json.JSONDecodeError:
+        return ""
+    if not isinstance(info, dict) or not isinstance(info.get("pid"), int):
+        return ""
+    return info
+
+
+def _remove_if_unchanged(path: str, seen) -> None:
+    # another launch may have replaced a stale lock with its own meanwhile
+    if _read_lock(path) == seen:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _forward(info: dict, message: Message) -> bool:
+    # run in a thread: a hung instance would block the handshake indefinitely
+    result: list[bool] = []
+
+    def send() -> None:
+        try:
+            with Client(info["address"], authkey=bytes.fromhex(info["authkey"])) as conn:
+                conn.send(message)
+                result.append(bool(conn.poll(_FORWARD_TIMEOUT_S) and conn.recv()))
+        except (OSError, EOFError, KeyError, ValueError, TypeError):
+            result.append(False)
+        except Exception as e:  # AuthenticationError and the like
+            logger.info("single instance forward failed error=%r", e)
+            result.append(False)
+
+    t = threading.Thread(target=send, name="latex2word-forward", daemon=True)
+    t.start()
+    t.join(_FORWARD_TIMEOUT_S)
+    return bool(result and result[0])
+
+
+def _listen(lock_path: str) -> tuple[Listener, str, bytes]:
+    authkey = secrets.token_bytes(32)
+    if sys.platform == "win32":
+        address = rf"\\.\pipe\latex2word-{os.getpid()}-{secrets.token_hex(8)}"
+        return Listener(address, family="AF_PIPE", authkey=authkey), address, authkey
+    address = f"{os.path.splitext(lock_path)[0]}-{os.getpid()}.sock"
+    try:
+        os.remove(address)  # left behind by a crashed process with a reused PID
+    except FileNotFoundError:
+        pass
+    return Listener(address, family="AF_UNIX", authkey=authkey), address, authkey
+
+
+def _try_lock(lock_path: str, address: str, authkey: bytes) -> bool:
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "address": address, "authkey": authkey.hex()}, f)
+    return True
+
+
+def acquire_or_forward(
+    argv: list[str],
+    *,
+    lock_path: str | None = None,
+    timeout: float = _FORWARD_TIMEOUT_S,
+) -> InstanceServer | None:
+    # -> InstanceServer when this process is the first instance, None when
+    # argv was handed to the running one (the caller should then exit)
+    lock_path = lock_path or default_lock_path()
+    message = {"argv": list(argv), "cwd": os.getcwd()}
+    deadline = time.monotonic() + timeout
+    takeovers = 0
+    listener = None
+    try:
+        while True:
+            info = _read_lock(lock_path)
+            if info is None:
+                if listener is None:
+                    listener, address, authkey = _listen(lock_path)
+                if _try_lock(lock_path, address, authkey):
+                    server = InstanceServer(listener, lock_path, address, authkey)
+                    listener = None
+                    return server
+                continue
+            if info and pid_alive(info["pid"]) and info["pid"] != os.getpid():
+                if _forward(info, message):
+                    return None
+            elif info:
+                # the owner is gone: a crash left the lock behind
+                _remove_if_unchanged(lock_path, info)
+                continue
+            if time.monotonic() >= deadline:
+                # unreadable for too long, or an owner that never answers
+                # (hung, or its PID now belongs to another program)
+                logger.info("single instance lock %s is stale info=%r", lock_path, info)
+                takeovers += 1
+                if takeovers > 3:
+                    raise OSError(f"cannot take over single instance lock {lock_path}")
+                _remove_if_unchanged(lock_path, info)
+                deadline = time.monotonic() + timeout
+                continue
+            time.sleep(_RETRY_INTERVAL_S)
+    finally:
+        if listener is not None:
+            listener.close()
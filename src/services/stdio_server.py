@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+import threading
+from typing import BinaryIO
+
+from src.converters.latex_to_mathml import OUTPUT_FORMATS, PROFILES, convert
+from src.converters.mathml_to_latex import mathml_to_latex
+from src.converters.warmup import warm_up
+
+logger = logging.getLogger(__name__)
+
+# Newline-delimited JSON-RPC 2.0 on stdin/stdout, for editor plugins that keep
+# one warm process instead of paying interpreter start-up per formula:
+#
+#   {"jsonrpc": "2.0", "id": 1, "method": "convert", "params": {"latex": "x^2", "profile": "word"}}
+#   {"jsonrpc": "2.0", "id": 1, "result": "<math ...>"}
+#
+# methods: convert, convert_batch, to_latex ({"mathml": ...}), profiles,
+# cancel / $/cancelRequest
+# ({"id": ...} of a queued or running request), shutdown / exit.
+# A JSON array of requests is answered with an array, as JSON-RPC batches are.
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+CONVERSION_FAILED = -32000
+REQUEST_CANCELLED = -32800
+
+_CANCEL_METHODS = frozenset({"cancel", "$/cancelRequest"})
+_EXIT_METHODS = frozenset({"shutdown", "exit"})
+_OPTION_KEYS = ("profile", "output", "compact", "max_rows", "max_cells", "annotate")
+
+
+class _RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _options(params: dict) -> dict:
+    options = {key: params[key] for key in _OPTION_KEYS if params.get(key) is not None}
+    if options.get("profile", "word") not in PROFILES:
+        raise _RpcError(INVALID_PARAMS, f"unknown profile: {options['profile']!r}")
+    if options.get("output", "mathml") not in OUTPUT_FORMATS:
+        raise _RpcError(INVALID_PARAMS, f"unknown output format: {options['output']!r}")
+    return options
+
+
+class StdioServer:
+    def __init__(self, stdin: BinaryIO, stdout: BinaryIO) -> None:
+        self._stdin = stdin
+        self._stdout = stdout
+        self._write_lock = threading.Lock()
+        self._requests: queue.Queue = queue.Queue()
+        # ids of requests that are queued or running, and those cancelled
+        self._state_lock = threading.Lock()
+        self._active: set = set()
+        self._cancelled: set = set()
+
+    def run(self) -> int:
+        # The reader (this thread) only parses and queues, so a cancel is seen
+        # while the worker thread is still busy with earlier requests.
+        worker = threading.Thread(target=self._work, name="latex2word-stdio", daemon=True)
+        worker.start()
+        try:
+            for raw in self._stdin:
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    self._write(_error(None, PARSE_ERROR, f"parse error: {e}"))
+                    continue
+                if isinstance(message, dict):
+                    method = message.get("method")
+                    if method in _CANCEL_METHODS:
+                        self._cancel(message)
+                        continue
+                    if method in _EXIT_METHODS:
+                        if "id" in message:
+                            self._requests.put(message)
+                        break
+                    self._track(message.get("id"))
+                elif isinstance(message, list):
+                    for item in message:
+                        if isinstance(item, dict):
+                            self._track(item.get("id"))
+                self._requests.put(message)
+        finally:
+            self._requests.put(None)
+            worker.join()
+        return 0
+
+    def _write(self, response) -> None:
+        data = (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._write_lock:
+            self._stdout.write(data)
+            self._stdout.flush()
+
+    def _track(self, request_id) -> None:
+        if isinstance(request_id, (int, str)):
+            with self._state_lock:
+                self._active.add(request_id)
+
+    def _cancel(self, message: dict) -> None:
+        params = message.get("params")
+        target = params.get("id") if isinstance(params, dict) else None
+        with self._state_lock:
+            found = isinstance(target, (int, str)) and target in self._active
+            if found:
+                self._cancelled.add(target)
+        if "id" in message:
+            self._write({"jsonrpc": "2.0", "id": message["id"], "result": found})
+
+    def _is_cancelled(self, request_id) -> bool:
+        with self._state_lock:
+            return isinstance(request_id, (int, str)) and request_id in self._cancelled
+
+    def _finish(self, request_id) -> None:
+        if isinstance(request_id, (int, str)):
+            with self._state_lock:
+                self._active.discard(request_id)
+                self._cancelled.discard(request_id)
+
+    def _work(self) -> None:
+        warm_up()
+        while True:
+            message = self._requests.get()
+            if message is None:
+                return
+            if isinstance(message, list):
+                if not message:
+                    self._write(_error(None, INVALID_REQUEST, "empty batch"))
+                    continue
+                responses = [r for r in map(self._handle, message) if r is not None]
+                if responses:
+                    self._write(responses)
+            else:
+                response = self._handle(message)
+                if response is not None:
+                    self._write(response)
+
+    def _handle(self, message) -> dict | None:
+        if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+            return _error(None, INVALID_REQUEST, "expected a request object with a method")
+        request_id = message.get("id")
+        notification = "id" not in message
+        try:
+            if self._is_cancelled(request_id):
+                raise _RpcError(REQUEST_CANCELLED, "request cancelled")
+            result = self._call(message["method"], message.get("params"), request_id)
+        except _RpcError as e:
+            response = _error(request_id, e.code, str(e))
+        except Exception as e:
+            logger.info("stdio request failed method=%r error=%r", message["method"], e)
+            response = _error(request_id, CONVERSION_FAILED, f"{type(e).__name__}: {e}")
+        else:
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        finally:
+            self._finish(request_id)
+        return None if notification else response
+
+    def _call(self, method: str, params, request_id):
+        if method in _EXIT_METHODS:
+            return None
+        if method == "profiles":
+            return list(PROFILES)
+        if method == "to_latex":
+            mathml = params.get("mathml") if isinstance(params, dict) else None
+            if not isinstance(mathml, str):
+                raise _RpcError(INVALID_PARAMS, '"mathml" must be a string')
+            return mathml_to_latex(mathml)
+        if method not in ("convert", "convert_batch"):
+            raise _RpcError(METHOD_NOT_FOUND, f"unknown method: {method!r}")
+        if isinstance(params, list) and params:
+            params = {"latex": params[0]}
+        if not isinstance(params, dict):
+            raise _RpcError(INVALID_PARAMS, "params must be an object")
+        options = _options(params)
+        latex = params.get("latex")
+        if method == "convert":
+            if not isinstance(latex, str):
+                raise _RpcError(INVALID_PARAMS, '"latex" must be a string')
+            return convert(latex, **options)
+        if not isinstance(latex, list) or not all(isinstance(x, str) for x in latex):
+            raise _RpcError(INVALID_PARAMS, '"latex" must be a list of strings')
+        results = []
+        for item in latex:
+            # a long batch can be cancelled between formulas
+            if self._is_cancelled(request_id):
+                raise _RpcError(REQUEST_CANCELLED, "request cancelled")
+            try:
+                results.append({"result": convert(item, **options)})
+            except Exception as e:
+                results.append({"error": f"{type(e).__name__}: {e}"})
+        return results
+
+
+def serve_stdio(stdin: BinaryIO | None = None, stdout: BinaryIO | None = None) -> int:
+    return StdioServer(stdin or sys.stdin.buffer, stdout or sys.stdout.buffer).run()
@@ -3,12 +3,18 @@ from __future__ import annotations
 import logging
 import re
 import sys
+import threading
 from collections.abc import Callable
 
+from src.converters.mathml_to_latex import embedded_latex
+from src.services.clipboard_html import harvest_tex, has_mixed_math, mixed_text_to_html
 from src.ui.win_clipboard_watcher import WinClipboardWatcher
 
 logger = logging.getLogger(__name__)
 
+# MathML or OMML, whichever backend convert_latex writes
+_CONVERTED_PREFIXES = ("<math", "<m:oMath")
+
 
 class ClipboardAutoPaster:
     _INITIAL_READ_DELAY_MS = 50
@@ -21,14 +27,26 @@ class ClipboardAutoPaster:
         set_clipboard_text: Callable[[str], None],
         convert_latex: Callable[[str], str],
         on_preview: Callable[[str], None],
+        convert_mathml: Callable[[str], str] | None = None,
+        set_clipboard_html: Callable[[str, str], None] | None = None,
+        get_clipboard_html: Callable[[], str] | None = None,
     ) -> None:
         self._root = root
         self._get_clipboard_text = get_clipboard_text
         self._set_clipboard_text = set_clipboard_text
         self._convert_latex = convert_latex
         self._on_preview = on_preview
+        # prose with $...$ formulas becomes HTML with MathML; needs both
+        self._convert_mathml = convert_mathml
+        self._set_clipboard_html = set_clipboard_html
+        # rendered formulas copied from a browser keep their TeX in the HTML
+        self._get_clipboard_html = get_clipboard_html
 
         self._read_in_flight = False
+        self._mixed_in_flight = False
+        # the clipboard update caused by our own HTML write-back still carries
+        # the original text, which must not be converted again
+        self._own_write_text: str | None = None
         self._enabled = False
         self._win_watcher = (
             WinClipboardWatcher(on_update=lambda: self._root.after(0, self._on_clipboard_update))
@@ -84,27 +102,115 @@ class ClipboardAutoPaster:
             return
         self._read_in_flight = False
 
-        if self._looks_like_latex(text):
+        own_write, self._own_write_text = self._own_write_text, None
+        if text == own_write:
+            return
+
+        source = embedded_latex(text)
+        if source is not None:
+            # our own MathML: show the formula it came from, convert nothing
+            self._on_preview(self._summarize(source))
+            return
+
+        harvested = self._harvest_html_tex()
+        if harvested is not None:
+            # the plain text of rendered math is unusable; use the recovered TeX
+            logger.info("tex harvested from html len=%s", len(harvested))
+            self._on_preview(self._summarize(harvested))
+            if self._looks_like_mixed(harvested):
+                self._start_mixed_conversion(harvested, clipboard_text=text)
+            else:
+                # known to be TeX: the plain-text heuristics below do not apply
+                self._convert_and_write_back(harvested)
+            return
+
+        if self._looks_like_mixed(text):
+            self._on_preview(self._summarize(text))
+            self._start_mixed_conversion(text, clipboard_text=text)
+        elif self._looks_like_latex(text):
             summary = self._summarize(text)
             self._on_preview(summary)
             logger.info("latex detected len=%s summary=%r", len(text), summary)
+            self._convert_and_write_back(text)
+        else:
+            self._on_preview(self._summarize(text))
+
+    def _convert_and_write_back(self, text: str) -> None:
+        try:
+            converted = self._convert_latex(text)
+        except Exception as e:
+            logger.info("latex convert failed error=%r", e)
+            return
+
+        if converted and converted.startswith(_CONVERTED_PREFIXES) and converted != text:
+            logger.info("latex converted out_len=%s", len(converted))
+            self._try_write_back(converted=converted)
+
+    def _harvest_html_tex(self) -> str | None:
+        if self._get_clipboard_html is None:
+            return None
+        try:
+            html_text = self._get_clipboard_html()
+        except Exception as e:
+            logger.info("clipboard html read failed error=%r", e)
+            return None
+        if not html_text:
+            return None
+        try:
+            return harvest_tex(html_text)
+        except Exception as e:
+            logger.info("tex harvest failed error=%r", e)
+            return None
+
+    def _looks_like_mixed(self, text: str) -> bool:
+        if self._convert_mathml is None or self._set_clipboard_html is None:
+            return False
+        s = text.strip()
+        if not s or len(s) > 50000 or s.startswith(_CONVERTED_PREFIXES):
+            return False
+        return has_mixed_math(s)
+
+    def _start_mixed_conversion(self, text: str, *, clipboard_text: str) -> None:
+        # a long answer has many formulas; keep the Tk thread responsive
+        if self._mixed_in_flight:
+            return
+        self._mixed_in_flight = True
+
+        def run() -> None:
             try:
-                mathml = self._convert_latex(text)
+                fragment, count, failed = mixed_text_to_html(text, self._convert_mathml)
             except Exception as e:
-                logger.info("latex convert failed error=%r", e)
-                return
+                logger.info("mixed convert failed error=%r", e)
+                fragment = None
+                count = failed = 0
+            self._root.after(
+                0, lambda: self._finish_mixed_conversion(text, clipboard_text, fragment, count, failed)
+            )
 
-            if mathml and "<math" in mathml and mathml != text:
-                logger.info("latex converted mathml_len=%s", len(mathml))
-                self._try_write_back(mathml=mathml)
-        else:
-            self._on_preview(self._summarize(text))
+        threading.Thread(target=run, name="latex2word-mixed", daemon=True).start()
+
+    def _finish_mixed_conversion(
+        self, text: str, clipboard_text: str, fragment: str | None, count: int, failed: int
+    ) -> None:
+        self._mixed_in_flight = False
+        if fragment is None or not self._enabled or count == failed:
+            return
+        try:
+            if self._get_clipboard_text() != clipboard_text:
+                return  # copied something else meanwhile
+            self._own_write_text = text
+            self._set_clipboard_html(fragment, text)
+        except Exception as e:
+            self._own_write_text = None
+            logger.info("clipboard html write failed error=%r", e)
+            return
+        logger.info("mixed write_back success formulas=%s failed=%s", count, failed)
 
-    def _try_write_back(self, *, mathml: str) -> None:
+    def _try_write_back(self, *, converted: str) -> None:
         if not self._enabled:
             return
         try:
-            self._set_clipboard_text(mathml)
+            self._set_clipboard_text(converted)
         except Exception as e:
             logger.info("clipboard write failed error=%r", e)
             return
@@ -119,7 +225,7 @@ class ClipboardAutoPaster:
             return False
         if "\\mathrm" in s:
             return False
-        if s.startswith("<math"):
+        if s.startswith(_CONVERTED_PREFIXES):
             return False
         if 'xmlns="http://www.w3.org/1998/Math/MathML"' in s:
             return False
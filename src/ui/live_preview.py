@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# As-you-type conversion of the manual input box.  Every edit restarts a short
+# debounce timer; when it fires, the text goes to one worker thread.  A
+# request that is superseded before the worker picks it up is never converted,
+# and a result whose request was superseded while it ran is dropped, so only
+# the latest text reaches the window.  convert() keeps its result and subtree
+# caches, so an edit reconverts little more than the part that changed, and
+# the copy button publishes the finished result instead of converting again.
+
+Request = tuple  # (latex, output)
+
+
+class LivePreview:
+    _DEBOUNCE_MS = 250
+
+    def __init__(
+        self,
+        *,
+        root,
+        convert: Callable[[str, str], str],
+        on_status: Callable[[str], None],
+    ) -> None:
+        self._root = root
+        self._convert = convert
+        self._on_status = on_status
+
+        self._enabled = False
+        self._after_id = None
+        # bumped by every edit; results of older generations are stale
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._pending: tuple[int, Request] | None = None
+        self._worker: threading.Thread | None = None
+        self._result: tuple[Request, str] | None = None
+
+    def set_enabled(self, enabled: bool) -> None:
+        self._enabled = bool(enabled)
+        if not self._enabled:
+            self._cancel()
+            self._result = None
+
+    def schedule(self, latex: str, output: str) -> None:
+        if not self._enabled:
+            return
+        self._cancel()
+        latex = latex.strip()
+        if not latex:
+            self._on_status("")
+            return
+        request = (latex, output)
+        if self._result is not None and self._result[0] == request:
+            self._on_status("已转换")  # e.g. an edit that was undone
+            return
+        generation = self._generation
+        self._after_id = self._root.after(self._DEBOUNCE_MS, lambda: self._submit(generation, request))
+
+    def result_for(self, latex: str, output: str) -> str | None:
+        # the finished conversion of exactly this text, if there is one
+        result = self._result
+        if result is not None and result[0] == (latex.strip(), output):
+            return result[1]
+        return None
+
+    def invalidate(self) -> None:
+        # the conversion itself changed (e.g. new macro definitions)
+        self._result = None
+
+    def _cancel(self) -> None:
+        self._generation += 1
+        if self._after_id is not None:
+            self._root.after_cancel(self._after_id)
+            self._after_id = None
+        with self._cond:
+            self._pending = None
+
+    def _submit(self, generation: int, request: Request) -> None:
+        self._after_id = None
+        if generation != self._generation:
+            return
+        self._on_status("转换中…")
+        with self._cond:
+            self._pending = (generation, request)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="latex2word-preview", daemon=True)
+                self._worker.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                (generation, request), self._pending = self._pending, None
+            started = time.perf_counter()
+            try:
+                result, error = self._convert(*request), None
+            except Exception as e:
+                result, error = None, e
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._root.after(0, self._finish, generation, request, result, error, elapsed_ms)
+
+    def _finish(self, generation: int, request: Request, result: str | None, error, elapsed_ms: float) -> None:
+        if generation != self._generation or not self._enabled:
+            return
+        if error is not None:
+            logger.info("preview convert failed error=%r", error)
+            self._result = None
+            self._on_status(f"错误：{error}")
+            return
+        self._result = (request, result)
+        self._on_status(f"已转换 · {elapsed_ms:.0f} ms")
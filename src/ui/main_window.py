@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import os
 import sys
+import threading
 import webbrowser
 from pathlib import Path
 import customtkinter as ctk
 
-from src.converters.latex_to_mathml import convert
-from src.services.clipboard import copy_text, get_text
+from src.converters.incremental import IncrementalConverter
+from src.converters.latex_to_mathml import OUTPUT_FORMATS, PROFILES, convert
+from src.converters.warmup import start_background_warm_up
+from src.services.clipboard import copy_html, copy_text, get_html, get_text
+from src.services.docx_writer import export_docx
 from src.ui.clipboard_auto_paste import ClipboardAutoPaster
+from src.ui.live_preview import LivePreview
 from src.ui.tray_icon import TrayIcon
 from src.ui import windows_settings
+from src.utils.latex_macros import load_macro_files, set_macro_table
 
 
 class MainWindow:
@@ -19,6 +26,16 @@ class MainWindow:
 
         self._is_frozen = bool(getattr(sys, "frozen", False))
         self._start_silent = "--silent" in sys.argv[1:]
+        self._warm_up_on_start = "--warm-up" in sys.argv[1:]
+        self._profile = "word"
+        for arg in sys.argv[1:]:
+            if arg.startswith("--profile=") and arg[len("--profile="):] in PROFILES:
+                self._profile = arg[len("--profile="):]
+        # typing and re-copying edit one formula at a time: reconvert only the
+        # changed rows.  One converter each, so the two inputs neither evict
+        # each other's rows nor wait on each other's lock
+        self._incremental = IncrementalConverter(profile=self._profile)
+        self._paste_incremental = IncrementalConverter(profile=self._profile)
         self._centered_once = False
         self._set_windows_app_user_model_id()
 
@@ -32,6 +49,11 @@ class MainWindow:
         self._status_var = ctk.StringVar(value="")
         self._close_behavior_var = ctk.StringVar(value="exit")
         self._autostart_var = ctk.StringVar(value="off")
+        self._output_format_var = ctk.StringVar(value="mathml")
+        self._live_preview_var = ctk.BooleanVar(value=True)
+        self._annotate_var = ctk.BooleanVar(value=False)
+        # read by the conversion threads, which must not touch Tk variables
+        self._annotate = False
         self._topmost_enabled = False
         self._topmost_button: ctk.CTkSwitch | None = None
         self._copytex_help_window: ctk.CTkToplevel | None = None
@@ -39,9 +61,13 @@ class MainWindow:
             root=self._root,
             get_clipboard_text=get_text,
             set_clipboard_text=copy_text,
-            convert_latex=convert,
+            convert_latex=self._convert_pasted,
             on_preview=self._auto_paste_preview_var.set,
+            convert_mathml=lambda latex: convert(latex, profile=self._profile, annotate=self._annotate),
+            set_clipboard_html=copy_html,
+            get_clipboard_html=get_html,
         )
+        self._live_preview = LivePreview(root=self._root, convert=self._convert, on_status=self._status_var.set)
         self._tray: TrayIcon | None = None
 
         self._load_settings()
@@ -49,9 +75,13 @@ class MainWindow:
         self._build_ui()
         self._root.protocol("WM_DELETE_WINDOW", self._on_close)
         self._create_tray()
+        if self._warm_up_on_start:
+            start_background_warm_up()
         self._auto_paster.set_enabled(bool(self._auto_paste_var.get()))
+        self._live_preview.set_enabled(bool(self._live_preview_var.get()))
         if self._start_silent:
             self._root.withdraw()
+        self._apply_launch_args(sys.argv[1:], os.getcwd(), forwarded=False)
 
     def _resource_path(self, relative_path: str) -> str:
         base_dir = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parents[2]))
@@ -119,8 +149,24 @@ class MainWindow:
         manual.grid(row=1, column=0, sticky="ew", padx=0, pady=section_padding)
         manual.grid_columnconfigure(0, weight=1)
         
-        manual_label = ctk.CTkLabel(manual, text="手动输入", font=(font_family, 14, "bold"))
-        manual_label.grid(row=0, column=0, sticky="w", padx=12, pady=(10, 3))
+        manual_header = ctk.CTkFrame(manual, fg_color="transparent")
+        manual_header.grid(row=0, column=0, sticky="ew", padx=12, pady=(10, 3))
+        manual_header.grid_columnconfigure(0, weight=1)
+
+        manual_label = ctk.CTkLabel(manual_header, text="手动输入", font=(font_family, 14, "bold"))
+        manual_label.grid(row=0, column=0, sticky="w")
+
+        live_preview_switch = ctk.CTkSwitch(
+            manual_header,
+            text="实时转换",
+            variable=self._live_preview_var,
+            command=self._on_toggle_live_preview,
+            font=(font_family, 12),
+            width=50,
+            button_color="#3b8ed0",
+            progress_color="#3b8ed0"
+        )
+        live_preview_switch.grid(row=0, column=1, sticky="e")
 
         self._text = ctk.CTkTextbox(
             manual,
@@ -134,6 +180,7 @@ class MainWindow:
             border_color=("gray85", "gray30")
         )
         self._text.grid(row=1, column=0, sticky="ew", padx=12, pady=6)
+        self._text.bind("<<Modified>>", self._on_text_modified)
 
         manual_bottom = ctk.CTkFrame(manual, fg_color="transparent")
         manual_bottom.grid(row=2, column=0, sticky="ew", padx=12, pady=(0, 10))
@@ -264,8 +311,38 @@ class MainWindow:
                 text_color=("gray50", "gray70"),
             ).pack(side="right")
 
+        row_format = ctk.CTkFrame(settings, fg_color="transparent")
+        row_format.grid(row=3, column=0, sticky="ew", padx=12, pady=3)
+
+        ctk.CTkLabel(row_format, text="输出格式", font=(font_family, 12)).pack(side="left")
+
+        ctk.CTkRadioButton(
+            row_format, text="OMML", value="omml", variable=self._output_format_var,
+            command=self._on_output_format_changed, **radio_style
+        ).pack(side="right", padx=(10, 0))
+
+        ctk.CTkRadioButton(
+            row_format, text="MathML", value="mathml", variable=self._output_format_var,
+            command=self._on_output_format_changed, **radio_style
+        ).pack(side="right", padx=(10, 0))
+
+        row_annotate = ctk.CTkFrame(settings, fg_color="transparent")
+        row_annotate.grid(row=4, column=0, sticky="ew", padx=12, pady=3)
+
+        ctk.CTkLabel(row_annotate, text="MathML 内嵌 LaTeX 源码", font=(font_family, 12)).pack(side="left")
+        ctk.CTkSwitch(
+            row_annotate,
+            text="",
+            variable=self._annotate_var,
+            command=self._on_toggle_annotate,
+            font=(font_family, 12),
+            width=50,
+            onvalue=True,
+            offvalue=False
+        ).pack(side="right", padx=(0, 0))
+
         row3 = ctk.CTkFrame(settings, fg_color="transparent")
-        row3.grid(row=3, column=0, sticky="ew", padx=12, pady=(3, 10))
+        row3.grid(row=5, column=0, sticky="ew", padx=12, pady=(3, 10))
 
         ctk.CTkLabel(row3, text="窗口置顶", font=(font_family, 12)).pack(side="left")
         self._topmost_button = ctk.CTkSwitch(
@@ -302,13 +379,51 @@ class MainWindow:
         latex = self._text.get("1.0", "end").strip()
         if not latex:
             return
+        output = self._output_format_var.get()
         try:
-            mathml = convert(latex)
-            copy_text(mathml)
+            # with live conversion on, the text has usually been converted already
+            converted = self._live_preview.result_for(latex, output)
+            copy_text(converted if converted is not None else self._convert(latex, output))
             self._set_status("完成")
         except Exception as e:
             self._set_status(f"失败：{e}")
 
+    def _convert(self, latex: str, output: str | None = None) -> str:
+        # the embedded source lets the auto paster, and a later paste back
+        # into this tool, recover the LaTeX; Word ignores the annotation
+        output = output or self._output_format_var.get()
+        return self._incremental.convert(latex, output=output, annotate=self._annotate)
+
+    def _convert_pasted(self, latex: str) -> str:
+        output = self._output_format_var.get()
+        return self._paste_incremental.convert(latex, output=output, annotate=self._annotate)
+
+    def _on_text_modified(self, _event=None) -> None:
+        # <<Modified>> fires once until the flag is reset
+        self._text.edit_modified(False)
+        self._schedule_live_preview()
+
+    def _schedule_live_preview(self) -> None:
+        self._live_preview.schedule(self._text.get("1.0", "end"), self._output_format_var.get())
+
+    def _on_toggle_live_preview(self) -> None:
+        enabled = bool(self._live_preview_var.get())
+        self._live_preview.set_enabled(enabled)
+        self._status_var.set("")
+        self._persist_settings()
+        if enabled:
+            self._schedule_live_preview()
+
+    def _on_output_format_changed(self) -> None:
+        self._persist_settings()
+        self._schedule_live_preview()
+
+    def _on_toggle_annotate(self) -> None:
+        self._annotate = bool(self._annotate_var.get())
+        self._persist_settings()
+        self._live_preview.invalidate()
+        self._schedule_live_preview()
+
     def _on_toggle_auto_paste(self) -> None:
         enabled = bool(self._auto_paste_var.get())
         self._auto_paster.set_enabled(enabled)
@@ -559,6 +674,44 @@ class MainWindow:
         except Exception:
             pass
 
+    def handle_forwarded_launch(self, message: dict) -> None:
+        # called on the single-instance listener thread
+        argv = [str(arg) for arg in message.get("argv") or []]
+        cwd = str(message.get("cwd") or os.getcwd())
+        self._root.after(0, lambda: self._apply_launch_args(argv, cwd, forwarded=True))
+
+    def _apply_launch_args(self, argv: list[str], cwd: str, *, forwarded: bool) -> None:
+        # latex2word [--show] [--silent] [--toggle-auto-paste] [--macros=FILE ...] [FILE.md ...]
+        files = [arg for arg in argv if not arg.startswith("--")]
+        macro_files = [os.path.join(cwd, arg[len("--macros="):]) for arg in argv if arg.startswith("--macros=")]
+        if macro_files:
+            try:
+                set_macro_table(load_macro_files(macro_files))
+                self._live_preview.invalidate()
+                self._schedule_live_preview()
+            except (OSError, ValueError) as e:
+                self._set_status(f"宏定义文件加载失败：{e}")
+        if "--toggle-auto-paste" in argv:
+            self._set_auto_paste_enabled(not self._auto_paste_var.get())
+        for path in files:
+            self._export_file(os.path.join(cwd, path))
+        if forwarded and ("--show" in argv or not ({"--toggle-auto-paste", "--silent"} & set(argv))):
+            self._show_window()
+
+    def _export_file(self, path: str) -> None:
+        dst = os.path.splitext(path)[0] + ".docx"
+        self._set_status(f"正在导出 {os.path.basename(dst)}…")
+
+        def run() -> None:
+            try:
+                stats = export_docx(path, dst, jobs=1)
+                text = f"已导出 {os.path.basename(dst)}（公式 {stats['formulas']} 个，失败 {stats['failed']} 个）"
+            except Exception as e:
+                text = f"导出失败：{e}"
+            self._root.after(0, lambda: self._set_status(text))
+
+        threading.Thread(target=run, name="latex2word-export", daemon=True).start()
+
     def _set_auto_paste_enabled(self, enabled: bool) -> None:
         self._auto_paste_var.set(bool(enabled))
         self._on_toggle_auto_paste()
@@ -576,6 +729,16 @@ class MainWindow:
         auto_paste = settings.get("auto_paste")
         if isinstance(auto_paste, bool):
             self._auto_paste_var.set(auto_paste)
+        output_format = settings.get("output_format")
+        if output_format in OUTPUT_FORMATS:
+            self._output_format_var.set(output_format)
+        live_preview = settings.get("live_preview")
+        if isinstance(live_preview, bool):
+            self._live_preview_var.set(live_preview)
+        annotate = settings.get("annotate")
+        if isinstance(annotate, bool):
+            self._annotate_var.set(annotate)
+            self._annotate = annotate
 
     def _sync_autostart_state(self) -> None:
         state = windows_settings.get_autostart_state(is_frozen=self._is_frozen)
@@ -592,6 +755,9 @@ class MainWindow:
             close_behavior=self._close_behavior_var.get(),
             autostart=self._autostart_var.get(),
             auto_paste=bool(self._auto_paste_var.get()),
+            output_format=self._output_format_var.get(),
+            live_preview=bool(self._live_preview_var.get()),
+            annotate=bool(self._annotate_var.get()),
             is_frozen=self._is_frozen,
         )
 
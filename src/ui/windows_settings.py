@@ -17,18 +17,42 @@ def load_settings(*, is_frozen: bool) -> dict[str, object] | None:
             close_behavior, _ = winreg.QueryValueEx(key, "close_behavior")
             autostart, _ = winreg.QueryValueEx(key, "autostart")
             auto_paste, _ = winreg.QueryValueEx(key, "auto_paste")
+            try:
+                output_format, _ = winreg.QueryValueEx(key, "output_format")
+            except FileNotFoundError:
+                output_format = None
+            try:
+                live_preview, _ = winreg.QueryValueEx(key, "live_preview")
+            except FileNotFoundError:
+                live_preview = None
+            try:
+                annotate, _ = winreg.QueryValueEx(key, "annotate")
+            except FileNotFoundError:
+                annotate = None
             winreg.CloseKey(key)
             return {
                 "close_behavior": close_behavior,
                 "autostart": autostart if is_frozen else None,
                 "auto_paste": str(auto_paste) == "1",
+                "output_format": output_format,
+                "live_preview": None if live_preview is None else str(live_preview) == "1",
+                "annotate": None if annotate is None else str(annotate) == "1",
             }
         except Exception:
             continue
     return None
 
 
-def persist_settings(*, close_behavior: str, autostart: str, auto_paste: bool, is_frozen: bool) -> None:
+def persist_settings(
+    *,
+    close_behavior: str,
+    autostart: str,
+    auto_paste: bool,
+    output_format: str,
+    live_preview: bool,
+    annotate: bool,
+    is_frozen: bool,
+) -> None:
     if winreg is None:
         return
     try:
@@ -37,6 +61,9 @@ def persist_settings(*, close_behavior: str, autostart: str, auto_paste: bool, i
         if is_frozen:
             winreg.SetValueEx(key, "autostart", 0, winreg.REG_SZ, autostart)
         winreg.SetValueEx(key, "auto_paste", 0, winreg.REG_SZ, "1" if auto_paste else "0")
+        winreg.SetValueEx(key, "output_format", 0, winreg.REG_SZ, output_format)
+        winreg.SetValueEx(key, "live_preview", 0, winreg.REG_SZ, "1" if live_preview else "0")
+        winreg.SetValueEx(key, "annotate", 0, winreg.REG_SZ, "1" if annotate else "0")
         winreg.CloseKey(key)
     except Exception:
         return
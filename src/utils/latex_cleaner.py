@@ -1,5 +1,7 @@
 import re
 
+from src.utils.latex_macros import expand_macros
+
 def normalize_input(text: str) -> str:
     s = text.strip()
     s = s.replace("$$", "")
@@ -13,3 +15,137 @@ def normalize_input(text: str) -> str:
     s = re.sub(r"\\\\\[[^\]]*\]", r"\\\\", s)
     s = re.sub(r"\s+", " ", s)
     return s
+
+
+_TOKEN_RE = re.compile(r"\\[a-zA-Z]+|\\.|\s+|.", re.S)
+_DIGIT_CHARS = frozenset("0123456789.")
+
+# Groups after these keep their inner spaces; everything else is math mode,
+# where latex2mathml ignores whitespace (except between digits, see below).
+_TEXT_MODE_COMMANDS = frozenset({
+    "\\text", "\\textrm", "\\textit", "\\textbf", "\\textsf", "\\texttt", "\\textnormal", "\\mbox",
+})
+
+# Argument positions where a braced single token only adds an mrow around one
+# child, so "x^{2}" and "x^2" are the same formula.
+_ONE_ARG_COMMANDS = frozenset({
+    "^", "_", "\\sqrt", "\\hat", "\\bar", "\\vec", "\\tilde", "\\dot", "\\ddot", "\\check",
+    "\\breve", "\\acute", "\\grave", "\\overline", "\\underline", "\\widehat", "\\widetilde",
+})
+_TWO_ARG_COMMANDS = frozenset({"\\frac", "\\dfrac", "\\tfrac", "\\binom"})
+_SYMBOL_COMMANDS = frozenset({
+    "\\alpha", "\\beta", "\\gamma", "\\delta", "\\epsilon", "\\varepsilon", "\\zeta", "\\eta",
+    "\\theta", "\\vartheta", "\\iota", "\\kappa", "\\lambda", "\\mu", "\\nu", "\\xi", "\\pi",
+    "\\varpi", "\\rho", "\\varrho", "\\sigma", "\\varsigma", "\\tau", "\\upsilon", "\\phi",
+    "\\varphi", "\\chi", "\\psi", "\\omega", "\\Gamma", "\\Delta", "\\Theta", "\\Lambda", "\\Xi",
+    "\\Pi", "\\Sigma", "\\Upsilon", "\\Phi", "\\Psi", "\\Omega", "\\prime", "\\infty",
+    "\\partial", "\\ell", "\\nabla", "\\hbar", "\\imath", "\\jmath",
+})
+
+
+def _strip_math_delimiters(s: str) -> str:
+    for begin, end in (("\\[", "\\]"), ("\\(", "\\)"), ("\\begin{equation*}", "\\end{equation*}")):
+        if s.startswith(begin) and s.endswith(end) and len(s) >= len(begin) + len(end):
+            return s[len(begin):len(s) - len(end)].strip()
+    if len(s) >= 2 and s[0] == "$" and s[-1] == "$" and s[-2] != "\\":
+        inner = s[1:-1]
+        if not re.search(r"(?<!\\)\$", inner):
+            return inner.strip()
+    return s
+
+
+def _next_token(tokens: list[str], i: int) -> int:
+    n = len(tokens)
+    while i < n and tokens[i].isspace():
+        i += 1
+    return i
+
+
+def _simple_group(tokens: list[str], i: int):
+    # "{" token "}" (spaces allowed) -> (token, index after "}")
+    if i >= len(tokens) or tokens[i] != "{":
+        return None
+    k = _next_token(tokens, i + 1)
+    if k >= len(tokens):
+        return None
+    tok = tokens[k]
+    if not ((len(tok) == 1 and tok.isascii() and tok.isalnum()) or tok in _SYMBOL_COMMANDS):
+        return None
+    end = _next_token(tokens, k + 1)
+    if end >= len(tokens) or tokens[end] != "}":
+        return None
+    return tok, end + 1
+
+
+def _can_unbrace(tok: str, tokens: list[str], follow: int) -> bool:
+    # "x^{1}2" must not become "x^12", latex2mathml reads digit runs as one number
+    if tok not in _DIGIT_CHARS:
+        return True
+    follow = _next_token(tokens, follow)
+    return follow >= len(tokens) or tokens[follow][0] not in _DIGIT_CHARS
+
+
+def canonicalize_latex(text: str) -> str:
+    # user macros are expanded first, so the cache key is the expanded formula
+    s = _strip_math_delimiters(normalize_input(expand_macros(text)))
+    tokens = _TOKEN_RE.findall(s)
+    out: list[str] = []
+    last = ""
+    pending_space = False
+
+    def emit(tok: str) -> None:
+        nonlocal last, pending_space
+        if last:
+            if last[0] == "\\" and last[1:2].isalpha() and tok[0].isalpha():
+                out.append(" ")
+            elif pending_space and last[-1] in _DIGIT_CHARS and tok[0] in _DIGIT_CHARS:
+                out.append(" ")
+        out.append(tok)
+        last = tok
+        pending_space = False
+
+    i = 0
+    n = len(tokens)
+    while i < n:
+        tok = tokens[i]
+        if tok.isspace():
+            pending_space = True
+            i += 1
+            continue
+
+        emit(tok)
+        i += 1
+
+        if tok in _TEXT_MODE_COMMANDS:
+            j = _next_token(tokens, i)
+            if j < n and tokens[j] == "{":
+                depth = 0
+                start = j
+                while j < n:
+                    if tokens[j] == "{":
+                        depth += 1
+                    elif tokens[j] == "}":
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    j += 1
+                out.append("".join(tokens[start:j + 1]))
+                last = "}"
+                i = j + 1
+            continue
+
+        if tok in _ONE_ARG_COMMANDS:
+            j = _next_token(tokens, i)
+            group = _simple_group(tokens, j)
+            if group is not None and _can_unbrace(group[0], tokens, group[1]):
+                emit(group[0])
+                i = group[1]
+        elif tok in _TWO_ARG_COMMANDS:
+            first = _simple_group(tokens, _next_token(tokens, i))
+            second = _simple_group(tokens, _next_token(tokens, first[1])) if first is not None else None
+            if second is not None and _can_unbrace(second[0], tokens, second[1]):
+                emit(first[0])
+                emit(second[0])
+                i = second[1]
+
+    return "".join(out)
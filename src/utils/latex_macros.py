@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import ChainMap, namedtuple
+from functools import lru_cache
+
+# \newcommand / \DeclareMathOperator / \def shorthands, which latex2mathml does
+# not know.  Macro files are compiled once into a table of token lists;
+# expansion then walks the formula's tokens once with an explicit stack, so
+# its cost depends on the formula and the expansion, not on how many macros
+# the table holds.  Definitions inside a formula apply to that formula only.
+
+_TOKEN_RE = re.compile(r"\\[a-zA-Z]+|\\.|\s+|.", re.S)
+_COMMAND_RE = re.compile(r"\\[a-zA-Z]+")
+_COMMENT_RE = re.compile(r"(?<!\\)%[^\n]*")
+
+# nesting depth of expansions, and total expansions / output tokens per formula
+_MAX_DEPTH = 64
+_MAX_EXPANSIONS = 10_000
+_MAX_OUTPUT_TOKENS = 200_000
+
+_NEWCOMMANDS = frozenset({"\\newcommand", "\\renewcommand", "\\providecommand"})
+_OPERATOR_DECLARATIONS = frozenset({"\\DeclareMathOperator"})
+_DEFINITIONS = _NEWCOMMANDS | _OPERATOR_DECLARATIONS | {"\\def", "\\let"}
+# latex2mathml only reads a plain run of letters as an operator name
+_OPERATOR_SPACES = frozenset({"\\,", "\\;", "\\:", "\\!", "\\ ", "~"})
+
+# body: tokens, with an int n for the parameter #n
+_Macro = namedtuple("_Macro", "nargs default body")
+
+
+class MacroError(ValueError):
+    pass
+
+
+class MacroTable:
+    def __init__(self, macros: dict | None = None) -> None:
+        self.macros: dict[str, _Macro] = dict(macros or {})
+
+    def __len__(self) -> int:
+        return len(self.macros)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.macros
+
+    def merged(self, other: MacroTable) -> MacroTable:
+        return MacroTable({**self.macros, **other.macros})
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def _skip_spaces(tokens: list[str], i: int) -> int:
+    while i < len(tokens) and tokens[i].isspace():
+        i += 1
+    return i
+
+
+def _read_group(tokens: list[str], i: int, open_tok: str = "{", close_tok: str = "}"):
+    # tokens[i] == open_tok -> (inner tokens, index after the closing token)
+    depth = 0
+    for j in range(i, len(tokens)):
+        tok = tokens[j]
+        if tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+        if open_tok == "[" and depth == 0 and tok == "]" and j > i:
+            return tokens[i + 1:j], j + 1
+        if open_tok == "{" and depth == 0:
+            return tokens[i + 1:j], j + 1
+    raise MacroError(f"unbalanced {open_tok} in macro definition")
+
+
+def _read_name(tokens: list[str], i: int):
+    # \name or {\name}
+    i = _skip_spaces(tokens, i)
+    if i < len(tokens) and tokens[i] == "{":
+        inner, end = _read_group(tokens, i)
+        inner = [t for t in inner if not t.isspace()]
+        if len(inner) == 1 and inner[0].startswith("\\"):
+            return inner[0], end
+    elif i < len(tokens) and tokens[i].startswith("\\"):
+        return tokens[i], i + 1
+    raise MacroError("expected a macro name")
+
+
+def _compile_body(tokens: list[str], nargs: int) -> tuple:
+    body = []
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok == "#" and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+            n = int(tokens[i + 1])
+            if not 1 <= n <= nargs:
+                raise MacroError(f"#{n} used in a macro with {nargs} parameters")
+            body.append(n)
+            i += 2
+            continue
+        body.append(tok)
+        i += 1
+    return tuple(body)
+
+
+def _read_definition(tokens: list[str], i: int, macros) -> int:
+    # tokens[i] is a defining command; stores the macro in macros (a dict,
+    # or a ChainMap over the table) and returns the index after it
+    command = tokens[i]
+    i += 1
+    star = i < len(tokens) and tokens[i] == "*"
+    if star:
+        i += 1
+    if command == "\\let":
+        name, i = _read_name(tokens, i)
+        i = _skip_spaces(tokens, i)
+        if i < len(tokens) and tokens[i] == "=":
+            i = _skip_spaces(tokens, i + 1)
+        if i >= len(tokens):
+            raise MacroError(f"\\let{name} without a target")
+        target = tokens[i]
+        macros[name] = macros.get(target) or _Macro(0, None, (target,))
+        return i + 1
+    if command == "\\def":
+        name, i = _read_name(tokens, i)
+        nargs = 0
+        while i + 1 < len(tokens) and tokens[i] == "#" and tokens[i + 1] == str(nargs + 1):
+            nargs += 1
+            i += 2
+        i = _skip_spaces(tokens, i)
+        if i >= len(tokens) or tokens[i] != "{":
+            raise MacroError(f"\\def{name} without a body")
+        body, i = _read_group(tokens, i)
+        macros[name] = _Macro(nargs, None, _compile_body(body, nargs))
+        return i
+    name, i = _read_name(tokens, i)
+    if command in _OPERATOR_DECLARATIONS:
+        i = _skip_spaces(tokens, i)
+        if i >= len(tokens) or tokens[i] != "{":
+            raise MacroError(f"{command}{{{name}}} without an operator name")
+        text, i = _read_group(tokens, i)
+        text = [t for t in text if not t.isspace() and t not in _OPERATOR_SPACES]
+        operator = "\\operatorname*" if star else "\\operatorname"
+        macros[name] = _Macro(0, None, (operator, "{", *text, "}"))
+        return i
+    nargs = 0
+    default = None
+    j = _skip_spaces(tokens, i)
+    if j < len(tokens) and tokens[j] == "[":
+        count, j = _read_group(tokens, j, "[", "]")
+        try:
+            nargs = int("".join(count).strip())
+        except ValueError:
+            raise MacroError(f"bad parameter count for {name}") from None
+        if not 0 <= nargs <= 9:
+            raise MacroError(f"bad parameter count for {name}")
+        i = j
+        j = _skip_spaces(tokens, i)
+        if j < len(tokens) and tokens[j] == "[":
+            default, i = _read_group(tokens, j, "[", "]")
+            default = tuple(default)
+    i = _skip_spaces(tokens, i)
+    if i >= len(tokens) or tokens[i] != "{":
+        raise MacroError(f"{command}{{{name}}} without a body")
+    body, i = _read_group(tokens, i)
+    if command == "\\providecommand" and name in macros:
+        return i
+    macros[name] = _Macro(nargs, default, _compile_body(body, nargs))
+    return i
+
+
+def parse_macros(source: str) -> MacroTable:
+    # definitions from a .tex/.sty style file; anything else is ignored
+    tokens = _tokenize(_COMMENT_RE.sub("", source))
+    macros: dict[str, _Macro] = {}
+    i = 0
+    while i < len(tokens):
+        if tokens[i] in _DEFINITIONS:
+            i = _read_definition(tokens, i, macros)
+        else:
+            i += 1
+    return MacroTable(macros)
+
+
+@lru_cache(maxsize=32)
+def _load_file(path: str, mtime_ns: int, size: int) -> MacroTable:
+    with open(path, encoding="utf-8") as f:
+        return parse_macros(f.read())
+
+
+def load_macro_files(paths) -> MacroTable:
+    # later files override earlier ones; an unchanged file is not re-read
+    table = MacroTable()
+    for path in paths:
+        st = os.stat(path)
+        table = table.merged(_load_file(os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return table
+
+
+_active_table = MacroTable()
+
+
+def set_macro_table(table: MacroTable | None) -> None:
+    # the table expand_macros uses by default; process pools pass it to
+    # their workers' initializer
+    global _active_table
+    _active_table = table if table is not None else MacroTable()
+
+
+def get_macro_table() -> MacroTable:
+    return _active_table
+
+
+def _read_argument(stack: list, optional: bool = False):
+    # pops one argument off the expansion stack (top = next token)
+    while stack and stack[-1][0].isspace():
+        stack.pop()
+    if not stack:
+        return None
+    if optional:
+        if stack[-1][0] != "[":
+            return None
+        stack.pop()
+        out = []
+        depth = 0
+        while stack:
+            tok = stack.pop()[0]
+            if tok == "{":
+                depth += 1
+            elif tok == "}":
+                depth -= 1
+            elif tok == "]" and depth == 0:
+                return out
+            out.append(tok)
+        raise MacroError("unterminated optional argument")
+    tok = stack.pop()[0]
+    if tok != "{":
+        return [tok]
+    out = []
+    depth = 1
+    while stack:
+        tok = stack.pop()[0]
+        if tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+            if depth == 0:
+                return out
+        out.append(tok)
+    raise MacroError("unterminated macro argument")
+
+
+class _StackTokens:
+    # the tokens still on the expansion stack (top = next token), indexed
+    # like a list for _read_definition without copying the stack
+    def __init__(self, stack: list) -> None:
+        self._stack = stack
+
+    def __len__(self) -> int:
+        return len(self._stack)
+
+    def __getitem__(self, i):
+        n = len(self._stack)
+        if isinstance(i, slice):
+            return [self._stack[n - 1 - j][0] for j in range(*i.indices(n))]
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return self._stack[n - 1 - i][0]
+
+
+def expand_macros(text: str, table: MacroTable | None = None) -> str:
+    macros = (table if table is not None else _active_table).macros
+    if "\\" not in text:
+        return text
+    names = {m.group(0) for m in _COMMAND_RE.finditer(text)}
+    if not any(name in macros or name in _DEFINITIONS for name in names):
+        return text
+    tokens = _tokenize(text)
+    scope = ChainMap({}, macros)  # writes go to the formula's own layer
+    stack = [(tok, 0) for tok in reversed(tokens)]
+    out: list[str] = []
+    expansions = 0
+    while stack:
+        if stack[-1][0] in _DEFINITIONS:
+            # a definition inside the formula: read it from the stack tokens
+            end = _read_definition(_StackTokens(stack), 0, scope)
+            del stack[len(stack) - end:]
+            continue
+        tok, depth = stack.pop()
+        macro = scope.get(tok)
+        if macro is None:
+            if out and out[-1][0] == "\\" and out[-1][1:2].isalpha() and tok[0].isalpha():
+                out.append(" ")  # \alpha#1 with #1 = b must not become \alphab
+            out.append(tok)
+            if len(out) > _MAX_OUTPUT_TOKENS:
+                raise MacroError("macro expansion too long")
+            continue
+        expansions += 1
+        if depth >= _MAX_DEPTH or expansions > _MAX_EXPANSIONS:
+            raise MacroError(f"macro expansion limit reached at {tok}")
+        args = []
+        first = 1
+        if macro.default is not None:
+            optional = _read_argument(stack, optional=True)
+            args.append(list(macro.default) if optional is None else optional)
+            first = 2
+        for _ in range(first, macro.nargs + 1):
+            arg = _read_argument(stack)
+            if arg is None:
+                raise MacroError(f"missing argument for {tok}")
+            args.append(arg)
+        expanded: list[str] = []
+        for part in macro.body:
+            if isinstance(part, int):
+                expanded.extend(args[part - 1])
+            else:
+                expanded.append(part)
+        stack.extend((t, depth + 1) for t in reversed(expanded))
+    return "".join(out)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+# Math delimiters found in Markdown/LaTeX answers, longest first so "$$" wins
+# over "$".  Environments keep their \begin/\end, latex2mathml needs them.
+_MATH_RE = re.compile(
+    r"\$\$(?P<dd>.+?)\$\$"
+    r"|\\\[(?P<bracket>.+?)\\\]"
+    r"|(?P<env>\\begin\{(?P<name>equation\*?|align\*?|aligned|gather\*?|multline\*?|eqnarray\*?)\}.+?\\end\{(?P=name)\})"
+    r"|\\\((?P<paren>.+?)\\\)"
+    r"|(?<![\\$])\$(?P<d>[^\s$](?:[^$]*?[^\s\\$])?)\$(?!\d)",
+    re.S,
+)
+_DISPLAY_MARKERS = re.compile(r"\$\$|\\\[|\\\]|\\begin\{|\\end\{")
+# a display block still open after this many lines (or at the end of the
+# input) is taken to be unclosed, e.g. a stray "$$": its paragraph ends at
+# its first blank line and the lines after that are read again
+_MAX_OPEN_DISPLAY_LINES = 200
+
+
+def split_math_segments(text: str) -> list[tuple[str, str]]:
+    # -> [(kind, content)] with kind in {"text", "inline", "display"}
+    segments: list[tuple[str, str]] = []
+    pos = 0
+    for m in _MATH_RE.finditer(text):
+        if m.start() > pos:
+            segments.append(("text", text[pos:m.start()]))
+        if m.group("d") is not None:
+            segments.append(("inline", m.group("d")))
+        elif m.group("paren") is not None:
+            segments.append(("inline", m.group("paren").strip()))
+        elif m.group("env") is not None:
+            env = m.group("env")
+            if m.group("name").startswith("equation"):
+                env = env[env.index("}") + 1:env.rindex("\\end{")]
+            segments.append(("display", env.strip()))
+        else:
+            segments.append(("display", (m.group("dd") or m.group("bracket")).strip()))
+        pos = m.end()
+    if pos < len(text):
+        segments.append(("text", text[pos:]))
+    return segments
+
+
+def iter_paragraphs(lines: Iterable[str]) -> Iterator[str]:
+    # Blank-line separated paragraphs, without splitting a display block that
+    # contains blank lines.  Reads lazily so huge inputs stay bounded, also
+    # when a "$$" or \begin is never closed.
+    lines = iter(lines)
+    reread: deque[str] = deque()
+    buf: list[str] = []
+    dollars = False
+    depth = 0
+    while True:
+        line = reread.popleft() if reread else next(lines, None)
+        unclosed = (dollars or depth > 0) and len(buf) >= _MAX_OPEN_DISPLAY_LINES
+        if line is None or (unclosed and not line.strip()):
+            if not buf:
+                return
+            blank = next((i for i, b in enumerate(buf) if not b.strip()), len(buf))
+            if (dollars or depth > 0) and blank < len(buf):
+                reread.extendleft(reversed(buf[blank + 1:]))
+                buf = buf[:blank]
+            yield "\n".join(buf)
+            buf = []
+            dollars = False
+            depth = 0
+            continue
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            if buf and not dollars and depth <= 0:
+                yield "\n".join(buf)
+                buf = []
+                depth = 0
+            elif buf:
+                buf.append(line)
+            continue
+        buf.append(line)
+        for m in _DISPLAY_MARKERS.finditer(line):
+            tok = m.group()
+            if tok == "$$":
+                dollars = not dollars
+            elif tok in ("\\[", "\\begin{"):
+                depth += 1
+            else:
+                depth -= 1
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.converters import latex_to_mathml as m
+
+# The result, plan and subtree caches are shared by every thread.  With
+# budgets small enough that entries are evicted while other threads read
+# them, concurrent conversions must still match a conversion with all caches
+# off.  The work list is fixed; only the interleaving varies between runs.
+TARGETS = [("word", "mathml"), ("libreoffice", "mathml"), ("web", "mathml"), ("word", "omml")]
+THREADS = 8
+
+
+def _corpus() -> list[str]:
+    # families that repeat subexpressions, so the subtree cache is hit across formulas
+    corpus = []
+    for i in range(12):
+        corpus.append(rf"\frac{{a_{{{i}}} + b}}{{\sqrt{{x^{{{i}}} + 1}}}}")
+        corpus.append(rf"\left( \sum_{{k=0}}^{{{i}}} \binom{{n}}{{k}} x^k \right)^2")
+        corpus.append(rf"\begin{{bmatrix}} \cos\theta_{{{i}}} & -\sin\theta_{{{i}}} \\ \sin\theta_{{{i}}} & \cos\theta_{{{i}}} \end{{bmatrix}}")
+        corpus.append(rf"\begin{{aligned}} f_{{{i}}}(x) &= (x+{i})^2 \\ &= x^2 + {2 * i}x + {i * i} \end{{aligned}}")
+        corpus.append(rf"\int_0^{{{i}}} \mathrm{{e}}^{{-x^2}}\,\mathrm{{d}}x + \hat{{v}}_{{{i}}} \cdot \vec{{w}}")
+    return corpus
+
+
+@pytest.fixture
+def small_caches():
+    yield
+    m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+    m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+    m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+
+
+def test_threads_match_uncached_conversion(small_caches):
+    corpus = _corpus()
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    expected = {(f, p, o): m.convert(f, profile=p, output=o) for f in corpus for p, o in TARGETS}
+
+    m.set_result_cache_budget(20_000)
+    m.set_plan_cache_budget(20_000)
+    m.set_subtree_cache_budget(2_000)
+    keys = sorted(expected)
+    # every thread walks the whole corpus from a different offset, so the
+    # same formulas are converted concurrently
+    work = [keys[(t * 37 + i) % len(keys)] for i in range(len(keys)) for t in range(THREADS)]
+
+    def check(index: int):
+        f, p, o = work[index]
+        if index % 97 == 0:
+            m.clear_subtree_cache()
+        return None if m.convert(f, profile=p, output=o) == expected[work[index]] else work[index]
+
+    for _ in range(2):  # second pass: the caches are warm
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            mismatches = [item for item in pool.map(check, range(len(work))) if item is not None]
+        assert mismatches == []
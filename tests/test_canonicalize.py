@@ -0,0 +1,72 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src.converters import latex_to_mathml as m
+from src.utils.latex_cleaner import _strip_math_delimiters, canonicalize_latex, normalize_input
+
+# Spellings of one formula that convert to the same MathML share a cache key
+VARIANTS = [
+    [r"x^{2}", r"x^2", r"x ^ { 2 }", r"$x^2$", r"\[ x^2 \]", r"\( x^{ 2 } \)"],
+    [r"\frac{a}{b}", r"\frac ab", r"\frac { a } { b }", r"$$\frac{a}{b}$$"],
+    [r"\sqrt{x}+\hat{y}", r"\sqrt x + \hat y", r"\sqrt{ x } +\hat {y}"],
+    [r"\frac{\alpha}{\beta}", r"\frac\alpha\beta", r"\frac {\alpha} {\beta}"],
+    [r"a_{i}^{n}", r"a_i^n", r"a _i ^{n}"],
+]
+
+# ... and ones that differ must not
+DISTINCT = [
+    (r"x^{1}2", r"x^12"),  # digit runs are one number
+    (r"1 2", r"12"),
+    (r"\alpha b", r"\alphab"),
+    (r"\text{a b}", r"\text{ab}"),  # text mode keeps its spaces
+    (r"x^{ab}", r"x^ab"),
+]
+
+
+def _without_single_mrows(mathml: str) -> str:
+    # unbracing x^{2} to x^2 only drops the mrow around the lone child
+    root = ET.fromstring(mathml)
+    for parent in root.iter():
+        for i, child in enumerate(list(parent)):
+            while child.tag.endswith("}mrow") and not child.attrib and len(child) == 1:
+                child = child[0]
+            parent[i] = child
+    return ET.canonicalize(ET.tostring(root, encoding="unicode"))
+
+
+@pytest.fixture
+def no_caches():
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    yield
+    m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+    m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+    m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+
+
+@pytest.mark.parametrize("variants", VARIANTS)
+def test_variants_share_a_key(variants, no_caches):
+    keys = {canonicalize_latex(v) for v in variants}
+    assert len(keys) == 1
+    # the key converts to what the written form converts to, up to one-child mrows
+    key = keys.pop()
+    for v in variants:
+        written = _strip_math_delimiters(normalize_input(v))
+        assert _without_single_mrows(m._convert_canonical(key)) == _without_single_mrows(m._convert_canonical(written))
+
+
+@pytest.mark.parametrize("a, b", DISTINCT)
+def test_distinct_formulas_keep_distinct_keys(a, b, no_caches):
+    assert canonicalize_latex(a) != canonicalize_latex(b)
+    assert m._convert_canonical(canonicalize_latex(a)) == m._convert_canonical(a)
+
+
+def test_variants_hit_the_result_cache():
+    m.clear_result_cache()
+    for variants in VARIANTS:
+        results = {m.convert(v) for v in variants}
+        assert len(results) == 1
+    stats = m.get_result_cache_stats()
+    assert stats["hits"] == sum(len(v) - 1 for v in VARIANTS)
@@ -0,0 +1,19 @@
+import pytest
+
+from src.cli import main
+from src.converters.latex_to_mathml import convert
+
+MATRIX = r"\begin{bmatrix} " + r" \\ ".join(" & ".join(f"a_{{{i}{j}}}" for j in range(4)) for i in range(12)) + r" \end{bmatrix}"
+
+
+@pytest.mark.parametrize("option", [["--compact"], ["--max-rows", "4"], ["--max-cells", "8"]])
+def test_jobs_rejects_options_it_cannot_apply(option, capsys):
+    with pytest.raises(SystemExit) as exc:
+        main(["convert", "--jobs", "2", *option, "x"])
+    assert exc.value.code == 2
+    assert "--jobs cannot be combined" in capsys.readouterr().err
+
+
+def test_jobs_matches_in_process_conversion(capsys):
+    assert main(["convert", "--jobs", "2", "--output", "omml", MATRIX, "x^2"]) == 0
+    assert capsys.readouterr().out.splitlines() == [convert(MATRIX, output="omml"), convert("x^2", output="omml")]
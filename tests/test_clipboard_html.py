@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from src.converters.latex_to_mathml import convert
+from src.services.clipboard_html import build_cf_html, harvest_tex, parse_cf_html
+from src.ui.clipboard_auto_paste import ClipboardAutoPaster
+
+# HTML as browsers put it on the clipboard when rendered math is copied:
+# KaTeX, MathJax 2, MathJax 3 and Wikipedia pages, plus a Chrome CF_HTML
+# payload (header with byte offsets, CRLF line ends, trailing NUL).
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "clipboard_html")
+
+
+def _read(name: str, mode: str = "r"):
+    path = os.path.join(FIXTURES, name)
+    if mode == "rb":
+        with open(path, "rb") as f:
+            return f.read()
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        (
+            "katex.html",
+            "The energy is $E=mc^2$, and\n\n$$\\int_0^1 x\\,dx = \\frac{1}{2}$$\n\nholds for the unit interval.",
+        ),
+        (
+            "mathjax2.html",
+            "Let $x \\in \\mathbb{R}$ be positive. Then\n\n"
+            "$$\\sum_{n=1}^\\infty \\frac{1}{n^2} = \\frac{\\pi^2}{6}$$\n\nas Euler showed.",
+        ),
+        (
+            "mathjax3.html",
+            "By Pythagoras, $a^2+b^2=c^2$ for a right triangle, so\n\n$$c = \\sqrt{a^2 + b^2}$$",
+        ),
+        ("wikipedia.html", "Euler's identity is the equality $e^{i\\pi }+1=0$ where"),
+    ],
+)
+def test_harvest_tex(name, expected):
+    assert harvest_tex(_read(name)) == expected
+
+
+def test_harvest_tex_without_tex_source():
+    assert harvest_tex(_read("plain.html")) is None
+
+
+def test_parse_cf_html_uses_byte_offsets():
+    fragment = parse_cf_html(_read("chrome_cf_html.bin", "rb"))
+    assert fragment == _read("chrome_cf_html.fragment.html")
+    assert harvest_tex(fragment) == "能量 $E=mc^2$"
+
+
+def test_parse_cf_html_without_header():
+    assert parse_cf_html("<b>粗体</b>\x00".encode("utf-8")) == "<b>粗体</b>"
+
+
+def test_build_cf_html_round_trip():
+    fragment = _read("chrome_cf_html.fragment.html")
+    assert parse_cf_html(build_cf_html(fragment)) == fragment
+
+
+class _Root:
+    def after(self, _delay, callback, *args):
+        callback(*args)
+
+
+def test_auto_paste_converts_harvested_tex():
+    # \mathrm keeps plain text away from the converter, but TeX recovered
+    # from rendered math is converted as it is
+    written = []
+    paster = ClipboardAutoPaster(
+        root=_Root(),
+        get_clipboard_text=lambda: "∫01exdx",
+        set_clipboard_text=written.append,
+        convert_latex=convert,
+        on_preview=lambda _summary: None,
+        get_clipboard_html=lambda: _read("katex_mathrm.html"),
+    )
+    paster._enabled = True
+    paster._on_clipboard_update_after_delay()
+    assert written == [convert(r"\int_0^1 \mathrm{e}^{x}\,\mathrm{d}x")]
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from latex2mathml.converter import convert as latex2mathml_convert
+
+from src.converters import latex_to_mathml as m
+from src.converters.fast_path import convert_simple
+from src.utils.latex_cleaner import canonicalize_latex
+
+# Whatever convert_simple accepts must match latex2mathml followed by the
+# Word rewrites byte for byte; the generator leans on what latex2mathml's
+# tokenizer reads in surprising ways (digit runs after \frac and scripts,
+# decimals, spaces before arguments).
+ATOMS = list("abxyzABn") + ["1", "2", "10", "3.5", "0", r"\alpha", r"\pi", r"\infty", r"\ell", r"\pm"]
+OPERATORS = ["+", "-", "=", ",", "/", "!", ".", "(", ")", "[", "]", r"\cdot", r"\times", r"\le", r"\to", r"\in"]
+ARGUMENTS = ["a", "n", "1", "2", "12", "2.5", " 3", " 23", r"\alpha", r"\infty"]
+
+
+def _reference(key: str) -> str:
+    return m._normalize_mathml_output(latex2mathml_convert(key))
+
+
+def _argument(rng: random.Random, depth: int) -> str:
+    if depth >= 2 or rng.random() < 0.5:
+        return rng.choice(ARGUMENTS)
+    return "{" + _expression(rng, depth + 1) + "}"
+
+
+def _term(rng: random.Random, depth: int) -> str:
+    r = rng.random()
+    if r < 0.2:
+        return r"\frac" + _argument(rng, depth) + _argument(rng, depth)
+    atom = rng.choice(ATOMS)
+    if r < 0.35:
+        return atom + "^" + _argument(rng, depth)
+    if r < 0.45:
+        return atom + "_" + _argument(rng, depth)
+    return atom
+
+
+def _expression(rng: random.Random, depth: int = 0) -> str:
+    parts = [rng.choice([_term(rng, depth), rng.choice(OPERATORS)]) for _ in range(rng.randint(1, 5))]
+    return rng.choice([" ", ""]).join(parts)
+
+
+@pytest.mark.parametrize(
+    "latex",
+    [r"\frac{x}12", r"x+\frac{a}23", r"\frac12", r"\frac123", r"\frac a 23", r"\frac{a}2.5", r"x^12", r"x_2.5", r"-\frac{1}{2}"],
+)
+def test_known_cases(latex):
+    key = canonicalize_latex(latex)
+    fast = convert_simple(key)
+    assert fast is None or fast == _reference(key)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_full_pipeline(seed):
+    rng = random.Random(seed)
+    hits = 0
+    for _ in range(1500):
+        key = canonicalize_latex(_expression(rng))
+        fast = convert_simple(key)
+        if fast is None:
+            continue
+        hits += 1
+        assert fast == _reference(key), key
+    assert hits > 500
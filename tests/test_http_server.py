@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from src.converters.latex_to_mathml import convert
+from src.services.http_server import ConversionServer
+
+
+def _request(body: dict) -> bytes:
+    data = json.dumps(body).encode("utf-8")
+    return b"POST /convert HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(data) + data
+
+
+async def _exchange(server: ConversionServer, payload: bytes, count: int) -> list[tuple[int, dict]]:
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(payload)
+    await writer.drain()
+    responses = []
+    for _ in range(count):
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        responses.append((status, json.loads(await reader.readexactly(int(headers["content-length"])))))
+    writer.close()
+    return responses
+
+
+def _run(test, **options):
+    async def main():
+        server = ConversionServer(port=0, jobs=1, **options)
+        await server.start()
+        try:
+            return await test(server)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_pipelined_requests_beyond_max_pending():
+    # more requests than pending slots on one connection: reading pauses
+    # until slots free up, and every response still arrives in order
+    formulas = [f"x^{{{i}}}" for i in range(10)]
+    payload = b"".join(_request({"latex": latex}) for latex in formulas)
+    responses = _run(lambda server: _exchange(server, payload, len(formulas)), max_pending=2)
+    assert responses == [(200, {"result": convert(latex)}) for latex in formulas]
+
+
+def test_overlong_header_line():
+    payload = b"GET /metrics HTTP/1.1\r\nX-Long: " + b"a" * (1 << 17) + b"\r\n\r\n"
+    [(status, body)] = _run(lambda server: _exchange(server, payload, 1))
+    assert status == 431 and "error" in body
+
+
+def test_overlong_request_line():
+    payload = b"GET /" + b"a" * (1 << 17) + b" HTTP/1.1\r\n\r\n"
+    [(status, _body)] = _run(lambda server: _exchange(server, payload, 1))
+    assert status == 414
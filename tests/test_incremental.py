@@ -0,0 +1,99 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.converters.incremental import IncrementalConverter
+from src.converters.latex_to_mathml import convert
+
+# IncrementalConverter must give exactly what convert() gives; these compare
+# the two on generated tables, including the switches and fences whose
+# effect crosses rows and must send the formula down the normal path.
+ENVIRONMENTS = ["aligned", "gathered", "split", "align*", "matrix", "bmatrix", "pmatrix", "cases"]
+ATOMS = [
+    "x", "y^2", r"\frac{a}{b}", "-x", "-1", "0", r"\left( a+b \right)", r"\sin\theta", r"\sum_{i=1}^n i",
+    r"\sqrt{2}", r"\text{if } x", r"\mathbf{x}", r"\mathbb{R}", r"|x|", r"\left\| v \right\|", r"\bigl( x \bigr)",
+]
+CROSS_ROW = [
+    r"\displaystyle", r"\textstyle", r"\scriptstyle", r"\color{red}", r"\rm", r"\bf", r"\Large", "|", r"\|",
+    r"\bigl|", r"\bigr|", r"\big(", r"\Bigr)", r"\left|", r"\right|", r"\lvert", r"\rvert", r"\Vert", "(", ")",
+]
+
+
+def _block(env: str, rows: list[str]) -> str:
+    return f"\\begin{{{env}}} " + r" \\ ".join(rows) + f" \\end{{{env}}}"
+
+
+def _random_block(rng: random.Random) -> str:
+    env = rng.choice(ENVIRONMENTS)
+    rows = []
+    for _ in range(rng.randint(8, 12)):
+        cells = 1 if env == "gathered" else rng.choice([1, 2, 2, 3])
+        rows.append(" & ".join(
+            " ".join(rng.choice(CROSS_ROW if rng.random() < 0.04 else ATOMS) for _ in range(rng.randint(1, 3)))
+            for _ in range(cells)
+        ))
+    return _block(env, rows)
+
+
+def _outcome(fn, latex: str, output: str):
+    try:
+        return fn(latex, output=output)
+    except Exception as e:  # both sides must fail the same way
+        return type(e)
+
+
+def _assert_same(converter: IncrementalConverter, latex: str, output: str = "mathml") -> None:
+    assert _outcome(converter.convert, latex, output) == _outcome(convert, latex, output), latex
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_full_conversion(seed):
+    rng = random.Random(seed)
+    converter = IncrementalConverter()
+    for _ in range(60):
+        _assert_same(converter, _random_block(rng), rng.choice(["mathml", "mathml", "omml"]))
+    assert converter.stats()["incremental"] > 0
+
+
+def test_edits_reuse_rows():
+    rows = [rf"f_{{{i}}}(x) &= x^{{{i}}} + \frac{{1}}{{{i + 1}}}" for i in range(10)]
+    converter = IncrementalConverter()
+    _assert_same(converter, _block("aligned", rows))
+    rows[4] = r"f_4(x) &= -1 + \sqrt{x}"
+    _assert_same(converter, _block("aligned", rows))
+    stats = converter.stats()
+    assert stats["incremental"] == 2
+    assert stats["rows_reused"] >= 9
+
+
+@pytest.mark.parametrize(
+    "opening, closing",
+    [
+        (r"\displaystyle\frac{1}{5}", "y"),
+        (r"\rm d x", "y"),
+        (r"\color{red} x", "y"),
+        (r"\Large x", "y"),
+        (r"\bigl| x", r"y \bigr|"),
+        (r"\left| x", r"y \right|"),
+        (r"\big( x", r"y \Big)"),
+        (r"\| x", r"y \|"),
+        (r"| x", "y |"),
+    ],
+)
+def test_switches_and_open_fences_take_the_normal_path(opening, closing):
+    rows = [f"a_{i} &= b_{i}" for i in range(9)]
+    rows[3] = f"a_3 &= {opening}"
+    rows[6] = f"a_6 &= {closing}"
+    converter = IncrementalConverter()
+    _assert_same(converter, _block("aligned", rows))
+    assert converter.stats()["incremental"] == 0
+
+
+def test_rows_on_an_executor():
+    rows = [" & ".join(f"a_{{{i}{j}}}" for j in range(6)) for i in range(20)]
+    latex = _block("bmatrix", rows)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        converter = IncrementalConverter(executor=executor)
+        _assert_same(converter, latex)
+    assert converter.stats()["rows_parallel"] == 20
@@ -0,0 +1,71 @@
+import pytest
+
+from src.converters.latex_to_mathml import convert
+from src.utils.latex_macros import MacroError, expand_macros, get_macro_table, parse_macros, set_macro_table
+
+TABLE = parse_macros(
+    r"""
+    % a preamble as it appears in a paper
+    \newcommand{\R}{\mathbb{R}}
+    \newcommand{\norm}[1]{\left\| #1 \right\|}
+    \newcommand{\pair}[2][0]{(#1, #2)}
+    \DeclareMathOperator{\rank}{rank}
+    \DeclareMathOperator*{\argmax}{arg\,max}
+    \def\abs#1{\left| #1 \right|}
+    \let\eps=\varepsilon
+    """
+)
+
+
+@pytest.mark.parametrize(
+    "latex, expected",
+    [
+        (r"x \in \R", r"x \in \mathbb{R}"),
+        (r"\norm{v}", r"\left\| v \right\|"),
+        (r"\pair{x} \pair[1]{y}", r"(0, x) (1, y)"),
+        (r"\rank A", r"\operatorname{rank} A"),
+        (r"\argmax_x f", r"\operatorname*{argmax}_x f"),
+        (r"\abs{x}", r"\left| x \right|"),
+        (r"\eps", r"\varepsilon"),
+        (r"\norm{\abs{\R}}", r"\left\| \left| \mathbb{R} \right| \right\|"),
+        (r"\frac{a}{b}", r"\frac{a}{b}"),
+    ],
+)
+def test_table_macros(latex, expected):
+    assert expand_macros(latex, TABLE) == expected
+
+
+def test_definitions_in_the_formula():
+    assert expand_macros(r"\newcommand{\f}[1]{f(#1)} \f{x} + \f y") == " f(x) + f(y)"
+    assert expand_macros(r"\def\g#1#2{#1^#2}\g{a}{b}") == "a^b"
+    # \alpha#1 with #1 = b must not run together into \alphab
+    assert expand_macros(r"\newcommand{\s}[1]{\alpha#1}\s{b}") == r"\alpha b"
+
+
+def test_in_formula_definitions_stay_in_the_formula():
+    assert expand_macros(r"\renewcommand{\R}{\mathbb{Q}} \R", TABLE) == r" \mathbb{Q}"
+    assert expand_macros(r"\providecommand{\R}{X} \R", TABLE) == r" \mathbb{R}"
+    assert expand_macros(r"\R", TABLE) == r"\mathbb{R}"
+    assert "\\f" not in TABLE
+
+
+def test_many_in_formula_definitions():
+    # each definition is read off the expansion stack in place
+    text = " ".join(rf"\def\m{{x_{{{i}}}}} \m" for i in range(3000))
+    assert expand_macros(text) == " ".join(f" x_{{{i}}}" for i in range(3000))
+
+
+def test_runaway_expansion():
+    with pytest.raises(MacroError):
+        expand_macros(r"\def\loop{\loop x}\loop")
+    with pytest.raises(MacroError):
+        expand_macros(r"\newcommand{\f}[1]{#1} \f")
+
+
+def test_convert_uses_the_active_table():
+    previous = get_macro_table()
+    set_macro_table(TABLE)
+    try:
+        assert convert(r"\norm{x} \in \R") == convert(r"\left\| x \right\| \in \mathbb{R}")
+    finally:
+        set_macro_table(previous)
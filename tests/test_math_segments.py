@@ -0,0 +1,30 @@
+from src.utils import math_segments
+from src.utils.math_segments import iter_paragraphs
+
+
+def test_display_block_with_blank_lines_stays_whole():
+    lines = ["a", "", "$$", "x", "", "y", "$$", "", r"\begin{align}", "p &= q", "", r"\end{align}", "b"]
+    assert list(iter_paragraphs(lines)) == ["a", "$$\nx\n\ny\n$$", "\\begin{align}\np &= q\n\n\\end{align}\nb"]
+
+
+def test_unclosed_display_gives_up_at_its_first_blank_line():
+    lines = ["costs 5 $$ or more", "per item", "", "p2 $x$", "", "$$", "z", "$$", "", "end"]
+    assert list(iter_paragraphs(lines)) == ["costs 5 $$ or more\nper item", "p2 $x$", "$$\nz\n$$", "end"]
+
+
+def test_unclosed_display_does_not_read_to_the_end():
+    # a stray "$$" early in a long document: paragraphs keep coming out
+    # after a bounded lookahead instead of at EOF
+    read = 0
+
+    def document():
+        nonlocal read
+        yield "a stray $$"
+        for i in range(100_000):
+            read += 1
+            yield f"paragraph {i}" if i % 2 == 0 else ""
+
+    paragraphs = iter_paragraphs(document())
+    assert next(paragraphs) == "a stray $$\nparagraph 0"
+    assert next(paragraphs) == "paragraph 2"
+    assert read <= 2 * math_segments._MAX_OPEN_DISPLAY_LINES + 2
@@ -0,0 +1,127 @@
+import random
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from src.converters.incremental import IncrementalConverter
+from src.converters.latex_to_mathml import convert, convert_batch
+from src.converters.mathml_to_latex import embedded_latex, mathml_to_latex
+from src.utils.latex_macros import parse_macros, set_macro_table
+
+# MathML without the TeX annotation goes through the structural writer; the
+# LaTeX it writes must convert back to the same MathML under every profile
+# (compared after canonicalisation, so &#x0003D; and = are equal).
+PROFILES = ("word", "libreoffice", "web")
+
+CASES = [
+    r"\mathbf{1}", r"\mathbf{12} + \mathit{3}", r"\mathbb{1}", r"\boldsymbol{1}",
+    r"\textbf{bold}", r"\textit{it}", r"\texttt{tt}", r"\textsf{sf}", r"\text{if } x",
+    r"\color{red}{x}", r"\color{red} x + y", r"\color{blue}{x} + y", r"\textcolor{blue}{x} + y",
+    r"a + {\color{red} x} y", r"\frac{\color{red} a}{b}",
+    r"12 34", r"1{}2", r"x_{12 3}", r"1 3 12_a", r"{}^{0}T",
+    r"\frac 12 {+ -}",
+    r"\begin{align*} a &= b \\ c &= d \end{align*}",
+    r"\begin{align*} a &= b & c &= d \\ e &= f & g &= h \end{align*}",
+    r"\begin{align*} &= b \end{align*}",
+    r"\begin{align} x &= 1 \\ y &= 2 \end{align}",
+    r"\begin{align} x &= 1 \nonumber \\ y &= 2 \end{align}",
+    r"\begin{split} a &= b \\ &= c \end{split}",
+    r"\begin{aligned} f(x) &= (x+1)^2 \\ &= x^2 + 2x + 1 \end{aligned}",
+    r"\begin{gathered} a = b \\ c = d \end{gathered}",
+    r"\bigl( a + b \bigr)", r"\Big| x \Big|", r"\Bigl\| x \Bigr\|", r"\biggl[ x \biggr]",
+    r"\left( a \middle| b \right)",
+    r"\xrightarrow{f}", r"\xrightarrow{}", r"\sqrt{}",
+]
+
+ATOMS = list("abxA") + ["1", "12", "3.5", r"\alpha", r"\infty", r"\mathbf{1}", r"\mathbf{x}", r"\mathit{12}",
+                        r"\textbf{ab}", r"\text{if}", r"\texttt{t}", "{}", r"\sin x", r"\|", "|", r"\cdot", r"\le"]
+OPERATORS = ["+", "-", "=", ","]
+
+
+def _roundtrip(latex: str, profile: str) -> tuple:
+    mathml = convert(latex, profile=profile)
+    back = convert(mathml_to_latex(mathml), profile=profile)
+    return ET.canonicalize(back), ET.canonicalize(mathml)
+
+
+def _argument(rng: random.Random, depth: int) -> str:
+    # braced: \sqrt 12 and \sqrt{12} differ by an mrow the writer cannot see
+    if depth > 1 or rng.random() < 0.5:
+        return "{" + rng.choice(["a", "2", "12"]) + "}"
+    return "{" + _expression(rng, depth + 1) + "}"
+
+
+def _term(rng: random.Random, depth: int) -> str:
+    r = rng.random()
+    if r < 0.1:
+        return r"\frac " + _argument(rng, depth) + " " + _argument(rng, depth)
+    if r < 0.2:
+        return "{" + r"\color{red}" + _argument(rng, depth) + " " + _expression(rng, depth + 1) + "}"
+    if r < 0.25:
+        return r"\textcolor{blue}" + _argument(rng, depth)
+    if r < 0.3:
+        return r"\sqrt " + _argument(rng, depth)
+    if r < 0.35:
+        return rng.choice(["1", "12"]) + " " + rng.choice(["3", "45"])
+    if r < 0.4:
+        return r"\left(" + _expression(rng, depth + 1) + r"\right)"
+    atom = rng.choice(ATOMS)
+    if r < 0.5:
+        return atom + "^" + _argument(rng, depth)
+    if r < 0.55:
+        return atom + "_" + _argument(rng, depth)
+    return atom
+
+
+def _expression(rng: random.Random, depth: int = 0) -> str:
+    # at least two nodes at the top: a group around the whole formula reads
+    # the same as the web profile's outer mrow
+    count = rng.randint(1 if depth else 2, 4)
+    return " ".join(rng.choice([_term(rng, depth), rng.choice(OPERATORS)]) for _ in range(count))
+
+
+def _formula(rng: random.Random) -> str:
+    env = rng.choice(["align*", "align", "split", None, None])
+    if env is None:
+        return _expression(rng)
+    rows = [_expression(rng, 1) + " &= " + _expression(rng, 1) for _ in range(rng.randint(1, 3))]
+    return rf"\begin{{{env}}}" + r" \\ ".join(rows) + rf"\end{{{env}}}"
+
+
+@pytest.mark.parametrize("profile", PROFILES)
+@pytest.mark.parametrize("latex", CASES)
+def test_known_cases(latex, profile):
+    back, original = _roundtrip(latex, profile)
+    assert back == original
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_formulas(seed):
+    rng = random.Random(seed)
+    for _ in range(150):
+        latex = _formula(rng)
+        try:
+            convert(latex)
+        except Exception:
+            continue
+        for profile in PROFILES:
+            back, original = _roundtrip(latex, profile)
+            assert back == original, (profile, latex)
+
+
+def test_annotation_keeps_the_source():
+    # the cache key has the macros expanded and x^{2} unbraced; the
+    # annotation must still read back what the user wrote
+    set_macro_table(parse_macros(r"\newcommand{\R}{\mathbb{R}}"))
+    try:
+        latex = r"$$ x^{2} \in \R $$"
+        plain = convert(latex)
+        annotated = convert(latex, annotate=True)
+        assert embedded_latex(plain) is None
+        assert embedded_latex(annotated) == r"x^{2} \in \R"
+        assert convert(latex) == plain
+        assert embedded_latex(convert(latex, compact=True, annotate=True)) == r"x^{2} \in \R"
+        assert [embedded_latex(m) for m in convert_batch(["x^{2}", "x^2"], annotate=True)] == ["x^{2}", "x^2"]
+        assert embedded_latex(IncrementalConverter().convert(latex, annotate=True)) == r"x^{2} \in \R"
+    finally:
+        set_macro_table(None)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from src.converters.latex_to_mathml import convert
+
+# One golden file per case: tests/golden/omml/<name>.xml holds the exact
+# convert(latex, output="omml") result.  After an intended change to the
+# writer, regenerate them with `python tests/test_omml_golden.py --update`
+# and review the diff.
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "omml")
+
+CASES = {
+    "frac": r"\frac{a}{b}",
+    "frac_nested": r"\dfrac{1}{1 + \frac{1}{x}}",
+    "sub": r"x_i",
+    "sup": r"e^{-x^2}",
+    "subsup": r"x_i^2 + y_{j}^{n+1}",
+    "limit": r"\lim_{n \to \infty} a_n",
+    "sum": r"\sum_{i=1}^{n} i^2",
+    "integral": r"\int_0^1 f(x)\,dx",
+    "prod": r"\prod_{k} a_k",
+    "paren": r"\left( \frac{a}{b} \right)",
+    "norm": r"\left\| v \right\|",
+    "abs": r"|x| + \left| y \right|",
+    "bmatrix": r"\begin{bmatrix} 1 & 2 \\ 3 & 4 \end{bmatrix}",
+    "pmatrix": r"\begin{pmatrix} a & b & c \\ d & e & f \end{pmatrix}",
+    "cases": r"f(x) = \begin{cases} x & x \ge 0 \\ -x & \text{otherwise} \end{cases}",
+    "aligned": r"\begin{aligned} f(x) &= (x+1)^2 \\ &= x^2 + 2x + 1 \end{aligned}",
+    "gathered": r"\begin{gathered} a = b \\ c = d \end{gathered}",
+    "hat": r"\hat{x}",
+    "vec": r"\vec{v} \cdot \tilde{a}",
+    "dot": r"\dot{x} + \ddot{y}",
+    "bar": r"\bar{x} + \overline{AB}",
+    "sqrt": r"\sqrt{2} + \sqrt[3]{x}",
+    "double_struck": r"x \in \mathbb{R}",
+}
+
+
+def _golden_path(name: str) -> str:
+    return os.path.join(GOLDEN_DIR, f"{name}.xml")
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_omml_matches_golden(name):
+    with open(_golden_path(name), encoding="utf-8") as f:
+        expected = f.read().rstrip("\n")
+    assert convert(CASES[name], output="omml") == expected
+
+
+def _update() -> None:
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for name, latex in CASES.items():
+        with open(_golden_path(name), "w", encoding="utf-8", newline="\n") as f:
+            f.write(convert(latex, output="omml") + "\n")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--update"]:
+        sys.exit("usage: python tests/test_omml_golden.py --update")
+    _update()
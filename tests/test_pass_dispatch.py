@@ -0,0 +1,68 @@
+import pytest
+
+from src.converters import latex_to_mathml as m
+
+# The feature pre-scan only decides which per-element passes run; skipping
+# the rest must not change a single byte of the output.
+CORPUS = [
+    r"\bigl( -x \bigr) + \Big\| v \Big\|",
+    r"\left( -\frac{a}{b} \right)",
+    r"\mathbf{x} + \boldsymbol{\alpha} + \mathbb{R}",
+    r"\|v\| + |x| + \lVert w \rVert",
+    r"A^\top B^{\top}",
+    r"\lim_{n \to \infty} a_n = \infty",
+    r"\begin{bmatrix} 1 & -2 \\ \infty & \mathbf{v} \end{bmatrix}",
+    r"\begin{aligned} f(x) &= (x+1)^2 \\ &= x^2 + 2x + 1 \end{aligned}",
+    r"\begin{cases} x & x \ge 0 \\ -x & \text{otherwise} \end{cases}",
+    r"a \\ b & c",
+    r"{\displaystyle \sum_{i=1}^{n} i} + \color{red}{x}",
+    r"\operatorname*{arg\,max}_x f(x) \mathrel{:=} y",
+    r"\begin{pmatrix} \begin{matrix} a & b \end{matrix} & c \end{pmatrix}",
+]
+
+
+@pytest.fixture
+def no_caches():
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    yield
+    m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+    m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+    m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+
+
+@pytest.mark.parametrize("profile", ["word", "libreoffice"])
+def test_skipped_passes_do_not_change_output(profile, no_caches, monkeypatch):
+    dispatched = [m.convert(latex, profile=profile) for latex in CORPUS]
+    monkeypatch.setattr(m, "_scan_features", lambda root: m._F_ALL)
+    assert [m.convert(latex, profile=profile) for latex in CORPUS] == dispatched
+
+
+def test_scan_features():
+    import xml.etree.ElementTree as ET
+
+    def features(latex):
+        return m._scan_features(ET.fromstring(m.convert(latex, profile="raw")))
+
+    assert features(r"\frac{a}{b}") == 0
+    assert features(r"\begin{bmatrix} 1 \end{bmatrix}") & m._F_MTABLE
+    assert features(r"\bigl( x \bigr)") & m._F_SIZED_FENCE
+    assert features(r"-x") & m._F_MINUS
+    assert features(r"\mathbf{x}") & m._F_MATHVARIANT
+    assert features(r"\|v\|") & m._F_NORM_BAR
+    assert features(r"\infty") & m._F_INFINITY
+    assert features(r"A^\top") & m._F_TRANSPOSE
+
+
+def test_pass_stats(no_caches):
+    m.clear_pass_stats()
+    m.convert(r"\|v\| + \|w\|")
+    m.convert(r"\begin{bmatrix} 1 & 2 \end{bmatrix}")
+    stats = m.get_pass_stats()
+    m.clear_pass_stats()
+    norm = stats["norm_bar"]
+    assert norm["formulas"] == 1
+    assert norm["passes_run"] + norm["passes_skipped"] == len(m._ELEMENT_PASSES)
+    assert "_normalize_mtable_layout" in norm["skipped"]
+    assert "_normalize_mtable_layout" not in stats["mtable"]["skipped"]
@@ -0,0 +1,71 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+from latex2mathml.converter import convert as latex2mathml_convert
+
+from src.converters import latex_to_mathml as m
+from src.converters.latex_to_mathml import PROFILES, convert, convert_batch
+from src.utils.latex_cleaner import canonicalize_latex
+
+FORMULAS = [
+    r"-\frac{a}{b} + \|v\|",
+    r"\Bigl\| x \Bigr\| + \Bigl\{ y \Bigr\}",
+    r"a \\ b & c",
+    r"\begin{bmatrix} 1 & -2 \\ \mathbf{v} & \infty \end{bmatrix}",
+    r"\begin{aligned} f(x) &= (x+1)^2 \\ &= x^2 + 2x + 1 \end{aligned}",
+]
+
+
+def _tags(mathml: str) -> list[str]:
+    return [e.tag.rpartition("}")[2] for e in ET.fromstring(mathml).iter()]
+
+
+def test_word_only_rewrites():
+    word = convert(r"-\frac{a}{b} + \|v\|", profile="word")
+    libreoffice = convert(r"-\frac{a}{b} + \|v\|", profile="libreoffice")
+    assert 'form="prefix"' in word and 'data-mjx-texclass="ORD"' in word
+    assert 'form="prefix"' not in libreoffice and "data-mjx-texclass" not in libreoffice
+
+
+def test_libreoffice_is_compact():
+    # single-child mrows are dropped; the grouping mrow of a + b stays
+    latex = r"\frac{a + b}{c} + \sqrt{x}"
+    mathml = convert(latex, profile="libreoffice")
+    assert _tags(mathml).count("mrow") == 1
+    assert mathml == m.compact_mathml(mathml)
+    assert len(mathml) < len(convert(latex, profile="word"))
+
+
+@pytest.mark.parametrize("latex", FORMULAS)
+def test_raw_is_latex2mathml_output(latex):
+    assert convert(latex, profile="raw") == latex2mathml_convert(canonicalize_latex(latex))
+
+
+@pytest.mark.parametrize("latex", FORMULAS)
+def test_web_only_fixes_xml(latex):
+    web = convert(latex, profile="web")
+    raw = convert(latex, profile="raw").replace("<mi>&</mi>", "<mi>&amp;</mi>")
+    assert _tags(web) == _tags(raw)  # well-formed, same tree otherwise
+    assert "\\|" not in web and "\\{" not in web
+
+
+def test_caches_keep_profiles_apart():
+    # every profile converts the same formulas in turn, sharing one set of
+    # caches; each result must match a fresh conversion with caches off
+    interleaved = {(latex, p): convert(latex, profile=p) for latex in FORMULAS for p in PROFILES}
+    m.set_result_cache_budget(0)
+    m.set_plan_cache_budget(0)
+    m.set_subtree_cache_budget(0)
+    try:
+        fresh = {(latex, p): convert(latex, profile=p) for latex in FORMULAS for p in PROFILES}
+    finally:
+        m.set_result_cache_budget(m._RESULT_CACHE_DEFAULT_BUDGET)
+        m.set_plan_cache_budget(m._PLAN_CACHE_DEFAULT_BUDGET)
+        m.set_subtree_cache_budget(m._SUBTREE_CACHE_DEFAULT_BUDGET)
+    assert interleaved == fresh
+    assert convert_batch(FORMULAS, profile="libreoffice") == [fresh[latex, "libreoffice"] for latex in FORMULAS]
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        convert("x", profile="mathtype")
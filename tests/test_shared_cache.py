@@ -0,0 +1,74 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.converters import latex_to_mathml as m
+from src.converters.shared_cache import SharedResultCache, key_digest
+
+FORMULAS = [rf"\frac{{a_{{{i}}}}}{{\sqrt{{x^{{{i}}} + 1}}}}" for i in range(20)]
+
+
+@pytest.fixture
+def cache():
+    with SharedResultCache.create(slots=64, arena_bytes=1 << 16) as c:
+        yield c
+
+
+def test_round_trip(cache):
+    cache.put(key_digest(("a",)), "<math>α</math>")
+    assert cache.get(key_digest(("a",))) == "<math>α</math>"
+    assert cache.get(key_digest(("b",))) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_overwritten_entries_miss():
+    # a small arena is overwritten many times over: old keys miss, and a hit
+    # is always the value stored under that key
+    with SharedResultCache.create(slots=16, arena_bytes=1 << 12) as small:
+        values = {key_digest((i,)): f"result {i} " * (i % 13 + 1) for i in range(2000)}
+        for digest, value in values.items():
+            small.put(digest, value)
+        found = {digest: small.get(digest) for digest in values}
+    hits = [digest for digest, value in found.items() if value is not None]
+    assert hits and len(hits) < len(values)
+    assert all(found[digest] == values[digest] for digest in hits)
+
+
+def _put(cache: SharedResultCache, key, value: str) -> None:
+    cache.put(key_digest(key), value)
+
+
+def _init_worker(cache: SharedResultCache) -> None:
+    m.set_shared_result_cache(cache)
+
+
+def _convert(latex: str) -> str:
+    return m.convert(latex)
+
+
+def test_shared_between_processes(cache):
+    ctx = multiprocessing.get_context()
+    child = ctx.Process(target=_put, args=(cache, ("from child",), "stored in another process"))
+    child.start()
+    child.join(30)
+    assert child.exitcode == 0
+    assert cache.get(key_digest(("from child",))) == "stored in another process"
+
+
+def test_workers_fill_the_cache_for_each_other(cache):
+    # formulas converted by the pool are found by the parent without
+    # converting, and match a local conversion
+    with ProcessPoolExecutor(max_workers=2, initializer=_init_worker, initargs=(cache,)) as pool:
+        from_workers = list(pool.map(_convert, FORMULAS))
+    previous = m.get_shared_result_cache()
+    m.set_shared_result_cache(cache)
+    m.clear_result_cache()
+    hits = cache.stats()["hits"]
+    try:
+        assert [m.convert(latex) for latex in FORMULAS] == from_workers
+    finally:
+        m.set_shared_result_cache(previous)
+    assert cache.stats()["hits"] - hits == len(FORMULAS)
+    m.clear_result_cache()
+    assert [m.convert(latex) for latex in FORMULAS] == from_workers
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import pytest
+
+from src.services import single_instance
+from src.services.single_instance import acquire_or_forward
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Unix domain sockets")
+
+# a second launch is another process: the owner treats its own PID as stale
+_SECOND_INSTANCE = """
+import sys
+from src.services.single_instance import acquire_or_forward
+server = acquire_or_forward(sys.argv[2:], lock_path=sys.argv[1])
+sys.exit(0 if server is None else 1)
+"""
+
+
+def _lock(path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _dead_pid() -> int:
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    return child.pid
+
+
+def test_second_instance_forwards_argv(tmp_path):
+    lock_path = str(tmp_path / "app.lock")
+    server = acquire_or_forward(["--first"], lock_path=lock_path)
+    assert server is not None
+    received = []
+    arrived = threading.Event()
+    server.set_handler(lambda message: (received.append(message), arrived.set()))
+    try:
+        second = subprocess.run(
+            [sys.executable, "-c", _SECOND_INSTANCE, lock_path, "--show", "notes.md"],
+            cwd=ROOT_DIR,
+            timeout=30,
+        )
+        assert second.returncode == 0
+        assert arrived.wait(5)
+        assert received == [{"argv": ["--show", "notes.md"], "cwd": ROOT_DIR}]
+    finally:
+        server.close()
+    assert not os.path.exists(lock_path)
+
+
+def test_takes_over_a_lock_whose_pid_is_gone(tmp_path):
+    lock_path = str(tmp_path / "app.lock")
+    with open(lock_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": _dead_pid(), "address": str(tmp_path / "gone.sock"), "authkey": "00"}, f)
+    server = acquire_or_forward([], lock_path=lock_path, timeout=5)
+    try:
+        assert server is not None
+        assert _lock(lock_path)["pid"] == os.getpid()
+    finally:
+        server.close()
+
+
+def test_takes_over_when_the_owner_does_not_answer(tmp_path, monkeypatch):
+    # a live PID whose listener never accepts: forwarding times out, and the
+    # lock is taken over once the deadline passes
+    monkeypatch.setattr(single_instance, "_FORWARD_TIMEOUT_S", 0.2)
+    lock_path = str(tmp_path / "app.lock")
+    address = str(tmp_path / "hung.sock")
+    hung = Listener(address, family="AF_UNIX", authkey=b"key")
+    with open(lock_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getppid(), "address": address, "authkey": b"key".hex()}, f)
+    started = time.monotonic()
+    try:
+        server = acquire_or_forward([], lock_path=lock_path, timeout=0.5)
+    finally:
+        hung.close()
+    try:
+        assert server is not None
+        assert _lock(lock_path)["pid"] == os.getpid()
+        assert time.monotonic() - started < 5
+    finally:
+        server.close()